@@ -0,0 +1,6 @@
+"""
+負荷試験とベンチマーク用データの投入（使い方は __main__.py を参照）
+
+- task_service / auth_service: サービスごとのデータ投入と計測シナリオ（サービスのプロセス内で実行する）
+- common: インプロセスのASGIクライアントによる同時実行と、p50 / p95 / p99・リクエスト数/秒の集計
+"""
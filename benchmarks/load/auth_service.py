@@ -0,0 +1,69 @@
+"""
+auth-serviceのデータ投入と負荷試験（python -m benchmarks.load から、サービスごとのプロセスで実行する）
+
+データ投入: benchmark_user_{n} をusers人分、同じパスワードのハッシュ（BCRYPT_ROUNDSのコスト）で一括登録する。
+負荷試験: POST /auth/login を計測する（ログインのたびにbcryptの検証を行うため、BCRYPT_ROUNDSで結果が大きく変わる）。
+"""
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict
+
+AUTH_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "services", "auth-service")
+sys.path.insert(0, AUTH_SERVICE_DIR)
+
+from sqlalchemy import delete, insert  # noqa: E402
+
+from app.core import password_hasher  # noqa: E402
+from app.db.session import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+from benchmarks.load.common import run_app, run_scenario, service_main  # noqa: E402
+
+USERNAME_PREFIX = "benchmark_user_"
+PASSWORD = "benchmark-password"
+
+
+def seed(config: Dict[str, Any]) -> Dict[str, Any]:
+    """ベンチマーク用ユーザーを登録する（既存のベンチマーク用ユーザーは削除してから登録する）"""
+    Base.metadata.create_all(bind=engine)
+    started_at = time.perf_counter()
+    password_hasher.start()
+    try:
+        hashed = asyncio.run(password_hasher.hash_password(PASSWORD))
+    finally:
+        password_hasher.shutdown()
+
+    db = SessionLocal()
+    try:
+        db.execute(delete(User).where(User.username.like(f"{USERNAME_PREFIX}%")).execution_options(
+            synchronize_session=False
+        ))
+        users = [{"username": f"{USERNAME_PREFIX}{n}", "password": hashed} for n in range(config["users"])]
+        for offset in range(0, len(users), config["batch_size"]):
+            db.execute(insert(User), users[offset:offset + config["batch_size"]])
+        db.commit()
+    finally:
+        db.close()
+    return {"users": config["users"], "seconds": round(time.perf_counter() - started_at, 3)}
+
+
+def run(config: Dict[str, Any]) -> Dict[str, Any]:
+    def login(n: int):
+        username = f"{USERNAME_PREFIX}{n % config['users']}"
+        return "POST", "/api/v1/auth/login", {"data": {"username": username, "password": PASSWORD}}
+
+    async def run_all(client) -> Dict[str, Any]:
+        return {
+            "POST /api/v1/auth/login": await run_scenario(
+                client, login, config["login_requests"], config["concurrency"], config["warmup"]
+            ),
+        }
+
+    return asyncio.run(run_app(app, run_all))
+
+
+if __name__ == "__main__":
+    service_main(seed, run)
@@ -0,0 +1,113 @@
+"""
+負荷試験の共通処理（サービスのプロセス内で使う）
+
+- run_scenario(): 同時に動くワーカー（asyncioのタスク）から、インプロセスのASGIクライアントでリクエストを送り、
+  レイテンシのp50 / p95 / p99と1秒あたりのリクエスト数をまとめる
+- service_main(): サービスごとのプロセスの入口（設定をJSONで受け取り、結果をJSONファイルに書き出す）
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+import httpx
+
+# リクエストの番号 → (メソッド, URL, httpxのリクエスト引数)
+RequestFactory = Callable[[int], Tuple[str, str, Dict[str, Any]]]
+
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """最近傍順位法のパーセンタイル（sorted_valuesは昇順）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-percent * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], statuses: Counter, elapsed: float) -> Dict[str, Any]:
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    requests = len(latencies_ms)
+    errors = {str(status): count for status, count in sorted(statuses.items()) if status >= 400}
+    return {
+        "requests": requests,
+        "errors": sum(errors.values()),
+        "error_statuses": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies_ms) / requests, 3) if requests else 0.0,
+            "p50": round(percentile(latencies_ms, 50), 3),
+            "p95": round(percentile(latencies_ms, 95), 3),
+            "p99": round(percentile(latencies_ms, 99), 3),
+            "max": round(latencies_ms[-1], 3) if requests else 0.0,
+        },
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    make_request: RequestFactory,
+    requests: int,
+    concurrency: int,
+    warmup: int = 0
+) -> Dict[str, Any]:
+    """
+    warmup件を1件ずつ送ったあと、concurrency個のワーカーで合計requests件を送って計測する
+    make_requestに渡す番号は、ウォームアップを含めてシナリオ内で重複しない
+    """
+    numbers = itertools.count()
+    for _ in range(warmup):
+        method, url, kwargs = make_request(next(numbers))
+        await client.request(method, url, **kwargs)
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = itertools.count()
+
+    async def worker() -> None:
+        while next(remaining) < requests:
+            method, url, kwargs = make_request(next(numbers))
+            started_at = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started_at)
+            statuses[response.status_code] += 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - started_at)
+
+
+async def run_app(app, run: Callable[[httpx.AsyncClient], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """アプリの起動・終了処理を実行し、その間インプロセスのASGIクライアントでrunを実行する"""
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            return await run(client)
+    finally:
+        await app.router.shutdown()
+
+
+def service_main(seed: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 run: Callable[[Dict[str, Any]], Dict[str, Any]]) -> None:
+    """
+    サービスごとのプロセスの入口
+    --config: 実行条件（JSON）、--result-file: 結果の書き出し先、--mode: seed / run / all
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", required=True)
+    parser.add_argument("--result-file", required=True)
+    parser.add_argument("--mode", choices=("seed", "run", "all"), default="all")
+    args = parser.parse_args()
+    config = json.loads(args.config)
+
+    result: Dict[str, Any] = {}
+    if args.mode in ("seed", "all"):
+        result["seed"] = seed(config)
+    if args.mode in ("run", "all"):
+        result["scenarios"] = run(config)
+    with open(args.result_file, "w", encoding="utf-8") as file:
+        json.dump(result, file, ensure_ascii=False)
@@ -0,0 +1,228 @@
+"""
+task-serviceのデータ投入と負荷試験（python -m benchmarks.load から、サービスごとのプロセスで実行する）
+
+データ投入: ユーザー × タスク × サブタスク × 日数分の日次計画値・作業記録を、バッチ単位の一括INSERTで登録し、
+作業実績集計テーブルを作り直す。ユーザーIDは user_id_offset から連番で、既存の同じ範囲のデータは削除してから登録する。
+負荷試験: 各ユーザーのJWTを作成し、GET /tasks/、GET /tasks/{task_id}、POST /subtasks/{subtask_id}/record-works を計測する。
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+TASK_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "services", "task-service")
+sys.path.insert(0, TASK_SERVICE_DIR)
+# アクセスログの出力量で結果がぶれないようにする（環境変数で指定した場合はそちらを使う）
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from jose import jwt  # noqa: E402
+from sqlalchemy import delete, func, insert, select  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.crud import stats as crud_stats  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import models  # noqa: E402
+
+from benchmarks.load.common import run_app, run_scenario, service_main  # noqa: E402
+
+START_DATE = date(2025, 1, 1)
+
+
+def _user_id_range(config: Dict[str, Any]) -> Tuple[int, int]:
+    first = config["user_id_offset"]
+    return first, first + config["users"] - 1
+
+
+def _bulk_insert(db, model, rows: Iterable[Dict[str, Any]], batch_size: int) -> int:
+    """batch_size行ずつ、1文のexecutemanyで登録する（psycopg2ではexecute_valuesの複数行INSERTになる）"""
+    count = 0
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.execute(insert(model), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(model), batch)
+        count += len(batch)
+    return count
+
+
+def _delete_seeded(db, first_user_id: int, last_user_id: int) -> None:
+    task_ids = select(models.Task.task_id).where(models.Task.user_id.between(first_user_id, last_user_id))
+    subtask_ids = select(models.Subtask.subtask_id).where(models.Subtask.task_id.in_(task_ids))
+    for statement in (
+        delete(models.RecordWork).where(models.RecordWork.subtask_id.in_(subtask_ids)),
+        delete(models.SubtaskStats).where(models.SubtaskStats.task_id.in_(task_ids)),
+        delete(models.TaskStats).where(models.TaskStats.task_id.in_(task_ids)),
+        delete(models.DailyTaskPlan).where(models.DailyTaskPlan.task_id.in_(task_ids)),
+        delete(models.DailyTimePlan).where(models.DailyTimePlan.task_id.in_(task_ids)),
+        delete(models.Subtask).where(models.Subtask.task_id.in_(task_ids)),
+        delete(models.Task).where(models.Task.user_id.between(first_user_id, last_user_id)),
+    ):
+        db.execute(statement.execution_options(synchronize_session=False))
+
+
+def seed(config: Dict[str, Any]) -> Dict[str, Any]:
+    """ユーザー × タスク × サブタスク × 日数分のデータを登録する"""
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(config["seed"])
+    first_user_id, last_user_id = _user_id_range(config)
+    batch_size = config["batch_size"]
+    days = [START_DATE + timedelta(days=i) for i in range(config["days"])]
+    started_at = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        _delete_seeded(db, first_user_id, last_user_id)
+        counts = {"tasks": _bulk_insert(db, models.Task, (
+            {
+                "user_id": user_id,
+                "task_name": f"benchmark task {n}",
+                "task_content": "benchmark",
+                "recent_schedule": "",
+                "start_date": days[0],
+                "due_date": days[-1],
+                "category": "benchmark",
+                "target_time": 60 * len(days),
+                "comment": "",
+            }
+            for user_id in range(first_user_id, last_user_id + 1)
+            for n in range(config["tasks"])
+        ), batch_size)}
+        task_ids = db.execute(
+            select(models.Task.task_id)
+            .where(models.Task.user_id.between(first_user_id, last_user_id))
+            .order_by(models.Task.task_id)
+        ).scalars().all()
+
+        counts["daily_task_plans"] = _bulk_insert(db, models.DailyTaskPlan, (
+            {"task_id": task_id, "date": day, "task_plan_value": 100 / len(days)} for task_id in task_ids for day in days
+        ), batch_size)
+        counts["daily_time_plans"] = _bulk_insert(db, models.DailyTimePlan, (
+            {"task_id": task_id, "date": day, "time_plan_value": 60} for task_id in task_ids for day in days
+        ), batch_size)
+
+        subtask_count = config["subtasks"]
+        counts["subtasks"] = _bulk_insert(db, models.Subtask, (
+            {
+                "task_id": task_id,
+                "subtask_name": f"benchmark subtask {n}",
+                # 貢献値の合計を100にする（端数は最初のサブタスクに寄せる）
+                "contribution_value": 100 // subtask_count + (100 % subtask_count if n == 0 else 0),
+            }
+            for task_id in task_ids
+            for n in range(subtask_count)
+        ), batch_size)
+        subtasks = db.execute(
+            select(models.Subtask.subtask_id, models.Subtask.contribution_value)
+            .where(models.Subtask.task_id.in_(task_ids))
+        ).all()
+
+        # 作業量は、日数分の合計がサブタスクの貢献値になるように配分する
+        counts["record_works"] = _bulk_insert(db, models.RecordWork, (
+            {
+                "subtask_id": subtask.subtask_id,
+                "date": day,
+                "work": subtask.contribution_value // len(days) + (1 if i < subtask.contribution_value % len(days) else 0),
+                "work_time": rng.randint(10, 90),
+            }
+            for subtask in subtasks
+            for i, day in enumerate(days)
+        ), batch_size)
+        db.commit()
+
+        crud_stats.rebuild_stats(db, fix=True)
+    finally:
+        db.close()
+
+    return {**counts, "seconds": round(time.perf_counter() - started_at, 3)}
+
+
+def _load_seeded(config: Dict[str, Any]):
+    """ユーザーごとのタスクID・サブタスクIDと、登録済みの作業記録の最終日を取得する"""
+    first_user_id, last_user_id = _user_id_range(config)
+    db = SessionLocal()
+    try:
+        tasks = db.execute(
+            select(models.Task.user_id, models.Task.task_id)
+            .where(models.Task.user_id.between(first_user_id, last_user_id))
+            .order_by(models.Task.task_id)
+        ).all()
+        subtasks = db.execute(
+            select(models.Task.user_id, models.Subtask.subtask_id)
+            .join(models.Subtask, models.Subtask.task_id == models.Task.task_id)
+            .where(models.Task.user_id.between(first_user_id, last_user_id))
+            .order_by(models.Subtask.subtask_id)
+        ).all()
+        last_date = db.execute(
+            select(func.max(models.RecordWork.date))
+            .join(models.Subtask, models.Subtask.subtask_id == models.RecordWork.subtask_id)
+            .join(models.Task, models.Task.task_id == models.Subtask.task_id)
+            .where(models.Task.user_id.between(first_user_id, last_user_id))
+        ).scalar()
+    finally:
+        db.close()
+
+    if not tasks:
+        raise SystemExit("ベンチマーク用のデータがありません。先に seed を実行してください")
+    task_ids_by_user: Dict[int, List[int]] = {}
+    for row in tasks:
+        task_ids_by_user.setdefault(row.user_id, []).append(row.task_id)
+    return task_ids_by_user, [(row.user_id, row.subtask_id) for row in subtasks], last_date or START_DATE
+
+
+def run(config: Dict[str, Any]) -> Dict[str, Any]:
+    task_ids_by_user, subtasks, last_date = _load_seeded(config)
+    user_ids = sorted(task_ids_by_user)
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    headers = {
+        user_id: {"Authorization": "Bearer " + jwt.encode(
+            {"sub": f"benchmark_user_{user_id}", "uid": user_id, "exp": expires_at},
+            settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )}
+        for user_id in user_ids
+    }
+
+    def list_tasks(n: int):
+        user_id = user_ids[n % len(user_ids)]
+        return "GET", "/api/v1/tasks/", {"headers": headers[user_id]}
+
+    def get_task(n: int):
+        user_id = user_ids[n % len(user_ids)]
+        task_ids = task_ids_by_user[user_id]
+        return "GET", f"/api/v1/tasks/{task_ids[(n // len(user_ids)) % len(task_ids)]}", {"headers": headers[user_id]}
+
+    def create_record_work(n: int):
+        # (subtask_id, date) が重複しないよう、登録済みの最終日より後の日付を順に使う
+        user_id, subtask_id = subtasks[n % len(subtasks)]
+        work_date = last_date + timedelta(days=1 + n // len(subtasks))
+        return "POST", f"/api/v1/subtasks/{subtask_id}/record-works", {
+            "headers": headers[user_id],
+            "json": {"date": work_date.isoformat(), "work": 0, "work_time": 30},
+        }
+
+    scenarios = {
+        "GET /api/v1/tasks/": list_tasks,
+        "GET /api/v1/tasks/{task_id}": get_task,
+        "POST /api/v1/subtasks/{subtask_id}/record-works": create_record_work,
+    }
+
+    async def run_all(client) -> Dict[str, Any]:
+        results = {}
+        for name, make_request in scenarios.items():
+            results[name] = await run_scenario(
+                client, make_request, config["requests"], config["concurrency"], config["warmup"]
+            )
+        return results
+
+    return asyncio.run(run_app(app, run_all))
+
+
+if __name__ == "__main__":
+    service_main(seed, run)
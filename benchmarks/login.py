@@ -0,0 +1,106 @@
+"""
+ログイン（パスワード検証）のベンチマーク
+
+認証サービスの authenticate_user を、ログインのルートと同じくイベントループ上から同時に呼び出し（同時実行数は--concurrency）、
+パスワードハッシュ用プロセスプールのプロセス数ごとに、1秒あたりのログイン数と1コアあたりのログイン数を計測する。
+同時実行数がプロセス数 + PASSWORD_HASH_MAX_QUEUE を超えた分は503（混雑）として数える。
+
+使い方（リポジトリのルートで実行）:
+    python benchmarks/login.py
+    python benchmarks/login.py --rounds 12 --workers 1 2 4 --logins 200 --concurrency 32
+
+DATABASE_URLを指定しない場合は、一時ディレクトリのSQLiteを使う。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+AUTH_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services", "auth-service")
+sys.path.insert(0, AUTH_SERVICE_DIR)
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_login.db')}?check_same_thread=false"
+)
+
+from fastapi import HTTPException  # noqa: E402
+
+from app.core import password_hasher  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.security import authenticate_user  # noqa: E402
+from app.db.session import Base, SessionLocal, engine  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+BENCH_USERNAME = "benchmark_login_user"
+BENCH_PASSWORD = "benchmark-password"
+
+
+async def login_once(slots: asyncio.Semaphore) -> str:
+    async with slots:
+        db = SessionLocal()
+        try:
+            return "ok" if await authenticate_user(db, BENCH_USERNAME, BENCH_PASSWORD) else "failed"
+        except HTTPException as e:
+            return "busy" if e.status_code == 503 else "failed"
+        finally:
+            db.close()
+
+
+async def login_all(logins: int, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(login_once(slots) for _ in range(logins)))
+
+
+def run(workers: int, logins: int, concurrency: int):
+    password_hasher.shutdown()
+    settings.PASSWORD_HASH_WORKERS = workers
+    password_hasher.start()
+    # ワーカープロセスの起動を待つ
+    asyncio.run(password_hasher.hash_password("warmup"))
+
+    started_at = time.perf_counter()
+    results = asyncio.run(login_all(logins, concurrency))
+    elapsed = time.perf_counter() - started_at
+    return elapsed, results.count("ok"), results.count("busy"), results.count("failed")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=settings.BCRYPT_ROUNDS, help="bcryptのコスト")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16, help="同時に実行するログインの数")
+    args = parser.parse_args()
+
+    settings.BCRYPT_ROUNDS = args.rounds
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.username == BENCH_USERNAME).delete()
+        db.add(User(username=BENCH_USERNAME, password=asyncio.run(password_hasher.hash_password(BENCH_PASSWORD))))
+        db.commit()
+    finally:
+        db.close()
+
+    print(f"bcrypt rounds={args.rounds}  logins={args.logins}  concurrency={args.concurrency}  "
+          f"max_queue={settings.PASSWORD_HASH_MAX_QUEUE}  cpu={os.cpu_count()}")
+    print(f"{'workers':>7} {'seconds':>8} {'ok':>5} {'busy':>5} {'failed':>6} {'logins/s':>9} {'logins/s/core':>14}")
+    try:
+        for workers in args.workers:
+            elapsed, ok, busy, failed = run(workers, args.logins, args.concurrency)
+            per_second = ok / elapsed
+            cores = min(workers, os.cpu_count() or 1)
+            print(f"{workers:>7} {elapsed:>8.2f} {ok:>5} {busy:>5} {failed:>6} {per_second:>9.1f} {per_second / cores:>14.1f}")
+    finally:
+        password_hasher.shutdown()
+        db = SessionLocal()
+        try:
+            db.query(User).filter(User.username == BENCH_USERNAME).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
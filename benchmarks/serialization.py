@@ -0,0 +1,156 @@
+"""
+タスク一覧レスポンスの組み立て・JSON変換のベンチマーク
+
+1ページ分のタスク（既定1,000件）について、次の2つの方式で
+「DBからの読み込み」と「レスポンスのJSONバイト列への変換」にかかる時間を比較する。
+- 変更前: ORMで全列を読み込み → schemas.Task を組み立て → FastAPIがresponse_modelで再検証 → jsonable_encoder + json.dumps
+- 変更後: 一覧に必要な列だけを行として読み込み → 辞書を組み立て → orjson
+
+使い方（リポジトリのルートで実行）:
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --tasks 1000 --subtasks 5 --text-size 2000 --repeat 20
+
+DATABASE_URLを指定しない場合は、一時ディレクトリのSQLiteを使う。
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+TASK_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services", "task-service")
+sys.path.insert(0, TASK_SERVICE_DIR)
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_serialization.db')}?check_same_thread=false"
+)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.api.v1.tasks import _render_json  # noqa: E402
+from app.crud import task as crud_task  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import models  # noqa: E402
+from app.schemas import task as schemas  # noqa: E402
+
+BENCH_USER_ID = 999998
+
+
+def seed(task_count: int, subtask_count: int, text_size: int) -> None:
+    """ベンチマーク用ユーザーのタスク・サブタスクをまとめて登録する"""
+    text = "あ" * text_size
+    start = date(2025, 1, 1)
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.Task), [
+            {
+                "user_id": BENCH_USER_ID,
+                "task_name": f"benchmark task {i}",
+                "task_content": text,
+                "recent_schedule": text,
+                "start_date": start,
+                "due_date": start + timedelta(days=i % 365),
+                "category": "benchmark",
+                "target_time": 600,
+                "comment": text,
+            }
+            for i in range(task_count)
+        ])
+        task_ids = db.execute(
+            select(models.Task.task_id).where(models.Task.user_id == BENCH_USER_ID)
+        ).scalars().all()
+        contribution = 100 // subtask_count
+        db.execute(insert(models.Subtask), [
+            {"task_id": task_id, "subtask_name": f"subtask {i}", "contribution_value": contribution}
+            for task_id in task_ids
+            for i in range(subtask_count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def legacy_load(db, limit: int) -> List[schemas.Task]:
+    """比較用: 変更前の読み込み（ORMで全列を読み込み、schemas.Taskに変換）"""
+    db_tasks = db.query(models.Task).filter(models.Task.user_id == BENCH_USER_ID).order_by(
+        models.Task.due_date.asc().nullslast(), models.Task.task_id.asc()
+    ).limit(limit).all()
+    return crud_task.load_task_details(db, db_tasks)
+
+
+_legacy_field = create_response_field(name="Response_get_tasks", type_=List[schemas.Task])
+
+
+def legacy_render(tasks: List[schemas.Task]) -> bytes:
+    """比較用: 変更前のJSON変換（response_modelでの再検証 → jsonable_encoder → json.dumps）"""
+    content = asyncio.run(serialize_response(field=_legacy_field, response_content=tasks))
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def lean_load(db, limit: int):
+    task_rows, _ = crud_task.get_tasks(db, user_id=BENCH_USER_ID, limit=limit)
+    return crud_task.load_task_summaries(db, task_rows)
+
+
+def measure(load, render, limit: int, repeat: int):
+    load_timings, render_timings = [], []
+    body = b""
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            started_at = time.perf_counter()
+            tasks = load(db, limit)
+            loaded_at = time.perf_counter()
+            body = render(tasks)
+            rendered_at = time.perf_counter()
+        finally:
+            db.close()
+        load_timings.append((loaded_at - started_at) * 1000)
+        render_timings.append((rendered_at - loaded_at) * 1000)
+    return statistics.median(load_timings), statistics.median(render_timings), len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1000, help="1ページのタスク数")
+    parser.add_argument("--subtasks", type=int, default=5, help="タスクあたりのサブタスク数")
+    parser.add_argument("--text-size", type=int, default=1000, help="task_content・recent_schedule・commentの文字数")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    seed(args.tasks, args.subtasks, args.text_size)
+    print(f"DB: {engine.url.get_backend_name()}  tasks={args.tasks}  subtasks={args.subtasks}  "
+          f"text_size={args.text_size}  repeat={args.repeat}")
+    print(f"{'path':>8} {'load ms':>9} {'serialize ms':>13} {'total ms':>9} {'bytes':>10}")
+    try:
+        results = {}
+        for name, load, render in (("legacy", legacy_load, legacy_render), ("lean", lean_load, _render_json)):
+            load_ms, render_ms, size = measure(load, render, args.tasks, args.repeat)
+            results[name] = (load_ms, render_ms)
+            print(f"{name:>8} {load_ms:>9.2f} {render_ms:>13.2f} {load_ms + render_ms:>9.2f} {size:>10}")
+        legacy, lean = results["legacy"], results["lean"]
+        print(f"serialize speedup: {legacy[1] / lean[1]:.1f}x  total speedup: {sum(legacy) / sum(lean):.1f}x")
+    finally:
+        # ベンチマーク用ユーザーのタスクを削除
+        db = SessionLocal()
+        try:
+            task_ids = select(models.Task.task_id).where(models.Task.user_id == BENCH_USER_ID)
+            db.query(models.Subtask).filter(models.Subtask.task_id.in_(task_ids)).delete(synchronize_session=False)
+            db.query(models.Task).filter(models.Task.user_id == BENCH_USER_ID).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
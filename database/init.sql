@@ -42,7 +42,8 @@ CREATE TABLE tasks (
     due_date DATE,
     category VARCHAR(100),
     target_time INTEGER,
-    comment TEXT
+    comment TEXT,
+    revision INTEGER NOT NULL DEFAULT 1 -- タスク・サブタスク・計画値・作業記録の変更ごとに1つ進める（ETag用）
 );
 
 -- task_authテーブル
@@ -58,8 +59,7 @@ CREATE TABLE daily_task_plans (
     daily_task_plan_id SERIAL PRIMARY KEY,
     task_id INTEGER NOT NULL REFERENCES tasks(task_id) ON DELETE CASCADE,
     date DATE NOT NULL,
-    task_plan_value FLOAT NOT NULL,
-    UNIQUE(task_id, date)
+    task_plan_value FLOAT NOT NULL
 );
 
 -- subtasksテーブル
@@ -76,8 +76,7 @@ CREATE TABLE record_works (
     subtask_id INTEGER NOT NULL REFERENCES subtasks(subtask_id) ON DELETE CASCADE,
     date DATE NOT NULL,
     work INTEGER NOT NULL,
-    work_time INTEGER DEFAULT 0,
-    UNIQUE(subtask_id, date)
+    work_time INTEGER DEFAULT 0
 );
 
 -- daily_time_plansテーブル
@@ -85,8 +84,24 @@ CREATE TABLE daily_time_plans (
     daily_time_plan_id SERIAL PRIMARY KEY,
     task_id INTEGER NOT NULL REFERENCES tasks(task_id) ON DELETE CASCADE,
     date DATE NOT NULL,
-    time_plan_value FLOAT NOT NULL,
-    UNIQUE(task_id, date)
+    time_plan_value FLOAT NOT NULL
+);
+
+-- subtask_statsテーブル（record_worksのサブタスク単位の集計、作業記録の変更時に差分更新）
+CREATE TABLE subtask_stats (
+    subtask_id INTEGER PRIMARY KEY REFERENCES subtasks(subtask_id) ON DELETE CASCADE,
+    task_id INTEGER NOT NULL REFERENCES tasks(task_id) ON DELETE CASCADE,
+    total_work INTEGER NOT NULL DEFAULT 0,
+    total_work_time INTEGER NOT NULL DEFAULT 0,
+    work_days INTEGER NOT NULL DEFAULT 0
+);
+
+-- task_statsテーブル（record_worksのタスク単位の集計、作業記録の変更時に差分更新）
+CREATE TABLE task_stats (
+    task_id INTEGER PRIMARY KEY REFERENCES tasks(task_id) ON DELETE CASCADE,
+    total_work INTEGER NOT NULL DEFAULT 0,
+    total_work_time INTEGER NOT NULL DEFAULT 0,
+    total_work_records INTEGER NOT NULL DEFAULT 0
 );
 
 -- インデックスの作成
@@ -94,12 +109,25 @@ CREATE INDEX idx_user_group_user_id ON user_group(user_id);
 CREATE INDEX idx_user_group_group_id ON user_group(group_id);
 CREATE INDEX idx_task_auth_task_id ON task_auth(task_id);
 CREATE INDEX idx_task_auth_group_id ON task_auth(group_id);
-CREATE INDEX idx_tasks_user_id ON tasks(user_id);
-CREATE INDEX idx_daily_task_plans_task_id ON daily_task_plans(task_id);
-CREATE INDEX idx_subtasks_task_id ON subtasks(task_id);
-CREATE INDEX idx_record_works_subtask_id ON record_works(subtask_id);
+CREATE INDEX idx_tasks_user_id_task_id ON tasks(user_id, task_id);
+CREATE INDEX idx_tasks_user_id_due_date_task_id ON tasks(user_id, due_date, task_id);
+CREATE INDEX idx_subtasks_task_id_subtask_id ON subtasks(task_id, subtask_id) INCLUDE (contribution_value);
 CREATE INDEX idx_record_works_date ON record_works(date);
-CREATE INDEX idx_daily_time_plans_task_id ON daily_time_plans(task_id);
+CREATE INDEX idx_subtask_stats_task_id ON subtask_stats(task_id);
+
+-- (task_id, date)・(subtask_id, date) の一意性は、値をINCLUDEしたユニークインデックスで保証する
+-- （日付順の取得・集計をIndex Only Scanにする。ON CONFLICT (task_id, date) などもこのインデックスで動作する）
+CREATE UNIQUE INDEX daily_task_plans_task_id_date_key ON daily_task_plans(task_id, date) INCLUDE (task_plan_value);
+CREATE UNIQUE INDEX daily_time_plans_task_id_date_key ON daily_time_plans(task_id, date) INCLUDE (time_plan_value);
+CREATE UNIQUE INDEX record_works_subtask_id_date_key ON record_works(subtask_id, date) INCLUDE (work, work_time);
+
+-- マイグレーションの適用状況（このスキーマは database/migrations のheadと同じ）
+-- スキーマを変更したら、マイグレーションを追加してここのリビジョンも更新する
+CREATE TABLE alembic_version (
+    version_num VARCHAR(32) NOT NULL,
+    CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
+);
+INSERT INTO alembic_version (version_num) VALUES ('0002_composite_covering_indexes');
 
 -- サンプルデータの挿入
 -- ユーザーデータ
@@ -176,6 +204,17 @@ INSERT INTO record_works (subtask_id, date, work, work_time) VALUES
 (9, '2023-02-02', 6, 240),
 (11, '2023-01-16', 4, 200);
 
+-- 作業実績集計（サンプルの実績記録から作成）
+INSERT INTO subtask_stats (subtask_id, task_id, total_work, total_work_time, work_days)
+SELECT rw.subtask_id, s.task_id, SUM(rw.work), SUM(rw.work_time), COUNT(*)
+FROM record_works rw JOIN subtasks s ON s.subtask_id = rw.subtask_id
+GROUP BY rw.subtask_id, s.task_id;
+
+INSERT INTO task_stats (task_id, total_work, total_work_time, total_work_records)
+SELECT task_id, SUM(total_work), SUM(total_work_time), SUM(work_days)
+FROM subtask_stats
+GROUP BY task_id;
+
 -- 日次時間計画
 INSERT INTO daily_time_plans (task_id, date, time_plan_value) VALUES
 (1, '2023-01-05', 2.0),
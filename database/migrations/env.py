@@ -0,0 +1,79 @@
+"""
+Alembicの実行環境
+
+- 接続先は環境変数DATABASE_URL（未指定ならalembic.iniのsqlalchemy.url）
+- マイグレーションの適用（upgrade / downgrade）はサービスのコードを読み込まない
+- --autogenerate の場合のみ、task-serviceのモデル（app.models.models）と比較する
+  （users / groups / user_group / task_auth はtask-serviceのモデルにないため、比較の対象外にする）
+"""
+import os
+import sys
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"])
+
+TASK_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "services", "task-service")
+
+
+def _load_target_metadata():
+    if not getattr(config.cmd_opts, "autogenerate", False):
+        return None
+    sys.path.insert(0, TASK_SERVICE_DIR)
+    from app.models import models
+
+    return models.Base.metadata
+
+
+target_metadata = _load_target_metadata()
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """task-serviceのモデルにないテーブルと、それを参照する外部キー（tasks.user_id → usersなど）は比較しない"""
+    if reflected and compare_to is None:
+        if type_ == "table":
+            return False
+        if type_ == "foreign_key_constraint" and object.referred_table.name not in target_metadata.tables:
+            return False
+    return True
+
+
+def run_migrations_offline():
+    """SQLを出力する（alembic upgrade head --sql）"""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section), prefix="sqlalchemy.", poolclass=pool.NullPool
+    )
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            compare_type=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,130 @@
+"""baseline: database/init.sql のスキーマ
+
+マイグレーション管理の前（alembic_versionテーブルがない）のinit.sqlで作成したデータベースは、
+このリビジョンを適用済みとして記録してから最新にする（現在のinit.sqlはheadのリビジョンを記録する）:
+    alembic stamp 0001_baseline
+    alembic upgrade head
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2025-06-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("user_id", sa.Integer, primary_key=True),
+        sa.Column("username", sa.String(255), nullable=False, unique=True),
+        sa.Column("password", sa.String(255), nullable=False),
+    )
+    op.create_table(
+        "groups",
+        sa.Column("group_id", sa.Integer, primary_key=True),
+        sa.Column("groupname", sa.String(255), nullable=False, unique=True),
+    )
+    op.create_table(
+        "user_group",
+        sa.Column("user_group_id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("group_id", sa.Integer, sa.ForeignKey("groups.group_id", ondelete="CASCADE"), nullable=False),
+        sa.UniqueConstraint("user_id", "group_id"),
+    )
+    op.create_table(
+        "tasks",
+        sa.Column("task_id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.user_id"), nullable=False),
+        sa.Column("task_name", sa.String(255), nullable=False),
+        sa.Column("task_content", sa.Text),
+        sa.Column("recent_schedule", sa.Text),
+        sa.Column("start_date", sa.Date),
+        sa.Column("due_date", sa.Date),
+        sa.Column("category", sa.String(100)),
+        sa.Column("target_time", sa.Integer),
+        sa.Column("comment", sa.Text),
+        sa.Column("revision", sa.Integer, nullable=False, server_default="1"),
+    )
+    op.create_table(
+        "task_auth",
+        sa.Column("task_auth_id", sa.Integer, primary_key=True),
+        sa.Column("task_id", sa.Integer, sa.ForeignKey("tasks.task_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("group_id", sa.Integer, sa.ForeignKey("groups.group_id", ondelete="CASCADE")),
+        sa.Column("group_auth", sa.String(50), nullable=False),
+        sa.CheckConstraint("group_auth IN ('read', 'write', 'admin')"),
+    )
+    op.create_table(
+        "daily_task_plans",
+        sa.Column("daily_task_plan_id", sa.Integer, primary_key=True),
+        sa.Column("task_id", sa.Integer, sa.ForeignKey("tasks.task_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("date", sa.Date, nullable=False),
+        sa.Column("task_plan_value", sa.Float, nullable=False),
+        sa.UniqueConstraint("task_id", "date", name="daily_task_plans_task_id_date_key"),
+    )
+    op.create_table(
+        "subtasks",
+        sa.Column("subtask_id", sa.Integer, primary_key=True),
+        sa.Column("task_id", sa.Integer, sa.ForeignKey("tasks.task_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("subtask_name", sa.String(255), nullable=False),
+        sa.Column("contribution_value", sa.Integer),
+    )
+    op.create_table(
+        "record_works",
+        sa.Column("record_work_id", sa.Integer, primary_key=True),
+        sa.Column("subtask_id", sa.Integer, sa.ForeignKey("subtasks.subtask_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("date", sa.Date, nullable=False),
+        sa.Column("work", sa.Integer, nullable=False),
+        sa.Column("work_time", sa.Integer, server_default="0"),
+        sa.UniqueConstraint("subtask_id", "date", name="record_works_subtask_id_date_key"),
+    )
+    op.create_table(
+        "daily_time_plans",
+        sa.Column("daily_time_plan_id", sa.Integer, primary_key=True),
+        sa.Column("task_id", sa.Integer, sa.ForeignKey("tasks.task_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("date", sa.Date, nullable=False),
+        sa.Column("time_plan_value", sa.Float, nullable=False),
+        sa.UniqueConstraint("task_id", "date", name="daily_time_plans_task_id_date_key"),
+    )
+    op.create_table(
+        "subtask_stats",
+        sa.Column("subtask_id", sa.Integer, sa.ForeignKey("subtasks.subtask_id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("task_id", sa.Integer, sa.ForeignKey("tasks.task_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("total_work", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("total_work_time", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("work_days", sa.Integer, nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "task_stats",
+        sa.Column("task_id", sa.Integer, sa.ForeignKey("tasks.task_id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("total_work", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("total_work_time", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("total_work_records", sa.Integer, nullable=False, server_default="0"),
+    )
+
+    op.create_index("idx_user_group_user_id", "user_group", ["user_id"])
+    op.create_index("idx_user_group_group_id", "user_group", ["group_id"])
+    op.create_index("idx_task_auth_task_id", "task_auth", ["task_id"])
+    op.create_index("idx_task_auth_group_id", "task_auth", ["group_id"])
+    op.create_index("idx_tasks_user_id", "tasks", ["user_id"])
+    op.create_index("idx_tasks_user_id_due_date_task_id", "tasks", ["user_id", "due_date", "task_id"])
+    op.create_index("idx_daily_task_plans_task_id", "daily_task_plans", ["task_id"])
+    op.create_index("idx_subtasks_task_id", "subtasks", ["task_id"])
+    op.create_index("idx_record_works_subtask_id", "record_works", ["subtask_id"])
+    op.create_index("idx_record_works_date", "record_works", ["date"])
+    op.create_index("idx_daily_time_plans_task_id", "daily_time_plans", ["task_id"])
+    op.create_index("idx_subtask_stats_task_id", "subtask_stats", ["task_id"])
+
+
+def downgrade():
+    for table in (
+        "task_stats", "subtask_stats", "daily_time_plans", "record_works", "subtasks",
+        "daily_task_plans", "task_auth", "tasks", "user_group", "groups", "users",
+    ):
+        op.drop_table(table)
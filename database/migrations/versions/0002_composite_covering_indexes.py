@@ -0,0 +1,75 @@
+"""composite and covering indexes for the hot queries
+
+よく実行するクエリの絞り込み・並び順に合わせて、複合インデックスとカバリングインデックス（INCLUDE）に置き換える。
+- record_works: (subtask_id, date) のユニーク制約を、INCLUDE (work, work_time) 付きのユニークインデックスにする
+  サブタスクごとの作業記録一覧（date順）・集計（SUM）・バーンダウン・一括登録の既存行検索が、
+  テーブルを読まないIndex Only Scanになる。先頭列が同じ idx_record_works_subtask_id は不要になるため削除する
+- daily_task_plans / daily_time_plans: (task_id, date) のユニーク制約を、計画値をINCLUDEしたユニークインデックスにし、
+  idx_daily_*_plans_task_id を削除する（task_idでの絞り込み・date順の並びはユニークインデックスで行う）
+- subtasks: idx_subtasks_task_id を (task_id, subtask_id) INCLUDE (contribution_value) にする（task_idで絞り込み、subtask_id順）
+- tasks: idx_tasks_user_id を (user_id, task_id) にする（order_by=task_id のキーセットページネーション）
+  due_date順は既存の idx_tasks_user_id_due_date_task_id を使う
+
+INSERT ... ON CONFLICT (subtask_id, date) は、制約ではなくユニークインデックスでも同じように動作する。
+INCLUDEはPostgreSQL 11以降。PostgreSQL以外では、ユニーク制約はそのままにして複合インデックスのみ作成する。
+インデックスの作り直しの間は対象テーブルへの書き込みが止まるため、件数が多い環境ではメンテナンス時間に適用する。
+
+Revision ID: 0002_composite_covering_indexes
+Revises: 0001_baseline
+Create Date: 2025-06-15 00:00:00
+"""
+from alembic import op
+
+
+revision = "0002_composite_covering_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+# (テーブル, ユニークキー名, キー列, INCLUDEする列, 置き換えで不要になるインデックス, その列)
+UNIQUE_KEYS = (
+    ("record_works", "record_works_subtask_id_date_key", ["subtask_id", "date"], ["work", "work_time"],
+     "idx_record_works_subtask_id", ["subtask_id"]),
+    ("daily_task_plans", "daily_task_plans_task_id_date_key", ["task_id", "date"], ["task_plan_value"],
+     "idx_daily_task_plans_task_id", ["task_id"]),
+    ("daily_time_plans", "daily_time_plans_task_id_date_key", ["task_id", "date"], ["time_plan_value"],
+     "idx_daily_time_plans_task_id", ["task_id"]),
+)
+
+# (テーブル, 作成するインデックス, 列, INCLUDEする列, 置き換えで不要になるインデックス, その列)
+COMPOSITE_INDEXES = (
+    ("subtasks", "idx_subtasks_task_id_subtask_id", ["task_id", "subtask_id"], ["contribution_value"],
+     "idx_subtasks_task_id", ["task_id"]),
+    ("tasks", "idx_tasks_user_id_task_id", ["user_id", "task_id"], [],
+     "idx_tasks_user_id", ["user_id"]),
+)
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade():
+    postgresql = _is_postgresql()
+    for table, name, columns, include, replaced_index, _ in UNIQUE_KEYS:
+        if postgresql:
+            op.drop_constraint(name, table, type_="unique")
+            op.create_index(name, table, columns, unique=True, postgresql_include=include)
+        op.drop_index(replaced_index, table_name=table)
+
+    for table, name, columns, include, replaced_index, _ in COMPOSITE_INDEXES:
+        op.create_index(name, table, columns, postgresql_include=include)
+        op.drop_index(replaced_index, table_name=table)
+
+
+def downgrade():
+    postgresql = _is_postgresql()
+    for table, name, _, _, replaced_index, replaced_columns in reversed(COMPOSITE_INDEXES):
+        op.create_index(replaced_index, table, replaced_columns)
+        op.drop_index(name, table_name=table)
+
+    for table, name, columns, _, replaced_index, replaced_columns in reversed(UNIQUE_KEYS):
+        op.create_index(replaced_index, table, replaced_columns)
+        if postgresql:
+            op.drop_index(name, table_name=table)
+            op.create_unique_constraint(name, table, columns)
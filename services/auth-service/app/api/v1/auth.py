@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
@@ -10,17 +11,32 @@ from ...core.security import (
     create_access_token,
     get_current_active_user,
     get_password_hash,
+    get_user_by_username,
+    update_password,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
+from ...core.user_cache import invalidate_user
 from ...schemas.user import User, UserCreate, Token, UserUpdate
 from ...models.user import User as UserModel
 
 router = APIRouter()
 
+def _add_user(db: Session, username: str, hashed_password: str) -> UserModel:
+    db_user = UserModel(
+        username=username,
+        password=hashed_password
+    )
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+# 登録・ログイン・パスワード変更はasync defにして、bcryptの処理（プロセスプール）をイベントループ上で待つ
+# （待っている間にリクエスト用のスレッドを占有しない）。DBの処理はスレッドプールで実行する
 @router.post("/auth/register", response_model=User, status_code=status.HTTP_201_CREATED)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     # ユーザー名の重複チェック
-    db_user = db.query(UserModel).filter(UserModel.username == user.username).first()
+    db_user = await run_in_threadpool(get_user_by_username, db, user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,23 +44,16 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # ユーザーの作成
-    password = get_password_hash(user.password)
-    db_user = UserModel(
-        username=user.username,
-        password=password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    password = await get_password_hash(user.password)
+    return await run_in_threadpool(_add_user, db, user.username, password)
 
 @router.post("/auth/login", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     username: str = Form(...),
     password: str = Form(...),
     db: Session = Depends(get_db)
 ):
-    user = authenticate_user(db, username, password)
+    user = await authenticate_user(db, username, password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,24 +62,34 @@ def login_for_access_token(
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username}, expires_delta=access_token_expires, user_id=user.user_id
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users/me", response_model=User)
-def read_users_me(current_user: UserModel = Depends(get_current_active_user)):
+def read_users_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
 @router.put("/users/me", response_model=User)
-def update_user(
+async def update_user(
     user_update: UserUpdate,
-    current_user: UserModel = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ):
+    # current_userはキャッシュされたユーザー情報のため、更新対象はこのセッションで取得する
+    db_user = await run_in_threadpool(
+        lambda: db.query(UserModel).filter(UserModel.user_id == current_user.user_id).first()
+    )
+    if db_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ユーザーが見つかりません"
+        )
+
     # 更新内容の適用
     if user_update.password:
-        current_user.password = get_password_hash(user_update.password)
+        db_user = await run_in_threadpool(update_password, db, db_user, await get_password_hash(user_update.password))
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user 
\ No newline at end of file
+    # 変更したユーザーのキャッシュを削除する
+    invalidate_user(db_user.user_id)
+    return db_user 
@@ -0,0 +1,37 @@
+"""
+運用コマンド
+
+使い方:
+    python -m app.cli init-db   # テーブルを作成する（ローカル検証用、既存のテーブルはそのまま）
+"""
+import argparse
+import json
+import sys
+
+from .db.session import Base, engine
+from .models import user  # noqa: F401  モデルをBase.metadataに登録する
+
+
+def init_db(args: argparse.Namespace) -> int:
+    """
+    モデルの定義からテーブルを作成する（SQLiteなどのローカル検証用）
+    PostgreSQLのスキーマは database/ のAlembicで管理する（alembic upgrade head）
+    """
+    Base.metadata.create_all(bind=engine)
+    print(json.dumps({"tables": sorted(Base.metadata.tables)}, ensure_ascii=False, indent=2))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="認証サービスの運用コマンド")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = subparsers.add_parser("init-db", help="テーブルを作成する（ローカル検証用）")
+    init_parser.set_defaults(func=init_db)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
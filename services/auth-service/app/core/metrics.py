@@ -0,0 +1,24 @@
+"""
+Prometheus形式のメトリクス（GET /metrics）
+
+レジストリ・HTTPリクエストとSQLのメトリクス・MetricsMiddlewareは共通モジュール（services/common/metrics.py、
+イメージでは /app/common）のものを使い、このモジュールではauth-service固有のコレクタを定義する。
+- プールの利用状況は、スクレイプ時に読み出してゲージにする
+"""
+from typing import Callable, Iterable
+
+from prometheus_client.core import Metric
+from sqlalchemy.engine import Engine
+
+from common.metrics import (  # noqa: F401
+    CONTENT_TYPE, POOL_FIELDS, REGISTRY, MetricsMiddleware, install, register_collector, render, stats_metrics,
+)
+
+from ..db.pool import get_pool_stats
+
+
+def pool_collector(engine: Engine, name: str = "sync") -> Callable[[], Iterable[Metric]]:
+    """get_pool_stats()の値をメトリクスにするコレクタを作成する（poolラベルにnameを付ける）"""
+    def collect() -> Iterable[Metric]:
+        return stats_metrics(get_pool_stats(engine), POOL_FIELDS, ("pool",), (name,))
+    return collect
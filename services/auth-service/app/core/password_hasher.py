@@ -0,0 +1,119 @@
+"""
+パスワードのハッシュ化・検証を行う専用プロセスプール
+
+bcryptは1回あたり数十〜数百ミリ秒CPUを使うため、イベントループやリクエスト用のスレッドプールでは実行せず、
+PASSWORD_HASH_WORKERS個のプロセスで実行する。
+呼び出し側はイベントループ上で結果をawaitする（asyncio.wrap_future）ため、待っている間もリクエスト用のスレッドを使わない。
+実行中＋待機中の件数が PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE を超える場合は、待たずに503を返す
+（ログインが集中しても、待ち時間が際限なく伸びないようにする）。
+コスト（BCRYPT_ROUNDS）を変更した場合は、ログイン成功時に新しいコストでハッシュし直す（needs_rehash）。
+"""
+import asyncio
+import hmac
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _get_context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+# ワーカープロセスで実行する関数（spawnで起動したプロセスから参照できるようにモジュールの直下に置く）
+def _hash(password: str, rounds: int) -> str:
+    return _get_context(rounds).hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return _get_context(settings.BCRYPT_ROUNDS).verify(password, hashed)
+
+
+def _get_worker_count() -> int:
+    return settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+
+def start() -> None:
+    """プロセスプールを作成する（起動時に呼ぶと、最初のログインでのプロセス起動待ちがなくなる）"""
+    global _executor, _slots
+    with _lock:
+        if _executor is not None:
+            return
+        workers = _get_worker_count()
+        # fork後のスレッド・DB接続を引き継がないように、spawnでワーカーを起動する
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASH_MAX_QUEUE)
+        # ワーカープロセスの起動とbcryptの読み込みを先に済ませておく（結果は待たない）
+        _executor.submit(_hash, "warmup", 4)
+        logger.info("password hasher started: workers=%d, max_queue=%d", workers, settings.PASSWORD_HASH_MAX_QUEUE)
+
+
+def shutdown() -> None:
+    """プロセスプールを終了する"""
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            return
+        _executor.shutdown(wait=True)
+        _executor = None
+        _slots = None
+
+
+async def _run(fn, *args):
+    """プロセスプールで実行し、イベントループ上で結果を待つ（空きがなければ待たずに503を返す）"""
+    start()
+    slots = _slots
+    if not slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="認証処理が混み合っています。しばらくしてから再度お試しください",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return await asyncio.wrap_future(_executor.submit(fn, *args))
+    finally:
+        slots.release()
+
+
+def is_bcrypt_hash(stored_password: str) -> bool:
+    return stored_password.startswith(("$2a$", "$2b$", "$2y$"))
+
+
+async def hash_password(password: str) -> str:
+    """パスワードを現在のコスト（BCRYPT_ROUNDS）でハッシュ化する"""
+    return await _run(_hash, password, settings.BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, stored_password: str) -> bool:
+    """
+    パスワードを検証する
+    bcryptでハッシュ化されていない（移行前の平文で保存された）パスワードは、そのまま比較する
+    """
+    if not is_bcrypt_hash(stored_password):
+        return hmac.compare_digest(password.encode(), stored_password.encode())
+    return await _run(_verify, password, stored_password)
+
+
+def needs_rehash(stored_password: str) -> bool:
+    """平文で保存されている、またはコストが現在のBCRYPT_ROUNDSと異なる場合にTrueを返す"""
+    if not is_bcrypt_hash(stored_password):
+        return True
+    try:
+        return int(stored_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
@@ -1,45 +1,66 @@
 from datetime import datetime, timedelta
 from typing import Optional
-import os
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from ..schemas.user import TokenData
+from ..schemas.user import TokenData, User as UserSchema
 from ..db.session import get_db
 from sqlalchemy.orm import Session
 from ..models.user import User
+from . import password_hasher
+from .config import settings
+from .user_cache import cache_user, get_cached_user
 
-# 環境変数から秘密鍵を取得、デフォルト値は開発用
-SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-# パスワードハッシュ化用のコンテキスト
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 秘密鍵などはsettings（環境変数）から取得、デフォルト値は開発用
+SECRET_KEY = settings.SECRET_KEY
+ALGORITHM = settings.ALGORITHM
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
 # OAuth2のトークン取得エンドポイント
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-# パスワードの検証
-def verify_password(plain_password, stored_password):
-    # データベースに保存されているパスワードと直接比較
-    return plain_password == stored_password
+# パスワードの検証（bcryptの検証は専用プロセスプールで実行し、イベントループ上で結果を待つ）
+async def verify_password(plain_password, stored_password):
+    return await password_hasher.verify_password(plain_password, stored_password)
+
+# パスワードのハッシュ化（BCRYPT_ROUNDSのコストで、専用プロセスプールで実行し、イベントループ上で結果を待つ）
+async def get_password_hash(password):
+    return await password_hasher.hash_password(password)
 
-# パスワードのハッシュ化 (実際にはハッシュ化しない)
-def get_password_hash(password):
-    return password
+# ユーザー名でユーザーを取得する（ログイン・登録時の重複チェック）
+def get_user_by_username(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+# パスワードのハッシュを保存する（コミット後の属性の再読み込みまでスレッドプールで行う）
+def update_password(db: Session, user: User, hashed_password: str) -> User:
+    user.password = hashed_password
+    db.commit()
+    db.refresh(user)
+    return user
 
 # ユーザー認証
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not verify_password(password, user.password):
+# DBの処理はスレッドプール、パスワードの検証はプロセスプールで実行し、どちらもイベントループ上で待つ
+# 認証に成功したとき、パスワードが平文のまま、またはコストが変わっている場合は、新しいハッシュで保存し直す
+async def authenticate_user(db: Session, username: str, password: str):
+    user = await run_in_threadpool(get_user_by_username, db, username)
+    if not user or not await verify_password(password, user.password):
         return False
+    if password_hasher.needs_rehash(user.password):
+        try:
+            hashed_password = await get_password_hash(password)
+        except HTTPException:
+            # プールが混み合っている場合はハッシュし直しを見送る（次回のログインで行う）
+            return user
+        await run_in_threadpool(update_password, db, user, hashed_password)
     return user
 
 # アクセストークンの作成
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+# user_idを渡すと、ユーザー名が変わっても変わらないuidクレームを含める（task-serviceはuidでユーザーを識別する）
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, user_id: Optional[int] = None):
     to_encode = data.copy()
+    if user_id is not None:
+        to_encode["uid"] = user_id
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -48,8 +69,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# トークンのユーザーをDBから取得する（キャッシュにない場合のみ）
+def _load_user(db: Session, token_data: TokenData) -> Optional[UserSchema]:
+    query = db.query(User.user_id, User.username)
+    if token_data.user_id is not None:
+        row = query.filter(User.user_id == token_data.user_id).first()
+    else:
+        # uidクレームを含まない（変更前に発行された）トークンはユーザー名で取得する
+        row = query.filter(User.username == token_data.username).first()
+    if row is None:
+        return None
+    return UserSchema(user_id=row.user_id, username=row.username)
+
 # 現在のユーザー取得用の依存性
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# uidクレームのユーザーはキャッシュ（TTL付きLRU）から取得し、DBへの問い合わせを省略する
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserSchema:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="認証情報が無効です",
@@ -60,14 +94,27 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+        token_data = TokenData(username=username, user_id=payload.get("uid"))
+    except (JWTError, ValueError):
         raise credentials_exception
-    user = db.query(User).filter(User.username == token_data.username).first()
+
+    if token_data.user_id is not None:
+        user = get_cached_user(token_data.user_id)
+        if user is not None:
+            return user
+
+    user = await run_in_threadpool(_load_user, db, token_data)
     if user is None:
         raise credentials_exception
+    cache_user(user)
     return user
 
 # アクティブユーザー取得用の依存性
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
-    return current_user 
\ No newline at end of file
+async def get_current_active_user(current_user: UserSchema = Depends(get_current_user)) -> UserSchema:
+    return current_user
+
+# 運用・診断用エンドポイントの依存性（ADMIN_USER_IDSのユーザー以外は403）
+async def get_admin_user(current_user: UserSchema = Depends(get_current_user)) -> UserSchema:
+    if current_user.user_id not in settings.ADMIN_USER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="管理者のみ利用できます")
+    return current_user
@@ -0,0 +1,70 @@
+"""
+ユーザー情報のキャッシュ（TTL付きLRU）
+
+get_current_user で、トークンのuidからユーザーを引くたびにDBへ問い合わせないようにする。
+キャッシュするのはユーザーIDとユーザー名のみ（パスワードは保持しない）。
+update_user で変更したユーザーは invalidate_user() で削除する。
+他のレプリカのキャッシュは削除されないため、USER_CACHE_TTL_SECONDS秒を上限に古い値が残ることがある。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .config import settings
+from ..schemas.user import User
+
+
+class _UserCache:
+    """ユーザーID → (ユーザー情報, 有効期限) のLRU"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[User, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user: User) -> None:
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[user.user_id] = (user, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user.user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_user_cache = _UserCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+def get_cached_user(user_id: int) -> Optional[User]:
+    return _user_cache.get(user_id)
+
+
+def cache_user(user: User) -> None:
+    _user_cache.put(user)
+
+
+def invalidate_user(user_id: int) -> None:
+    """ユーザー情報の変更時に、キャッシュから削除する"""
+    _user_cache.invalidate(user_id)
@@ -0,0 +1,109 @@
+"""
+コネクションプールの設定と利用状況の計測
+
+エンジンのプールを TimedQueuePool にして、
+チェックアウト（接続の取り出し）にかかった待ち時間とタイムアウト回数を記録する。
+get_pool_stats() で使用中・待機中・オーバーフロー数と待ち時間を返し、/pool-stats から参照する。
+レプリカ数 × (pool_size + max_overflow) が Postgres の max_connections を超えないように調整する目安にする。
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from ..core.config import settings
+
+# 待ち時間のパーセンタイル計算に使う直近のチェックアウト数
+_RECENT_WAITS = 1000
+
+
+class _PoolWaitStats:
+    """チェックアウト待ち時間の集計（スレッド間で共有するためロックで保護）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.recent_waits_ms: Deque[float] = deque(maxlen=_RECENT_WAITS)
+
+    def record(self, wait_ms: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.recent_waits_ms.append(wait_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self.recent_waits_ms)
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.total_wait_ms / attempts, 3) if attempts else 0.0,
+                "wait_ms_p50": round(recent[len(recent) // 2], 3) if recent else 0.0,
+                "wait_ms_p95": round(recent[int(len(recent) * 0.95)], 3) if recent else 0.0,
+                "wait_ms_max": round(self.max_wait_ms, 3),
+            }
+
+
+class _TimedPoolMixin:
+    """プールからの接続の取り出しにかかった時間（新規接続の確立を含む）を記録する"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = _PoolWaitStats()
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.wait_stats.record((time.perf_counter() - started_at) * 1000, timed_out)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+def get_engine_pool_kwargs() -> Dict[str, Any]:
+    """settingsのプール設定から、create_engine に渡す引数を作成する"""
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def get_pool_stats(engine) -> Dict[str, Any]:
+    """エンジンのプールの利用状況（使用中・待機中・オーバーフロー数と待ち時間）を返す"""
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            # 接続数がpool_sizeを超えている数（負の値はまだ作成されていない枠の数）
+            "overflow": pool.overflow(),
+            "timeout_seconds": pool.timeout(),
+        })
+    if isinstance(pool, _TimedPoolMixin):
+        stats.update(pool.wait_stats.to_dict())
+    return stats
@@ -0,0 +1,104 @@
+"""
+起動時のウォームアップと、準備完了（/readyz）の判定
+
+起動直後のログインが、接続の確立やSQLのコンパイル・マッパーの初期化を待たないように、起動時（startup）に次を行う。
+- DB_WARMUP_CONNECTIONS 本の接続を開いてプールに戻しておく（DB_POOL_SIZEまで）
+- ログイン・トークン検証のクエリを、存在しないユーザーで1回ずつ実行し、コンパイル結果をエンジンのキャッシュに載せる
+（パスワードハッシュ用のプロセスプールは password_hasher.start() で起動しておく）
+
+DBに接続できなくても起動は止めない（/readyz が503を返し、接続できるようになった時点でウォームアップし直す）。
+/healthz はプロセスが応答できるかだけを返し、DBには接続しない。
+"""
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.security import _load_user, get_user_by_username
+from ..schemas.user import TokenData
+
+logger = logging.getLogger(__name__)
+
+# ウォームアップの結果（/readyz で参照する）
+_state: Dict[str, Any] = {"warmed_up": False, "duration_ms": None}
+
+
+def _warmup_connection_count() -> int:
+    count = settings.DB_WARMUP_CONNECTIONS or settings.DB_POOL_SIZE
+    return max(0, min(count, settings.DB_POOL_SIZE))
+
+
+def warm_hot_statements(db: Session) -> None:
+    """ログイン（ユーザー名での検索）・トークン検証（user_id / ユーザー名での検索）のクエリを、該当なしの値で実行する"""
+    get_user_by_username(db, "")
+    _load_user(db, TokenData(user_id=0))
+    _load_user(db, TokenData(username=""))
+    db.rollback()
+
+
+def _warm_up(engine) -> None:
+    connections = []
+    try:
+        for _ in range(_warmup_connection_count()):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+    db = Session(bind=engine)
+    try:
+        warm_hot_statements(db)
+    finally:
+        db.close()
+
+
+async def warm_up(engine) -> bool:
+    """ウォームアップを行う（失敗してもエラーにせず、Falseを返す）"""
+    started_at = time.perf_counter()
+    try:
+        await run_in_threadpool(_warm_up, engine)
+    except Exception as e:
+        # DBの停止中は/readyzのたびに失敗するため、スタックトレースはDEBUG時のみ出力する
+        logger.warning("DB warmup failed: %s", type(e).__name__, exc_info=logger.isEnabledFor(logging.DEBUG))
+        return False
+
+    _state["warmed_up"] = True
+    _state["duration_ms"] = round((time.perf_counter() - started_at) * 1000, 3)
+    logger.info(
+        "DB warmup finished: %d connections, %.1f ms", _warmup_connection_count(), _state["duration_ms"]
+    )
+    return True
+
+
+def _ping(engine) -> None:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+async def check_ready(engine) -> Dict[str, Any]:
+    """
+    リクエストを受け付けられるかを確認する（/readyz）
+    DBに接続できること、ウォームアップが済んでいること（未完了ならここでやり直す）を条件にする
+    """
+    error: Optional[str] = None
+    try:
+        await run_in_threadpool(_ping, engine)
+    except Exception as e:
+        error = type(e).__name__
+
+    if error is None and settings.DB_WARMUP_ENABLED and not _state["warmed_up"]:
+        await warm_up(engine)
+
+    ready = error is None and (_state["warmed_up"] or not settings.DB_WARMUP_ENABLED)
+    return {
+        "status": "ready" if ready else "not_ready",
+        "database": "ok" if error is None else error,
+        "warmed_up": _state["warmed_up"],
+        "warmup_ms": _state["duration_ms"],
+    }
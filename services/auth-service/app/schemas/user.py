@@ -18,6 +18,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[int] = None
 
 # ユーザー情報出力用スキーマ
 class User(BaseModel):
@@ -1,7 +1,13 @@
 from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1 import auth
-from app.db.session import engine, Base
+from app.core import metrics, password_hasher
+from app.core.config import settings
+from app.core.security import get_admin_user
+from app.db import warmup
+from app.db.pool import get_pool_stats
+from app.db.session import engine
 
 app = FastAPI(title="認証サービス", description="ユーザー認証を管理するマイクロサービス")
 
@@ -14,14 +20,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# メトリクス（最も外側のミドルウェアとして計測する）
+if settings.METRICS_ENABLED:
+    metrics.install(engine)
+    metrics.register_collector(metrics.pool_collector(engine, "sync"))
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # APIルータの設定
 app.include_router(auth.router, prefix="/api/v1", tags=["auth"])
 
-# 起動時にデータベースのテーブルを作成
+# テーブルの作成・変更は起動時には行わない（PostgreSQLは database/ のAlembic、ローカル検証用のDBは python -m app.cli init-db）
 @app.on_event("startup")
 async def startup():
-    Base.metadata.create_all(bind=engine)
+    # パスワードハッシュ用のプロセスプールを起動しておく
+    password_hasher.start()
+    # 接続を開いておき、ログイン・トークン検証のSQLをコンパイルしておく（失敗しても起動は続け、/readyzでやり直す）
+    if settings.DB_WARMUP_ENABLED:
+        await warmup.warm_up(engine)
 
 @app.get("/")
 async def root():
-    return {"message": "認証サービスが正常に動作しています"} 
\ No newline at end of file
+    return {"message": "認証サービスが正常に動作しています"} 
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # プールに残っている接続を閉じる
+    engine.dispose()
+    password_hasher.shutdown()
+
+@app.get("/healthz")
+async def healthz():
+    """プロセスが応答できるか（liveness）。DBには接続しない"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """リクエストを受け付けられるか（readiness）。DBに接続できない・ウォームアップが済んでいない場合は503"""
+    result = await warmup.check_ready(engine)
+    if result["status"] != "ready":
+        return JSONResponse(status_code=503, content=result)
+    return result
+
+
+@app.get("/pool-stats")
+async def pool_stats(admin_user=Depends(get_admin_user)):
+    """DBコネクションプールの利用状況（使用中・待機中・オーバーフロー数と待ち時間、管理者のみ）"""
+    return get_pool_stats(engine)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus形式のメトリクス（ルートごとのレイテンシ・クエリ数・DB時間・レスポンスサイズ、プールの状況）"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
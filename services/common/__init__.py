@@ -0,0 +1 @@
+"""サービス間で共有するモジュール（各サービスのイメージに /app/common としてコピーする）"""
@@ -0,0 +1,212 @@
+"""
+Prometheus形式のメトリクス（GET /metrics）の共通部分（task-service・auth-serviceで共有する）
+
+- MetricsMiddleware（ASGIミドルウェア）で、ルートのテンプレート（/api/v1/tasks/{task_id}など）・メソッド・
+  ステータスごとのレイテンシ・レスポンスサイズ、処理中のリクエスト数を記録する
+- SQLAlchemyのbefore/after_cursor_executeで、SQLの種類ごとの実行時間と、リクエストごとのクエリ数・DB時間を記録する
+- プールの利用状況などサービス固有の統計は、各サービスの app/core/metrics.py のコレクタを
+  register_collector() で登録し、スクレイプ時に読み出してゲージにする
+メトリクスの保持とテキスト形式への変換はprometheus_clientで行う（サービスのプロセスごとのレジストリに登録する）。
+値はプロセスごとのため、複数ワーカーで動かす場合はワーカーごとにスクレイプするか、合算して参照する。
+"""
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# カウンタ・ヒストグラムごとの *_created（作成時刻）は出力しない
+disable_created_metrics()
+
+# レイテンシ（秒）・件数・バイト数のバケット
+REQUEST_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+RESPONSE_SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# ルーティングされなかったリクエスト（404など）のroute（パスをそのまま使うとラベルの種類が増え続けるため）
+UNMATCHED_ROUTE = "unmatched"
+_SQL_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+# /metricsのContent-Type（charsetはPlainTextResponseが付ける）
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LabelValues = Tuple[str, ...]
+
+REGISTRY = CollectorRegistry()
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Total HTTP requests.", ("method", "route", "status"), registry=REGISTRY
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds.",
+    ("method", "route", "status"), buckets=REQUEST_DURATION_BUCKETS, registry=REGISTRY
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being processed.", ("method",), registry=REGISTRY
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size in bytes.", ("method", "route"),
+    buckets=RESPONSE_SIZE_BUCKETS, registry=REGISTRY
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries executed per HTTP request.", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS, registry=REGISTRY
+)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Time spent executing database queries per HTTP request.",
+    ("method", "route"), buckets=REQUEST_DURATION_BUCKETS, registry=REGISTRY
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Database query latency in seconds.", ("operation",),
+    buckets=QUERY_DURATION_BUCKETS, registry=REGISTRY
+)
+
+
+class _RequestStats:
+    """1リクエスト分のクエリ数・DB時間（スレッドプール・非同期エンジンのどちらで実行しても同じオブジェクトに加算する）"""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current_request: ContextVar[Optional[_RequestStats]] = ContextVar("metrics_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, "_metrics_started_at", None)
+    if started_at is None:
+        return
+    duration = time.perf_counter() - started_at
+    head = statement.lstrip()[:6].upper()
+    DB_QUERY_DURATION.labels(next((op for op in _SQL_OPERATIONS if head.startswith(op)), "OTHER")).observe(duration)
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += duration
+
+
+def install(engine: Engine) -> None:
+    """エンジンにクエリ数・実行時間を記録するイベントリスナーを登録する"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class _Collector:
+    """スクレイプ時に関数を呼んでメトリクスを作るコレクタ"""
+
+    def __init__(self, collect: Callable[[], Iterable[Metric]]):
+        self._collect = collect
+
+    def describe(self) -> Iterable[Metric]:
+        # 登録時にcollect()（統計の読み出し）を呼ばせないため、空を返す
+        return []
+
+    def collect(self) -> Iterable[Metric]:
+        return self._collect()
+
+
+def register_collector(collector: Callable[[], Iterable[Metric]]) -> None:
+    """スクレイプ時に呼ぶコレクタ（サービス固有の統計をメトリクスにする関数）を登録する"""
+    REGISTRY.register(_Collector(collector))
+
+
+def stats_metrics(stats: Dict[str, Any], fields: Sequence[Tuple[str, str, str]], labelnames: Sequence[str],
+                  labels: LabelValues) -> Iterable[Metric]:
+    """統計のdictの値を、スクレイプ時点の値のメトリクスにする（名前が_totalで終わるものはカウンタ）"""
+    for key, metric_name, documentation in fields:
+        if key not in stats:
+            continue
+        family = CounterMetricFamily if metric_name.endswith("_total") else GaugeMetricFamily
+        metric = family(metric_name, documentation, labels=labelnames)
+        metric.add_metric(labels, stats[key])
+        yield metric
+
+
+# 各サービスのdb/pool.pyのget_pool_stats()の値（サービス間でメトリクス名をそろえる）
+POOL_FIELDS = (
+    ("pool_size", "db_pool_size", "Configured number of pooled connections."),
+    ("checked_out", "db_pool_checked_out", "Connections currently checked out."),
+    ("idle", "db_pool_idle", "Idle connections in the pool."),
+    ("overflow", "db_pool_overflow", "Connections opened beyond pool_size."),
+    ("checkouts", "db_pool_checkouts_total", "Total connection checkouts."),
+    ("timeouts", "db_pool_timeouts_total", "Total checkout timeouts."),
+    ("wait_ms_p95", "db_pool_wait_p95_milliseconds", "95th percentile checkout wait over recent checkouts."),
+)
+
+
+def _route_template(scope: Dict[str, Any], cache: Dict[Any, str]) -> str:
+    """ルーティングで決まったエンドポイントから、ルートのパスのテンプレートを求める"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    path = cache.get(endpoint)
+    if path is None:
+        for route in scope["app"].routes:
+            if getattr(route, "endpoint", None) is not None:
+                cache[route.endpoint] = route.path
+        path = cache.get(endpoint, UNMATCHED_ROUTE)
+    return path
+
+
+class MetricsMiddleware:
+    """
+    リクエストのレイテンシ・ステータス・レスポンスサイズ・クエリ数・DB時間を記録するASGIミドルウェア
+    ストリーミングレスポンスも送信し終わるまでを計測する（最も外側に追加する）
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[Any, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = _RequestStats()
+        token = _current_request.set(stats)
+        status_code = 500
+        response_bytes = 0
+
+        async def send_with_metrics(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.labels(method).inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            duration = time.perf_counter() - started_at
+            HTTP_REQUESTS_IN_PROGRESS.labels(method).dec()
+            _current_request.reset(token)
+
+            route = _route_template(scope, self._routes)
+            status = str(status_code)
+            HTTP_REQUESTS.labels(method, route, status).inc()
+            HTTP_REQUEST_DURATION.labels(method, route, status).observe(duration)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(response_bytes)
+            HTTP_REQUEST_DB_QUERIES.labels(method, route).observe(stats.queries)
+            HTTP_REQUEST_DB_DURATION.labels(method, route).observe(stats.db_seconds)
+
+
+def render() -> bytes:
+    """Prometheusのテキスト形式（version 0.0.4、Content-TypeはCONTENT_TYPE）"""
+    return generate_latest(REGISTRY)
@@ -68,6 +68,17 @@ function getAuthToken() {
     return token;
 }
 
+/**
+ * 開発用のSQLの記録（X-Debug-SQLヘッダ）を使うかを返す関数
+ * URLに ?debug_sql=1 を付けたとき、またはlocalStorageの debug_sql が '1' のときのみ有効
+ * （通常の表示では送らず、CORSのプリフライトで許可が必要なヘッダを増やさない）
+ * @returns {boolean} X-Debug-SQLヘッダを付けるかどうか
+ */
+function isDebugSqlEnabled() {
+    return new URLSearchParams(window.location.search).get('debug_sql') === '1' ||
+        localStorage.getItem('debug_sql') === '1';
+}
+
 /**
  * API呼び出しのための共通関数の定義
  * @param {string} service - サービス名（auth, task, time, group, report）
@@ -75,9 +86,10 @@ function getAuthToken() {
  * @param {string} method - HTTPメソッド
  * @param {Object} data - リクエストボディ
  * @param {boolean} requiresAuth - 認証が必要かどうか
+ * @param {Object} extraHeaders - 追加するリクエストヘッダ（X-Debug-SQLなど）
  * @returns {Promise} レスポンスデータのPromise
  */
-async function apiCall(service, endpoint, method = 'GET', data = null, requiresAuth = true) {
+async function apiCall(service, endpoint, method = 'GET', data = null, requiresAuth = true, extraHeaders = {}) {
     //　指定したサービスのエンドポイントのベースURL('http://localhost:8002/api/v1'みたいな)をbaseUrlに格納
     const baseUrl = API_ENDPOINTS[service];
     if (!baseUrl) {
@@ -92,7 +104,8 @@ async function apiCall(service, endpoint, method = 'GET', data = null, requiresA
     // クライアントからサーバーへのリクエストヘッダーを定義
     const headers = {
         'Content-Type': 'application/json', // リクエストの形式がJSONであることを示す
-        'Accept': 'application/json' // レスポンスの形式としてJSONを期待していることを示す
+        'Accept': 'application/json', // レスポンスの形式としてJSONを期待していることを示す
+        ...extraHeaders
     };
     
     // 認証トークンが必要な場合、リクエストヘッダに、Bearer認証に使うAuthorizationヘッダを追加
@@ -393,9 +406,13 @@ const authApi = {
 
 // タスク系API
 const taskApi = {
-    // タスク一覧取得
-    getTasks: (params = {}) => 
-        apiCall('task', '/tasks/', 'GET'),
+    // タスク一覧取得（debugSql: trueのとき、X-Debug-SQLヘッダを付けてSQLを記録させる。開発時のみ、isDebugSqlEnabled()を参照）
+    getTasks: (params = {}, debugSql = false) => 
+        apiCall('task', '/tasks/', 'GET', null, true, debugSql ? { 'X-Debug-SQL': '1' } : {}),
+    
+    // 開発用: X-Debug-SQLヘッダ付きで送った自分のリクエストのSQL記録を取得（SQL_INSPECTOR_ENABLED有効時のみ）
+    getDebugSql: () => 
+        apiCall('task', '/tasks/debug-sql', 'GET'),
     
     // 特定タスク取得
     getTask: (taskId) => 
@@ -510,5 +527,6 @@ window.ApiClient = {
     auth: authApi,
     task: taskApi,
     time: timeApi,
-    displayError
+    displayError,
+    isDebugSqlEnabled
 };
\ No newline at end of file
@@ -118,9 +118,12 @@ async function loadTaskData(taskId) {
         // タスク詳細セクションを表示
         document.getElementById('taskDetailsSection').classList.remove('d-none');
         
+        return task;
+        
     } catch (error) {
         console.error('タスクデータ読み込みエラー:', error);
         showAlert('タスクデータの読み込みに失敗しました。', 'danger');
+        return null;
     }
 }
 
@@ -398,15 +401,14 @@ async function refreshSubtaskData(subtaskId) {
         const selectedTaskId = document.getElementById('taskSelect').value;
         if (!selectedTaskId) return;
         
-        // タスクデータを再読み込み
-        await loadTaskData(selectedTaskId);
+        // タスクデータを再読み込み（サブタスクの作業実績集計・進捗率も含まれる）
+        const task = await loadTaskData(selectedTaskId);
         
         // モーダルが開いている場合は、サブタスクデータを更新
         const subtaskIdInput = document.getElementById('subtaskId');
-        if (subtaskIdInput && subtaskIdInput.value === subtaskId) {
-            // 更新されたサブタスクデータを取得
-            const subtasks = await apiCall('task', `/subtasks/task/${selectedTaskId}`, 'GET');
-            const updatedSubtask = subtasks.find(s => s.subtask_id === parseInt(subtaskId));
+        if (task && subtaskIdInput && subtaskIdInput.value === subtaskId) {
+            // タスク詳細に含まれるサブタスクから取得（サブタスクごとの追加リクエストは不要）
+            const updatedSubtask = (task.subtasks || []).find(s => s.subtask_id === parseInt(subtaskId));
             
             if (updatedSubtask) {
                 // モーダル内の表示を更新
@@ -0,0 +1,66 @@
+from typing import Iterator
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+import csv
+import io
+import orjson
+
+from app.crud import export as crud_export
+from app.core.config import settings
+from app.db.session import SessionLocal, get_current_user
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"],
+)
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _stream_ndjson(user_id: int) -> Iterator[bytes]:
+    """1行1レコードのJSON（"type"にレコード種別）を、読み出したバッチごとにまとめて返す"""
+    db = SessionLocal()
+    try:
+        for record_type, rows in crud_export.iter_export_rows(db, user_id, settings.EXPORT_BATCH_SIZE):
+            yield b"".join(orjson.dumps({"type": record_type, **row}) + b"\n" for row in rows)
+    finally:
+        db.close()
+
+
+def _stream_csv(user_id: int) -> Iterator[bytes]:
+    """全レコード種別の列を並べたCSV（"type"列にレコード種別、該当しない列は空）を、バッチごとに返す"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=crud_export.EXPORT_CSV_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    db = SessionLocal()
+    try:
+        for record_type, rows in crud_export.iter_export_rows(db, user_id, settings.EXPORT_BATCH_SIZE):
+            for row in rows:
+                writer.writerow({"type": record_type, **row})
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        # レコードがなくてもヘッダは返す
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    finally:
+        db.close()
+
+
+@router.get("")
+async def export_tasks(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    current_user_id: int = Depends(get_current_user)
+):
+    """
+    ユーザーのタスク・サブタスク・日次計画値・作業記録をエクスポートする（ndjson / csv）
+    データはテーブルごとにサーバーサイドカーソルでEXPORT_BATCH_SIZE行ずつ読み出して送信するため、
+    件数に関係なくメモリ使用量は一定になる
+    リクエスト用のセッションとは別に、送信中だけ使うエクスポート専用のセッションを開く
+    """
+    stream = _stream_ndjson if format == "ndjson" else _stream_csv
+    return StreamingResponse(
+        stream(current_user_id),
+        media_type=_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks-{current_user_id}.{format}"'},
+    )
@@ -0,0 +1,52 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+import io
+import tempfile
+
+from app.crud import importer as crud_importer
+from app.core.config import settings
+from app.db.session import SessionLocal, get_current_user
+
+router = APIRouter(
+    prefix="/import",
+    tags=["import"],
+)
+
+
+def _run_import(file, format: str, user_id: int, dry_run: bool) -> Dict[str, Any]:
+    """受け取ったファイルを、インポート専用のセッションで1トランザクションで登録する（スレッドプールで実行）"""
+    db = SessionLocal()
+    try:
+        lines = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        return crud_importer.import_tasks(
+            db, lines, format=format, user_id=user_id,
+            batch_size=settings.IMPORT_BATCH_SIZE, max_errors=settings.IMPORT_MAX_ERRORS, dry_run=dry_run
+        )
+    finally:
+        db.close()
+
+
+@router.post("", response_model=Dict[str, Any])
+async def import_tasks(
+    request: Request,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    dry_run: bool = False,
+    current_user_id: int = Depends(get_current_user)
+):
+    """
+    タスク・サブタスク・日次計画値・作業記録を一括登録する（PostgreSQLのみ）
+    リクエストボディにエクスポート（GET /export）と同じ形式のNDJSON / CSVをそのまま送る
+    例: curl -X POST --data-binary @tasks.ndjson -H "Authorization: Bearer ..." ".../api/v1/import?format=ndjson"
+    エラーがあれば何も登録せず、400で行番号ごとのエラーを返す（dry_run=trueは検証のみ）
+    """
+    # ボディはIMPORT_SPOOL_MAX_BYTESまではメモリ、超えた分は一時ファイルに受け取る
+    with tempfile.SpooledTemporaryFile(max_size=settings.IMPORT_SPOOL_MAX_BYTES) as file:
+        async for chunk in request.stream():
+            file.write(chunk)
+        file.seek(0)
+        report = await run_in_threadpool(_run_import, file, format, current_user_id, dry_run)
+
+    if report["error_count"]:
+        raise HTTPException(status_code=400, detail=report)
+    return report
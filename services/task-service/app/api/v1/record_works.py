@@ -1,43 +1,44 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
 
-from app.db.session import get_db, get_current_user
+from app.db.session import AsyncDB, get_async_db, get_current_user
 from app.crud import record_work as crud_record_work
 from app.crud import subtask as crud_subtask
-from app.schemas.task import RecordWork, RecordWorkCreate, RecordWorkUpdate
+from app.schemas.task import (
+    RecordWork, RecordWorkCreate, RecordWorkUpdate, RecordWorkBulkCreate, RecordWorkBulkResult
+)
 
 router = APIRouter()
 
 
 @router.get("/subtasks/{subtask_id}/record-works", response_model=List[RecordWork])
-def get_record_works(
+async def get_record_works(
     subtask_id: int,
     current_user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """サブタスクの作業記録一覧を取得"""
     # サブタスクの存在確認
-    subtask = crud_subtask.get_subtask(db, subtask_id=subtask_id)
+    subtask = await db.run(crud_subtask.get_subtask, subtask_id=subtask_id)
     if not subtask:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="サブタスクが見つかりません"
         )
     
-    return crud_record_work.get_record_works_by_subtask(db, subtask_id=subtask_id)
+    return await db.run(crud_record_work.get_record_works_by_subtask, subtask_id=subtask_id)
 
 
 @router.post("/subtasks/{subtask_id}/record-works", response_model=RecordWork)
-def create_record_work(
+async def create_record_work(
     subtask_id: int,
     record_work: RecordWorkCreate,
     current_user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """作業記録を作成"""
     # サブタスクの存在確認
-    subtask = crud_subtask.get_subtask(db, subtask_id=subtask_id)
+    subtask = await db.run(crud_subtask.get_subtask, subtask_id=subtask_id)
     if not subtask:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -45,7 +46,39 @@ def create_record_work(
         )
     
     try:
-        return crud_record_work.create_record_work(db, record_work=record_work, subtask_id=subtask_id)
+        db_record_work = await db.run(
+            crud_record_work.create_record_work, record_work=record_work, subtask_id=subtask_id, task_id=subtask.task_id
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    # 存在確認の後にサブタスクが削除された場合
+    if not db_record_work:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="サブタスクが見つかりません"
+        )
+    return db_record_work
+
+
+@router.post("/record-works/bulk", response_model=List[RecordWorkBulkResult])
+async def bulk_upsert_record_works(
+    bulk: RecordWorkBulkCreate,
+    current_user_id: int = Depends(get_current_user),
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    作業記録をまとめて登録・更新（同じサブタスク・日付の記録があれば上書き）
+    所有者確認はバッチ全体で1回、反映は1トランザクションで行う
+    """
+    subtask_task_ids = await db.run(
+        crud_subtask.get_owned_subtask_task_ids, [record.subtask_id for record in bulk.records], user_id=current_user_id
+    )
+
+    try:
+        return await db.run(crud_record_work.upsert_record_works, records=bulk.records, subtask_task_ids=subtask_task_ids)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -54,13 +87,13 @@ def create_record_work(
 
 
 @router.get("/record-works/{record_work_id}", response_model=RecordWork)
-def get_record_work(
+async def get_record_work(
     record_work_id: int,
     current_user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """作業記録を取得"""
-    record_work = crud_record_work.get_record_work(db, record_work_id=record_work_id)
+    record_work = await db.run(crud_record_work.get_record_work, record_work_id=record_work_id)
     if not record_work:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -70,15 +103,15 @@ def get_record_work(
 
 
 @router.put("/record-works/{record_work_id}", response_model=RecordWork)
-def update_record_work(
+async def update_record_work(
     record_work_id: int,
     record_work_update: RecordWorkUpdate,
     current_user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """作業記録を更新"""
     try:
-        record_work = crud_record_work.update_record_work(db, record_work_id=record_work_id, record_work_update=record_work_update)
+        record_work = await db.run(crud_record_work.update_record_work, record_work_id=record_work_id, record_work_update=record_work_update)
         if not record_work:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -93,13 +126,13 @@ def update_record_work(
 
 
 @router.delete("/record-works/{record_work_id}")
-def delete_record_work(
+async def delete_record_work(
     record_work_id: int,
     current_user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """作業記録を削除"""
-    success = crud_record_work.delete_record_work(db, record_work_id=record_work_id)
+    success = await db.run(crud_record_work.delete_record_work, record_work_id=record_work_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -109,40 +142,40 @@ def delete_record_work(
 
 
 @router.get("/subtasks/{subtask_id}/progress")
-def get_subtask_progress(
+async def get_subtask_progress(
     subtask_id: int,
     current_user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """サブタスクの進捗率を取得"""
     # サブタスクの存在確認
-    subtask = crud_subtask.get_subtask(db, subtask_id=subtask_id)
+    subtask = await db.run(crud_subtask.get_subtask, subtask_id=subtask_id)
     if not subtask:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="サブタスクが見つかりません"
         )
     
-    progress = crud_record_work.get_subtask_progress(db, subtask_id=subtask_id)
+    progress = await db.run(crud_record_work.get_subtask_progress, subtask_id=subtask_id)
     return {"subtask_id": subtask_id, "progress": progress}
 
 
 @router.get("/subtasks/{subtask_id}/summary")
-def get_subtask_work_summary(
+async def get_subtask_work_summary(
     subtask_id: int,
     current_user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """サブタスクの作業実績集計を取得"""
     # サブタスクの存在確認
-    subtask = crud_subtask.get_subtask(db, subtask_id=subtask_id)
+    subtask = await db.run(crud_subtask.get_subtask, subtask_id=subtask_id)
     if not subtask:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="サブタスクが見つかりません"
         )
     
-    summary = crud_record_work.get_subtask_work_summary(db, subtask_id=subtask_id)
+    summary = await db.run(crud_record_work.get_subtask_work_summary, subtask_id=subtask_id)
     return {
         "subtask_id": subtask_id,
         "total_work": summary["total_work"],
@@ -152,23 +185,23 @@ def get_subtask_work_summary(
 
 
 @router.get("/tasks/{task_id}/work-summary")
-def get_task_work_summary(
+async def get_task_work_summary(
     task_id: int,
     current_user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """タスクの作業実績集計を取得"""
     from app.crud import task as crud_task
     
     # タスクの存在確認
-    task = crud_task.get_task(db, task_id=task_id)
+    task = await db.run(crud_task.get_task, task_id=task_id)
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="タスクが見つかりません"
         )
     
-    summary = crud_record_work.get_task_work_summary(db, task_id=task_id)
+    summary = await db.run(crud_record_work.get_task_work_summary, task_id=task_id)
     return {
         "task_id": task_id,
         "total_work": summary["total_work"],
@@ -8,15 +8,12 @@ DELETE /subtasks/{subtask_id} 指定されたIDのサブタスクを削除する
 
 from typing import List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
 
 from app.crud import subtask as crud
 from app.schemas import task as schemas
-from app.db.session import get_db
-from app.models.models import Subtask
 
 # TODO: 認証関連は認証サービスと連携する必要があるため、仮実装
-from app.db.session import get_db, get_current_user
+from app.db.session import AsyncDB, get_async_db, get_current_user
 
 router = APIRouter(
     prefix="/subtasks",
@@ -28,9 +25,9 @@ router = APIRouter(
 # Depends(コールバック関数)は、関数がyield~finally句を持つことが前提（dbの処理に使われる）
 # @router.get()がとれる引数：path, response_model(APIが返すレスポンスのデータ構造（スキーマ）を指定), ...
 @router.get("/task/{task_id}", response_model=List[schemas.Subtask])
-def get_subtasks_by_task(
+async def get_subtasks_by_task(
     task_id: int,
-    db: Session = Depends(get_db), # 型ヒントで、SQLAlchemyのSession型を指定
+    db: AsyncDB = Depends(get_async_db), # CRUD関数はdb.run(関数, 引数...)で実行する
     current_user_id: int = Depends(get_current_user)
 ):
     """
@@ -41,98 +38,81 @@ def get_subtasks_by_task(
     # タスクへのアクセス権限確認
     from app.crud.task import get_task
 
-    task = get_task(db, task_id=task_id) # task_idを指定して、タスクを取得する
+    task = await db.run(get_task, task_id=task_id) # task_idを指定して、タスクを取得する
     if task is None: # 指定タスク無いなら、HTTPExceptionで404エラーを返す
         raise HTTPException(status_code=404, detail="タスクが見つかりません")
     if task.user_id != current_user_id: # タスクのユーザーIDと現在のユーザーIDが一致しない場合、HTTPExceptionで403エラーを返す
         raise HTTPException(status_code=403, detail="このタスクへのアクセス権限がありません")
     
     # Subtaskモデル(Subtaskテーブル)から、task_idに紐づくサブタスクを取得
-    db_subtasks = db.query(Subtask).filter(Subtask.task_id == task_id).all()
+    db_subtasks = await db.run(crud.get_subtasks, task_id=task_id)
     
-    # Pydanticモデル(Subtaskモデル)に変換
-    subtasks = [
-        schemas.Subtask(
-            subtask_id=subtask.subtask_id,
-            task_id=subtask.task_id,
-            subtask_name=subtask.subtask_name,
-            contribution_value=subtask.contribution_value,
-            progress=0  # 仮の進捗率
-        )
-        for subtask in db_subtasks
-    ]
-    
-    return subtasks
+    # Pydanticモデル(Subtaskモデル)に変換（作業実績集計・進捗率は全サブタスク分をまとめて取得）
+    return await db.run(crud.build_subtask_models, db_subtasks)
 
 
 @router.get("/{subtask_id}", response_model=schemas.Subtask)
-def get_subtask(
+async def get_subtask(
     subtask_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
     /subtasks/{subtask_id}
     指定されたIDのサブタスクを取得する
     """
-    subtask = crud.get_subtask(db, subtask_id=subtask_id)
+    subtask = await db.run(crud.get_subtask, subtask_id=subtask_id)
     if subtask is None:
         raise HTTPException(status_code=404, detail="サブタスクが見つかりません")
     
     # ユーザーの権限確認（仮実装）
     from app.crud.task import get_task
-    task = get_task(db, task_id=subtask.task_id)
+    task = await db.run(get_task, task_id=subtask.task_id)
     if task.user_id != current_user_id:
         raise HTTPException(status_code=403, detail="このサブタスクへのアクセス権限がありません")
     
-    # Pydanticモデルに変換
-    subtask_model = schemas.Subtask(
-        subtask_id=subtask.subtask_id,
-        task_id=subtask.task_id,
-        subtask_name=subtask.subtask_name,
-        contribution_value=subtask.contribution_value,
-        progress=0  # 仮の進捗率
-    )
-    
-    return subtask_model
+    # Pydanticモデルに変換（作業実績集計・進捗率を含む）
+    return (await db.run(crud.build_subtask_models, [subtask]))[0]
 
 
 @router.post("/task/{task_id}", response_model=schemas.Subtask)
-def create_subtask(
+async def create_subtask(
     task_id: int,
     subtask: schemas.SubtaskCreate,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
     /subtasks/task/{task_id}
     新しいサブタスクを作成する
     """
-    return crud.create_subtask(db=db, subtask=subtask, task_id=task_id, user_id=current_user_id)
+    db_subtask = await db.run(crud.create_subtask, subtask=subtask, task_id=task_id, user_id=current_user_id)
+    return (await db.run(crud.build_subtask_models, [db_subtask]))[0]
 
 
 @router.put("/{subtask_id}", response_model=schemas.Subtask)
-def update_subtask(
+async def update_subtask(
     subtask_id: int,
     subtask: schemas.SubtaskUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
     /subtasks/{subtask_id}
     指定されたIDのサブタスクを更新する
     """
-    return crud.update_subtask(db=db, subtask_id=subtask_id, subtask=subtask, user_id=current_user_id)
+    db_subtask = await db.run(crud.update_subtask, subtask_id=subtask_id, subtask=subtask, user_id=current_user_id)
+    return (await db.run(crud.build_subtask_models, [db_subtask]))[0]
 
 
 @router.delete("/{subtask_id}", response_model=Dict[str, Any])
-def delete_subtask(
+async def delete_subtask(
     subtask_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
     /subtasks/{subtask_id}
     指定されたIDのサブタスクを削除する
     """
-    return crud.delete_subtask(db=db, subtask_id=subtask_id, user_id=current_user_id) 
\ No newline at end of file
+    return await db.run(crud.delete_subtask, subtask_id=subtask_id, user_id=current_user_id) 
\ No newline at end of file
@@ -1,18 +1,20 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 import logging
+import orjson
 
 from app.crud import task as crud
+from app.crud import burndown as crud_burndown
 from app.schemas import task as schemas
-from app.db.session import get_db
-from app.models.models import Task, Subtask, DailyTaskPlan, DailyTimePlan
+from app.models.models import Task
+from app.core.config import settings
+from app.core import cache, etag, query_inspector
 
 # TODO: 認証関連は認証サービスと連携する必要があるため、仮実装
-from app.db.session import get_db, get_current_user
+from app.db.session import AsyncDB, get_async_db, get_current_user
 
-# SQLクエリのデバッグ情報保存用
-last_sql_query = ""
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
@@ -22,251 +24,232 @@ router = APIRouter(
 )
 
 
-@router.get("/", response_model=List[schemas.Task])
-def get_tasks(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db),
+def _orjson_default(obj: Any) -> Any:
+    """orjsonで直接扱えない値（Pydanticモデル）を変換する"""
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    raise TypeError
+
+
+def _render_json(content: Any) -> bytes:
+    """
+    レスポンスをJSONのバイト列にする（FastAPIのJSONResponseと同じ形式）
+    辞書・日付はorjsonがそのまま変換し、jsonable_encoderでの再変換は行わない
+    """
+    return orjson.dumps(content, default=_orjson_default)
+
+
+def _cached_response(value: bytes, if_none_match: Optional[str]) -> Response:
+    """キャッシュしたレスポンスを返す（If-None-MatchがETagと一致すれば304）"""
+    headers, body = cache.decode_response(value)
+    if etag.etag_matches(if_none_match, headers["ETag"]):
+        not_modified = etag.not_modified(headers["ETag"])
+        not_modified.headers.update(headers)
+        return not_modified
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _store_response(key: str, tags: List[str], tag_versions, body: bytes, headers: Dict[str, str]) -> Response:
+    """組み立てたレスポンスをキャッシュに保存して返す"""
+    cache.get_cache().set(key, cache.encode_response(body, headers), tags, tag_versions)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/", response_model=List[schemas.TaskSummary])
+async def get_tasks(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    order_by: str = Query("due_date", regex="^(due_date|task_id)$"),
+    with_total: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
-    ユーザーのタスク一覧を取得する
+    ユーザーのタスク一覧を取得する（キーセットページネーション）
+    次ページがある場合は、X-Next-Cursorヘッダのカーソルをcursorに指定して続きを取得する
+    with_total=trueの場合のみ、X-Total-Countヘッダにタスク総数を返す
+    ETagはページ内の各タスクのrevisionから作り、If-None-Matchと一致すれば304を返す
+    組み立てたレスポンスは (ユーザー, ページ) ごとにキャッシュし、ユーザーのタスクの変更時に無効化する
+    一覧には直近の予定・コメント・日次計画値を含めない（詳細の取得で返す）
     """
-    global last_sql_query
-    
-    # デバッグ: ユーザーIDの確認
-    logger.info(f"現在のユーザーID: {current_user_id}")
-    
-    # データベース内のすべてのタスクを出力（デバッグ用）
-    all_tasks = db.query(Task).all()
-    logger.info(f"データベース内のタスク総数: {len(all_tasks)}")
-    for task in all_tasks:
-        logger.info(f"DB内タスク: ID={task.task_id}, ユーザーID={task.user_id}, 名前={task.task_name}")
-    
-    # SQLクエリの取得とタスク一覧取得（SQLクエリはログにも出力されます）
-    query = db.query(Task).filter(Task.user_id == current_user_id).offset(skip).limit(limit)
-    last_sql_query = str(query.statement.compile(compile_kwargs={"literal_binds": True}))
-    logger.info(f"Task list SQL query: {last_sql_query}")
-    
+    response_cache = cache.get_cache()
+    cache_key = f"tasks:{current_user_id}:{order_by}:{limit}:{cursor or ''}:{int(with_total)}"
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return _cached_response(cached, if_none_match)
+    cache_tags = [cache.user_tasks_tag(current_user_id)]
+    tag_versions = response_cache.get_tag_versions(cache_tags)
+
     # タスクデータの取得
-    db_tasks = crud.get_tasks(db, user_id=current_user_id, skip=skip, limit=limit)
-    
-    # SQLAlchemyモデルをPydanticモデルに変換する
-    tasks = []
-    for db_task in db_tasks:
-        # サブタスクを取得
-        subtasks_db = db.query(Subtask).filter(Subtask.task_id == db_task.task_id).all()
-        
-        # 作業実績集計をimport
-        from app.crud import record_work as crud_record_work
-        
-        subtasks = []
-        for subtask in subtasks_db:
-            # サブタスクの作業実績集計を取得
-            work_summary = crud_record_work.get_subtask_work_summary(db, subtask.subtask_id)
-            progress = crud_record_work.get_subtask_progress(db, subtask.subtask_id)
-            
-            subtask_model = schemas.Subtask(
-                subtask_id=subtask.subtask_id,
-                task_id=subtask.task_id,
-                subtask_name=subtask.subtask_name,
-                contribution_value=subtask.contribution_value,
-                progress=progress,
-                total_work=work_summary["total_work"],
-                total_work_time=work_summary["total_work_time"],
-                work_days=work_summary["work_days"]
-            )
-            subtasks.append(subtask_model)
-        
-        # タスクの作業実績集計を取得
-        task_work_summary = crud_record_work.get_task_work_summary(db, db_task.task_id)
-        
-        # タスクをPydanticモデルに変換
-        task = schemas.Task(
-            task_id=db_task.task_id,
-            user_id=db_task.user_id,
-            task_name=db_task.task_name,
-            task_content=db_task.task_content,
-            recent_schedule=db_task.recent_schedule,
-            start_date=db_task.start_date,
-            due_date=db_task.due_date,
-            category=db_task.category,
-            target_time=db_task.target_time,
-            comment=db_task.comment,
-            progress=0,  # 現時点では進捗は0固定
-            subtasks=subtasks,
-            total_work_time=task_work_summary["total_work_time"]
-        )
-        
-        tasks.append(task)
+    task_rows, next_cursor = await db.run(
+        crud.get_tasks, user_id=current_user_id, limit=limit, cursor=cursor, order_by=order_by
+    )
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if with_total:
+        headers["X-Total-Count"] = str(await db.run(crud.count_tasks, user_id=current_user_id))
+
+    # 変更がなければ、サブタスクなどを取得せずに304を返す
+    list_etag = etag.make_etag(
+        "tasks", current_user_id, order_by, limit, cursor, headers.get("X-Total-Count"),
+        *(f"{row.task_id}:{row.revision}" for row in task_rows)
+    )
+    if etag.etag_matches(if_none_match, list_etag):
+        not_modified = etag.not_modified(list_etag)
+        not_modified.headers.update(headers)
+        return not_modified
+    headers.update({"ETag": list_etag, "Cache-Control": etag.CACHE_CONTROL})
     
-    return tasks
+    # 取得した列から一覧レスポンスの辞書を組み立てる（サブタスク・作業実績集計はまとめて取得）
+    tasks = await db.run(crud.load_task_summaries, task_rows)
+    return _store_response(cache_key, cache_tags, tag_versions, _render_json(tasks), headers)
 
 
-@router.get("/debug-sql", response_model=Dict[str, str])
-def get_debug_sql(
+@router.get("/debug-sql", response_model=Dict[str, Any])
+async def get_debug_sql(
+    request_id: Optional[str] = None,
     current_user_id: int = Depends(get_current_user)
 ):
     """
     直近のSQLクエリを取得する（開発用）
+    SQL_INSPECTOR_ENABLED有効時に、X-Debug-SQLヘッダ付きで送ったリクエストの記録を返す
+    request_idを指定すると、そのリクエスト（レスポンスのX-Request-IDヘッダ）の記録のみ返す
+    記録にはSQLのパラメータが含まれるため、管理者（ADMIN_USER_IDS）以外には自分のリクエストの記録のみ返す
     """
-    global last_sql_query
-    return {"sql": last_sql_query or "SQLクエリの情報がありません"}
+    user_id = None if current_user_id in settings.ADMIN_USER_IDS else current_user_id
+    return {
+        "enabled": settings.SQL_INSPECTOR_ENABLED,
+        "requests": query_inspector.get_recent(request_id, user_id=user_id),
+    }
 
 
 @router.get("/debug-all-tasks", response_model=List[Dict[str, Any]])
-def get_debug_all_tasks(
-    db: Session = Depends(get_db),
+async def get_debug_all_tasks(
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
     デバッグ用：すべてのタスクを取得する
     """
-    all_tasks = db.query(Task).all()
-    result = []
-    for task in all_tasks:
-        result.append({
-            "task_id": task.task_id,
-            "user_id": task.user_id,
-            "task_name": task.task_name,
-            "start_date": str(task.start_date),
-            "due_date": str(task.due_date),
-            "category": task.category
-        })
-    return result
+    def query_all_tasks(session: Session) -> List[Dict[str, Any]]:
+        all_tasks = session.query(Task).all()
+        result = []
+        for task in all_tasks:
+            result.append({
+                "task_id": task.task_id,
+                "user_id": task.user_id,
+                "task_name": task.task_name,
+                "start_date": str(task.start_date),
+                "due_date": str(task.due_date),
+                "category": task.category
+            })
+        return result
+
+    return await db.run(query_all_tasks)
 
 
 @router.get("/{task_id}", response_model=schemas.Task)
-def get_task(
+async def get_task(
     task_id: int, 
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
     指定されたIDのタスクを取得する
+    ETagはタスクのrevisionから作り、If-None-Matchと一致すれば304を返す
+    組み立てたレスポンスは (ユーザー, タスク) ごとにキャッシュし、タスクの変更時に無効化する
     """
-    db_task = crud.get_task(db, task_id=task_id)
+    response_cache = cache.get_cache()
+    cache_key = f"task:{current_user_id}:{task_id}"
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return _cached_response(cached, if_none_match)
+    cache_tags = [cache.task_tag(task_id)]
+    tag_versions = response_cache.get_tag_versions(cache_tags)
+
+    db_task = await db.run(crud.get_task, task_id=task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="タスクが見つかりません")
     
     # ユーザーの権限確認（仮実装）
     if db_task.user_id != current_user_id:
         raise HTTPException(status_code=403, detail="このタスクへのアクセス権限がありません")
+
+    # 変更がなければ、サブタスクなどを取得せずに304を返す
+    task_etag = etag.make_etag("task", db_task.task_id, db_task.revision)
+    if etag.etag_matches(if_none_match, task_etag):
+        return etag.not_modified(task_etag)
     
-    # サブタスクを取得
-    subtasks_db = db.query(Subtask).filter(Subtask.task_id == task_id).all()
-    
-    # 作業実績集計をimport
-    from app.crud import record_work as crud_record_work
-    
-    subtasks = []
-    for subtask in subtasks_db:
-        # サブタスクの作業実績集計を取得
-        work_summary = crud_record_work.get_subtask_work_summary(db, subtask.subtask_id)
-        progress = crud_record_work.get_subtask_progress(db, subtask.subtask_id)
-        
-        subtask_model = schemas.Subtask(
-            subtask_id=subtask.subtask_id,
-            task_id=subtask.task_id,
-            subtask_name=subtask.subtask_name,
-            contribution_value=subtask.contribution_value,
-            progress=progress,
-            total_work=work_summary["total_work"],
-            total_work_time=work_summary["total_work_time"],
-            work_days=work_summary["work_days"]
-        )
-        subtasks.append(subtask_model)
-    
-    # タスクの作業実績集計を取得
-    task_work_summary = crud_record_work.get_task_work_summary(db, task_id)
-    
-    # 日次作業計画値を取得
-    daily_task_plans_db = db.query(DailyTaskPlan).filter(DailyTaskPlan.task_id == task_id).all()
-    daily_task_plans = [
-        schemas.DailyTaskPlan(
-            daily_task_plan_id=plan.daily_task_plan_id,
-            task_id=plan.task_id,
-            date=plan.date,
-            task_plan_value=plan.task_plan_value
-        )
-        for plan in daily_task_plans_db
-    ]
-    
-    # 日次作業時間計画値を取得
-    daily_time_plans_db = db.query(DailyTimePlan).filter(DailyTimePlan.task_id == task_id).all()
-    daily_time_plans = [
-        schemas.DailyTimePlan(
-            daily_time_plan_id=plan.daily_time_plan_id,
-            task_id=plan.task_id,
-            date=plan.date,
-            time_plan_value=plan.time_plan_value
-        )
-        for plan in daily_time_plans_db
-    ]
-    
-    # Pydanticモデルに変換
-    task = schemas.Task(
-        task_id=db_task.task_id,
-        user_id=db_task.user_id,
-        task_name=db_task.task_name,
-        task_content=db_task.task_content,
-        recent_schedule=db_task.recent_schedule,
-        start_date=db_task.start_date,
-        due_date=db_task.due_date,
-        category=db_task.category,
-        target_time=db_task.target_time,
-        comment=db_task.comment,
-        progress=0,  # 現時点では進捗は0固定
-        subtasks=subtasks,
-        daily_task_plans=daily_task_plans,
-        daily_time_plans=daily_time_plans,
-        total_work_time=task_work_summary["total_work_time"]
-    )
-    
-    return task
+    # Pydanticモデルに変換（サブタスク・作業実績集計・日次計画値はまとめて取得）
+    task = (await db.run(crud.load_task_details, [db_task], include_plans=True))[0]
+    headers = {"ETag": task_etag, "Cache-Control": etag.CACHE_CONTROL}
+    return _store_response(cache_key, cache_tags, tag_versions, _render_json(task), headers)
+
+
+@router.get("/{task_id}/burndown", response_model=schemas.TaskBurndown)
+async def get_task_burndown(
+    task_id: int,
+    db: AsyncDB = Depends(get_async_db),
+    current_user_id: int = Depends(get_current_user)
+):
+    """
+    指定されたタスクの計画と実績の推移（バーンダウン）を日ごとに取得する
+    """
+    db_task = await db.run(crud.get_task, task_id=task_id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="タスクが見つかりません")
+    if db_task.user_id != current_user_id:
+        raise HTTPException(status_code=403, detail="このタスクへのアクセス権限がありません")
+
+    return await db.run(crud_burndown.get_task_burndown, db_task)
 
 
 @router.post("/", response_model=schemas.Task)
-def create_task(
+async def create_task(
     task: schemas.TaskCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
     新しいタスクを作成する
     """
-    return crud.create_task(db=db, task=task, user_id=current_user_id)
+    return await db.run(crud.create_task, task=task, user_id=current_user_id)
 
 
 @router.put("/{task_id}", response_model=schemas.Task)
-def update_task(
+async def update_task(
     task_id: int, 
     task: schemas.TaskUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
     指定されたIDのタスクを更新する
     """
-    return crud.update_task(db=db, task_id=task_id, task=task, user_id=current_user_id)
+    db_task = await db.run(crud.update_task, task_id=task_id, task=task, user_id=current_user_id)
+    # レスポンスはセッション内でPydanticモデルに変換する（イベントループ上での遅延ロードを避ける）
+    return (await db.run(crud.load_task_details, [db_task], include_plans=True))[0]
 
 
 @router.delete("/{task_id}", response_model=Dict[str, Any])
-def delete_task(
+async def delete_task(
     task_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
     指定されたIDのタスクを削除する
     """
-    return crud.delete_task(db=db, task_id=task_id, user_id=current_user_id)
+    return await db.run(crud.delete_task, task_id=task_id, user_id=current_user_id)
 
 
 @router.post("/calculate-initial-values", response_model=Dict[str, Any])
-def calculate_initial_values(
+async def calculate_initial_values(
     data: schemas.TaskInitialValues,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user_id: int = Depends(get_current_user)
 ):
     """
@@ -0,0 +1,89 @@
+"""
+運用コマンド
+
+使い方:
+    python -m app.cli init-db                  # テーブルを作成する（ローカル検証用、既存のテーブルはそのまま）
+    python -m app.cli rebuild-stats            # 作業実績集計テーブルのずれを検出して修正する
+    python -m app.cli rebuild-stats --verify   # ずれの検出のみ行う（ずれがあれば終了コード1）
+    python -m app.cli import-tasks tasks.ndjson --user-id 1            # タスク・作業履歴を一括登録する
+    python -m app.cli import-tasks tasks.csv --user-id 1 --dry-run     # 検証のみ行う（エラーがあれば終了コード1）
+"""
+import argparse
+import json
+import sys
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.crud import importer as crud_importer
+from app.crud import stats as crud_stats
+from app.db.session import SessionLocal, engine
+from app.models import models
+
+
+def init_db(args: argparse.Namespace) -> int:
+    """
+    モデルの定義からテーブルを作成する（SQLiteなどのローカル検証用）
+    PostgreSQLのスキーマは database/ のAlembicで管理する（alembic upgrade head）
+    """
+    models.Base.metadata.create_all(bind=engine)
+    print(json.dumps({"tables": sorted(models.Base.metadata.tables)}, ensure_ascii=False, indent=2))
+    return 0
+
+
+def rebuild_stats(args: argparse.Namespace) -> int:
+    db = SessionLocal()
+    try:
+        report = crud_stats.rebuild_stats(db, fix=not args.verify)
+    finally:
+        db.close()
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    has_drift = report["subtask_drift"] or report["task_drift"]
+    return 1 if has_drift and not report["fixed"] else 0
+
+
+def import_tasks(args: argparse.Namespace) -> int:
+    format = args.format or ("csv" if args.file.endswith(".csv") else "ndjson")
+    db = SessionLocal()
+    try:
+        with open(args.file, encoding="utf-8-sig", newline="") as lines:
+            report = crud_importer.import_tasks(
+                db, lines, format=format, user_id=args.user_id, batch_size=args.batch_size,
+                max_errors=settings.IMPORT_MAX_ERRORS, dry_run=args.dry_run
+            )
+    except HTTPException as e:
+        print(json.dumps({"error": e.detail}, ensure_ascii=False, indent=2))
+        return 1
+    finally:
+        db.close()
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 1 if report["error_count"] else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="タスク管理サービスの運用コマンド")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = subparsers.add_parser("init-db", help="テーブルを作成する（ローカル検証用）")
+    init_parser.set_defaults(func=init_db)
+
+    rebuild_parser = subparsers.add_parser("rebuild-stats", help="作業実績集計テーブルを検証・再構築する")
+    rebuild_parser.add_argument("--verify", action="store_true", help="検証のみ行い、修正しない")
+    rebuild_parser.set_defaults(func=rebuild_stats)
+
+    import_parser = subparsers.add_parser("import-tasks", help="タスク・作業履歴をNDJSON / CSVから一括登録する（PostgreSQLのみ）")
+    import_parser.add_argument("file", help="エクスポート（GET /export）と同じ形式のファイル")
+    import_parser.add_argument("--user-id", type=int, required=True, help="登録先のユーザーID")
+    import_parser.add_argument("--format", choices=["ndjson", "csv"], help="省略時は拡張子から判定する")
+    import_parser.add_argument("--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE, help="1回のCOPYで書き込む行数")
+    import_parser.add_argument("--dry-run", action="store_true", help="検証のみ行い、登録しない")
+    import_parser.set_defaults(func=import_tasks)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+レスポンスキャッシュ
+
+組み立て済みのタスク一覧・詳細のレスポンス（JSONのバイト列）を保持する。
+- キャッシュの実装（バックエンド）は CacheBackend を継承して差し替えられる（settings.RESPONSE_CACHE_BACKEND）
+  既定はプロセス内の InMemoryCache（LRU + TTL + バイト数上限）。共有キャッシュに置き換える場合もインターフェースは同じ
+- エントリにはタグ（"task:{task_id}", "user:{user_id}:tasks"）を付け、CRUD処理で変更したタグをコミット後に無効化する
+  （invalidate_on_commit）。ロールバックした場合は無効化しない
+- 読み込み開始時のタグのバージョンを記録しておき、読み込み中に無効化されたタグを含むエントリは保存しない
+  （古いデータがキャッシュに残らないようにする）
+
+InMemoryCacheはプロセスごとのキャッシュのため、複数プロセス・複数レプリカで動かす場合は
+共有キャッシュのバックエンドに切り替えるか、RESPONSE_CACHE_TTL_SECONDSを短くする。
+"""
+import importlib
+from abc import ABC, abstractmethod
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+# 読み込み開始時のタグのバージョン（set()で、読み込み中に無効化されていないかを確認する）
+TagVersions = Tuple[int, Tuple[int, ...]]
+
+# セッションに積んでおく、コミット後に無効化するタグ
+_SESSION_INFO_KEY = "response_cache_invalidate_tags"
+
+
+def task_tag(task_id: int) -> str:
+    """タスク詳細のタグ（タスク・サブタスク・日次計画値・作業記録の変更で無効化する）"""
+    return f"task:{task_id}"
+
+
+def user_tasks_tag(user_id: int) -> str:
+    """ユーザーのタスク一覧ページすべてのタグ（ユーザーのいずれかのタスクの変更・追加・削除で無効化する）"""
+    return f"user:{user_id}:tasks"
+
+
+class CacheBackend(ABC):
+    """レスポンスキャッシュのインターフェース（独自のバックエンドは全メソッドを実装する）"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """保存されている値（なければNone）"""
+
+    @abstractmethod
+    def get_tag_versions(self, tags: Iterable[str]) -> TagVersions:
+        """読み込み開始時に呼び、set()に渡す"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, tags: Iterable[str], tag_versions: TagVersions) -> bool:
+        """tag_versions以降にタグが無効化されていなければ保存する（保存したらTrue）"""
+
+    @abstractmethod
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        """タグの付いたエントリを削除し、読み込み中のset()も保存しないようにする"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """全エントリを削除する"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """GET /cache-stats で返す統計情報"""
+
+
+class NullCache(CacheBackend):
+    """キャッシュしない（RESPONSE_CACHE_BACKEND="none"）"""
+
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def get_tag_versions(self, tags: Iterable[str]) -> TagVersions:
+        return (0, ())
+
+    def set(self, key: str, value: bytes, tags: Iterable[str], tag_versions: TagVersions) -> bool:
+        return False
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
+
+
+class InMemoryCache(CacheBackend):
+    """プロセス内のキャッシュ（LRU + TTL + エントリ数・バイト数の上限）"""
+
+    # タグのバージョンを保持する上限（超えたら世代を進めてまとめて破棄する）
+    MAX_TAG_VERSIONS = 100_000
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # key → (value, 有効期限, タグ)
+        self._entries: "OrderedDict[str, Tuple[bytes, float, Tuple[str, ...]]]" = OrderedDict()
+        self._keys_by_tag: Dict[str, set] = {}
+        self._tag_versions: Dict[str, int] = {}
+        self._epoch = 0
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejected_sets = 0
+
+    def _remove(self, key: str) -> None:
+        value, _, tags = self._entries.pop(key)
+        self._bytes -= len(value)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_tag_versions(self, tags: Iterable[str]) -> TagVersions:
+        with self._lock:
+            return self._epoch, tuple(self._tag_versions.get(tag, 0) for tag in tags)
+
+    def set(self, key: str, value: bytes, tags: Iterable[str], tag_versions: TagVersions) -> bool:
+        tags = tuple(tags)
+        if len(value) > self.max_bytes or self.max_entries <= 0:
+            return False
+        with self._lock:
+            current = (self._epoch, tuple(self._tag_versions.get(tag, 0) for tag in tags))
+            if current != tag_versions:
+                # 読み込み中にタグが無効化された（読み込んだデータが古い可能性がある）
+                self.rejected_sets += 1
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, tags)
+            self._bytes += len(value)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+            if len(self._tag_versions) > self.MAX_TAG_VERSIONS:
+                # バージョンを破棄する代わりに世代を進め、読み込み中のエントリを保存させない
+                self._tag_versions.clear()
+                self._epoch += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            self._bytes = 0
+            self._epoch += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self).__name__,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "rejected_sets": self.rejected_sets,
+            }
+
+
+def _create_backend() -> CacheBackend:
+    backend = settings.RESPONSE_CACHE_BACKEND
+    if backend == "none":
+        return NullCache()
+    if backend == "memory":
+        return InMemoryCache(
+            max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+            max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+            ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+        )
+    # "パッケージ.モジュール:ファクトリ" 形式で、独自のバックエンドを指定できる
+    module_name, _, attr = backend.partition(":")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+_backend: CacheBackend = _create_backend()
+
+
+def get_cache() -> CacheBackend:
+    return _backend
+
+
+def set_cache(backend: CacheBackend) -> None:
+    """バックエンドを差し替える（テストや共有キャッシュへの切り替え用）"""
+    global _backend
+    _backend = backend
+
+
+def invalidate_on_commit(db: Session, tags: Iterable[str]) -> None:
+    """セッションのコミット後に無効化するタグを登録する（ロールバックした場合は無効化しない）"""
+    db.info.setdefault(_SESSION_INFO_KEY, set()).update(tags)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    tags: List[str] = session.info.pop(_SESSION_INFO_KEY, None)
+    if tags:
+        get_cache().invalidate_tags(tags)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(_SESSION_INFO_KEY, None)
+
+
+def encode_response(body: bytes, headers: Dict[str, str]) -> bytes:
+    """レスポンスのヘッダと本文を、キャッシュに保存するバイト列にまとめる（1行目がヘッダのJSON）"""
+    return json.dumps(headers, separators=(",", ":")).encode() + b"\n" + body
+
+
+def decode_response(value: bytes) -> Tuple[Dict[str, str], bytes]:
+    """encode_response()で保存したバイト列を、ヘッダと本文に戻す"""
+    header_line, _, body = value.partition(b"\n")
+    return json.loads(header_line), body
@@ -0,0 +1,42 @@
+"""
+ETag / If-None-Match による条件付きレスポンス
+
+タスクのrevision（app.crud.revision）からstrong ETagを作り、
+リクエストのIf-None-Matchと一致する場合は、レスポンスを組み立てずに304を返す。
+"""
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Response
+
+# ブラウザにはレスポンスを保存させ、毎回ETagで再検証させる
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: object) -> str:
+    """値の並びからstrong ETag（引用符付き）を作成する"""
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-MatchヘッダがETagと一致するかを判定する
+    If-None-Matchは弱い比較（W/付きも一致とみなす）で、複数指定・"*"にも対応する
+    """
+    if not if_none_match:
+        return False
+    candidates: Iterable[str] = (candidate.strip() for candidate in if_none_match.split(","))
+    for candidate in candidates:
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """304 Not Modified（本文なし）を返す"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
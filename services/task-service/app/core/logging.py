@@ -0,0 +1,224 @@
+"""
+ログ出力の設定
+
+- リクエストを処理するスレッドは、ログをキュー（QueueHandler）に積むだけで、標準出力への書き込みは
+  QueueListenerのスレッドが行う（出力が詰まってもリクエストは待たない。キューが一杯の場合は破棄して数える）
+- 1行1レコードのJSON（LOG_FORMAT="json"）で出力し、リクエストID（X-Request-ID）を付ける
+- ロガー名ごとのサンプリング率（LOG_SAMPLING_RATES）で、INFO以下のログを間引く（WARNING以上は常に出力）
+- ロガーのレベルとサンプリング率は、実行中に /log-level から変更できる
+- SQLの出力は、"app.sql" ロガーがINFO以下のときに、ヘッダ（既定: X-Debug-Log-SQL）付きのリクエストに限って行う
+  （sqlalchemy.engineのログはすべてのリクエストのSQLを出力するため使わない）
+"""
+import atexit
+import copy
+import logging
+import queue
+import random
+import sys
+import threading
+import uuid
+from contextvars import ContextVar, Token
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+SQL_LOGGER_NAME = "app.sql"
+
+# 現在のリクエストのID・SQLを出力するかどうか（リクエストごとに分離される）
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_sql_echo: ContextVar[bool] = ContextVar("sql_echo", default=False)
+
+# LogRecordの標準の属性（これ以外の属性は extra として出力する）
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+_handler: Optional["_NonBlockingQueueHandler"] = None
+_sampling_filter: Optional["SamplingFilter"] = None
+_lock = threading.Lock()
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def begin_request(request_id: Optional[str] = None, sql_echo: bool = False) -> Tuple[Token, Token]:
+    """
+    リクエストの処理を開始する（IDがなければ採番する）。戻り値はend_request()に渡す
+    sql_echo=Trueでも、"app.sql"ロガーがINFOより上のレベルならSQLは出力しない
+    """
+    echo = sql_echo and logging.getLogger(SQL_LOGGER_NAME).isEnabledFor(logging.INFO)
+    return _request_id.set(request_id or uuid.uuid4().hex), _sql_echo.set(echo)
+
+
+def end_request(tokens: Tuple[Token, Token]) -> None:
+    request_id_token, sql_echo_token = tokens
+    _request_id.reset(request_id_token)
+    _sql_echo.reset(sql_echo_token)
+
+
+class RequestContextFilter(logging.Filter):
+    """レコードに現在のリクエストIDを付ける（キューに積む前に、リクエストのスレッドで実行する）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """ロガー名（前方一致で最も長いもの）ごとのサンプリング率で、INFO以下のレコードを間引く"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self.sampled_out = 0
+
+    def get_rate(self, name: str) -> float:
+        while True:
+            if name in self.rates:
+                return self.rates[name]
+            if "." not in name:
+                return self.rates.get("", 1.0)
+            name = name.rsplit(".", 1)[0]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.get_rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """キューが一杯の場合は待たずにレコードを破棄する"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # メッセージの組み立てと例外の文字列化だけ行い、整形（JSON化）は出力スレッドで行う
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """1行1レコードのJSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            payload["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return orjson.dumps(payload, default=str).decode()
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        record.request_id = getattr(record, "request_id", None) or "-"
+        return super().format(record)
+
+
+def setup_logging() -> None:
+    """ルートロガーにキュー経由のハンドラを設定し、出力スレッドを開始する（複数回呼んでも1回だけ設定する）"""
+    global _listener, _handler, _sampling_filter
+    with _lock:
+        if _listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stdout)
+        if settings.LOG_FORMAT == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(_TextFormatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+        _handler = _NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        _sampling_filter = SamplingFilter(settings.LOG_SAMPLING_RATES)
+        _handler.addFilter(_sampling_filter)
+        _handler.addFilter(RequestContextFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_handler)
+        root.setLevel(settings.LOG_LEVEL)
+        # SQLは /log-level で"app.sql"をINFOにした場合のみ、ヘッダ付きのリクエストで出力する
+        logging.getLogger(SQL_LOGGER_NAME).setLevel(settings.LOG_SQL_LEVEL)
+
+        _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """キューに残っているレコードを出力して、出力スレッドを終了する"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+
+def get_log_levels() -> Dict[str, Any]:
+    """ロガーのレベル・サンプリング率・破棄したレコード数（/log-level用）"""
+    loggers = {"": logging.getLogger()}
+    loggers.update({
+        name: logger for name, logger in logging.Logger.manager.loggerDict.items()
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET
+    })
+    return {
+        "levels": {name or "root": logging.getLevelName(logger.level) for name, logger in sorted(loggers.items())},
+        "sampling_rates": dict(_sampling_filter.rates) if _sampling_filter else {},
+        "sampled_out": _sampling_filter.sampled_out if _sampling_filter else 0,
+        "dropped": _handler.dropped if _handler else 0,
+        "queue_size": _handler.queue.qsize() if _handler else 0,
+    }
+
+
+def set_log_level(logger_name: str, level: Optional[str] = None, sampling_rate: Optional[float] = None) -> None:
+    """ロガーのレベル・サンプリング率を変更する（logger_nameが"root"または空ならルートロガー）"""
+    name = "" if logger_name in ("", "root") else logger_name
+    if level is not None:
+        logging.getLogger(name).setLevel(level.upper())
+    if sampling_rate is not None and _sampling_filter is not None:
+        _sampling_filter.rates[name] = sampling_rate
+
+
+def _echo_sql(conn, cursor, statement, parameters, context, executemany):
+    if _sql_echo.get():
+        logging.getLogger(SQL_LOGGER_NAME).info(
+            statement, extra={"parameters": repr(parameters)[:500], "executemany": executemany}
+        )
+
+
+def install_sql_echo(engine: Engine) -> None:
+    """エンジンに、SQLを出力するリクエストでのみ動作するイベントリスナーを登録する"""
+    event.listen(engine, "before_cursor_execute", _echo_sql)
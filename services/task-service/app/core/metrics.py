@@ -0,0 +1,39 @@
+"""
+Prometheus形式のメトリクス（GET /metrics）
+
+レジストリ・HTTPリクエストとSQLのメトリクス・MetricsMiddlewareは共通モジュール（services/common/metrics.py、
+イメージでは /app/common）のものを使い、このモジュールではtask-service固有のコレクタを定義する。
+- プールの利用状況・レスポンスキャッシュの統計は、スクレイプ時に読み出してゲージにする
+"""
+from typing import Callable, Iterable
+
+from prometheus_client.core import Metric
+from sqlalchemy.engine import Engine
+
+from common.metrics import (  # noqa: F401
+    CONTENT_TYPE, POOL_FIELDS, REGISTRY, MetricsMiddleware, install, register_collector, render, stats_metrics,
+)
+
+from app.core import cache
+from app.db.pool import get_pool_stats
+
+_CACHE_FIELDS = (
+    ("entries", "response_cache_entries", "Entries in the response cache."),
+    ("bytes", "response_cache_bytes", "Bytes held by the response cache."),
+    ("hits", "response_cache_hits_total", "Response cache hits."),
+    ("misses", "response_cache_misses_total", "Response cache misses."),
+    ("evictions", "response_cache_evictions_total", "Entries evicted by the size limits."),
+    ("invalidations", "response_cache_invalidations_total", "Entries invalidated by writes."),
+)
+
+
+def pool_collector(engine: Engine, name: str = "sync") -> Callable[[], Iterable[Metric]]:
+    """get_pool_stats()の値をメトリクスにするコレクタを作成する（poolラベルにnameを付ける）"""
+    def collect() -> Iterable[Metric]:
+        return stats_metrics(get_pool_stats(engine), POOL_FIELDS, ("pool",), (name,))
+    return collect
+
+
+def cache_collector() -> Iterable[Metric]:
+    """レスポンスキャッシュの統計をメトリクスにするコレクタ"""
+    return stats_metrics(cache.get_cache().stats(), _CACHE_FIELDS, (), ())
@@ -0,0 +1,139 @@
+"""
+日次計画値の生成
+
+開始日〜完了予定日の稼働日（曜日・休日で指定）を、NumPyの日付配列でまとめて求め、
+作業計画値（合計100）と作業時間計画値（合計target_time）を稼働日に配分する。
+- 配分の重み: 曜日ごとの重み × 期間内の配分カーブ（flat: 均等、front: 前倒し、back: 後ろ倒し）
+- 端数処理: 最大剰余法（各日の値を切り捨て、残りを端数の大きい日から1単位ずつ足す）で、
+  丸めた後の合計が指定した桁でちょうど100・target_timeになるようにする
+稼働日の配列・カーブの重み・作成した計画値は引数ごとにキャッシュするため、
+同じ条件での2回目以降は数年分の期間でも配列を作り直さずに返す。
+"""
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 曜日は月曜=0〜日曜=6（date.weekday()と同じ）
+ALL_WEEKDAYS = (0, 1, 2, 3, 4, 5, 6)
+CURVES = ("flat", "front", "back")
+
+# 作業計画値（%）は小数第2位、作業時間計画値（分）は整数で丸める
+TASK_PLAN_DECIMALS = 2
+TIME_PLAN_DECIMALS = 0
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    """キャッシュした配列を呼び出し側で書き換えられないようにする"""
+    array.setflags(write=False)
+    return array
+
+
+@lru_cache(maxsize=256)
+def _busday_calendar(weekmask: Tuple[int, ...], holidays: Tuple[date, ...]) -> np.busdaycalendar:
+    return np.busdaycalendar(weekmask=list(weekmask), holidays=list(holidays))
+
+
+@lru_cache(maxsize=1024)
+def get_working_days(
+    start_date: date,
+    due_date: date,
+    working_weekdays: Tuple[int, ...] = ALL_WEEKDAYS,
+    holidays: Tuple[date, ...] = ()
+) -> np.ndarray:
+    """開始日〜完了予定日（両端を含む）のうち、稼働する曜日で休日でない日の配列（datetime64[D]）を返す"""
+    days = np.arange(np.datetime64(start_date, "D"), np.datetime64(due_date, "D") + 1, dtype="datetime64[D]")
+    weekmask = tuple(1 if weekday in working_weekdays else 0 for weekday in ALL_WEEKDAYS)
+    if not any(weekmask):
+        return _readonly(days[:0])
+    return _readonly(days[np.is_busday(days, busdaycal=_busday_calendar(weekmask, holidays))])
+
+
+@lru_cache(maxsize=1024)
+def get_curve_weights(day_count: int, curve: str = "flat") -> np.ndarray:
+    """
+    期間内の配分カーブの重み（平均1）を返す
+    front は初日が最も大きく、back は最終日が最も大きい直線（どの日も0にはならない）
+    """
+    if curve not in CURVES:
+        raise ValueError(f"配分カーブが正しくありません: {curve}（{', '.join(CURVES)}のいずれか）")
+    if curve == "flat":
+        return _readonly(np.ones(day_count))
+    # 各日の中央の位置（0〜1）
+    position = (np.arange(day_count) + 0.5) / day_count
+    return _readonly(2 * (1 - position) if curve == "front" else 2 * position)
+
+
+def distribute(total: float, weights: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    totalを重みに比例して配分する（最大剰余法）
+    10**-decimals を1単位として整数で配分するため、丸めた値の合計はちょうどtotalになる
+    """
+    weight_sum = weights.sum()
+    if len(weights) == 0 or weight_sum <= 0:
+        raise ValueError("配分先の稼働日の重みがすべて0です")
+    scale = 10 ** decimals
+    units = int(round(total * scale))
+    quotas = weights / weight_sum * units
+    allocated = np.floor(quotas).astype(np.int64)
+    shortfall = units - int(allocated.sum())
+    if shortfall > 0:
+        # 端数の大きい日から1単位ずつ足す（同じ端数なら前の日を優先）
+        allocated[np.argsort(allocated - quotas, kind="stable")[:shortfall]] += 1
+    return allocated / scale
+
+
+@lru_cache(maxsize=256)
+def _generate_plans(
+    start_date: date,
+    due_date: date,
+    target_time: float,
+    working_weekdays: Tuple[int, ...],
+    holidays: Tuple[date, ...],
+    weekday_weights: Optional[Tuple[float, ...]],
+    curve: str
+) -> Tuple[Tuple[str, ...], Tuple[float, ...], Tuple[float, ...]]:
+    days = get_working_days(start_date, due_date, working_weekdays, holidays)
+    if len(days) == 0:
+        raise ValueError("開始予定日から完了予定日までに稼働日がありません")
+
+    weights = get_curve_weights(len(days), curve)
+    if weekday_weights is not None:
+        # 1970-01-01（datetime64の0日目）は木曜日のため、+3して月曜=0にそろえる
+        weekdays = (days.astype(np.int64) + 3) % 7
+        weights = weights * np.asarray(weekday_weights, dtype=float)[weekdays]
+        # 重み0の曜日には配分しない
+        days, weights = days[weights > 0], weights[weights > 0]
+
+    return (
+        tuple(np.datetime_as_string(days).tolist()),
+        tuple(distribute(100, weights, TASK_PLAN_DECIMALS).tolist()),
+        tuple(distribute(target_time, weights, TIME_PLAN_DECIMALS).tolist()),
+    )
+
+
+def generate_plans(
+    start_date: date,
+    due_date: date,
+    target_time: float,
+    working_weekdays: Iterable[int] = ALL_WEEKDAYS,
+    holidays: Iterable[date] = (),
+    weekday_weights: Optional[Sequence[float]] = None,
+    curve: str = "flat"
+) -> Dict[str, List]:
+    """
+    稼働日ごとの作業計画値（合計100）と作業時間計画値（合計target_time）を作成する
+    戻り値は {"dates": ISO形式の日付, "task_plan_values": [...], "time_plan_values": [...]}（同じ長さ・同じ順）
+    稼働日がない・重みがすべて0の場合はValueErrorを送出する
+    """
+    dates, task_plan_values, time_plan_values = _generate_plans(
+        start_date, due_date, target_time,
+        tuple(sorted(set(working_weekdays))), tuple(sorted(set(holidays))),
+        tuple(weekday_weights) if weekday_weights is not None else None, curve
+    )
+    return {
+        "dates": list(dates),
+        "task_plan_values": list(task_plan_values),
+        "time_plan_values": list(time_plan_values),
+    }
@@ -0,0 +1,122 @@
+"""
+SQLクエリインスペクタ（開発用）
+
+settings.SQL_INSPECTOR_ENABLED が有効な場合のみ、エンジンにイベントリスナーを登録する。
+ヘッダ（既定: X-Debug-SQL）付きのリクエストに限り、実行されたSQL・実行時間・行数を
+リクエスト単位のリングバッファに記録し、/tasks/debug-sql から参照できるようにする。
+記録はcontextvarでリクエストごとに分離されるため、スレッドやワーカーをまたいで混ざらない。
+記録にはリクエストを送ったユーザー（get_current_userで認証したユーザー）を付け、
+管理者以外には自分のリクエストの記録のみ返す（認証しないリクエストの記録は管理者のみ参照できる）。
+"""
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+# 現在のリクエストの記録先（インスペクト対象外のリクエストではNone）
+_current_inspection: ContextVar[Optional["QueryInspection"]] = ContextVar("query_inspection", default=None)
+
+# 直近のインスペクト結果（プロセス内で共有するためロックで保護）
+_recent_inspections: Deque["QueryInspection"] = deque(maxlen=settings.SQL_INSPECTOR_MAX_REQUESTS)
+_recent_lock = threading.Lock()
+
+
+class QueryInspection:
+    """1リクエスト分のSQL記録"""
+
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.user_id: Optional[int] = None
+        self.queries: Deque[Dict[str, Any]] = deque(maxlen=settings.SQL_INSPECTOR_MAX_QUERIES)
+        self.total_queries = 0
+        self.total_duration_ms = 0.0
+
+    def record(self, statement: str, parameters: Any, duration_ms: float, rowcount: int) -> None:
+        self.total_queries += 1
+        self.total_duration_ms += duration_ms
+        self.queries.append({
+            "statement": statement,
+            "parameters": repr(parameters)[:500],
+            "duration_ms": round(duration_ms, 3),
+            "rowcount": rowcount,
+        })
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "user_id": self.user_id,
+            "total_queries": self.total_queries,
+            "total_duration_ms": round(self.total_duration_ms, 3),
+            "dropped_queries": self.total_queries - len(self.queries),
+            "queries": list(self.queries),
+        }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_inspection.get() is None:
+        return
+    context._query_inspector_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inspection = _current_inspection.get()
+    if inspection is None:
+        return
+    started_at = getattr(context, "_query_inspector_started_at", None)
+    duration_ms = (time.perf_counter() - started_at) * 1000 if started_at is not None else 0.0
+    inspection.record(statement, parameters, duration_ms, cursor.rowcount)
+
+
+def install(engine: Engine) -> None:
+    """エンジンにインスペクタのイベントリスナーを登録する"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def begin(method: str, path: str, request_id: Optional[str] = None) -> Token:
+    """現在のリクエストのインスペクトを開始する"""
+    inspection = QueryInspection(request_id or uuid.uuid4().hex, method, path)
+    return _current_inspection.set(inspection)
+
+
+def set_user_id(user_id: int) -> None:
+    """現在のリクエストの記録に、認証したユーザーIDを付ける（インスペクト対象外のリクエストでは何もしない）"""
+    inspection = _current_inspection.get()
+    if inspection is not None:
+        inspection.user_id = user_id
+
+
+def end(token: Token) -> Optional[QueryInspection]:
+    """現在のリクエストのインスペクトを終了し、結果を直近の記録に追加する"""
+    inspection = _current_inspection.get()
+    _current_inspection.reset(token)
+    if inspection is not None:
+        with _recent_lock:
+            _recent_inspections.append(inspection)
+    return inspection
+
+
+def get_recent(request_id: Optional[str] = None, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    直近のインスペクト結果を新しい順に取得する（request_id指定時はその1件のみ）
+    user_idを指定すると、そのユーザーのリクエストの記録のみ返す（Noneなら全ユーザー分）
+    """
+    with _recent_lock:
+        inspections = list(_recent_inspections)
+    return [
+        inspection.to_dict()
+        for inspection in reversed(inspections)
+        if (request_id is None or inspection.request_id == request_id)
+        and (user_id is None or inspection.user_id == user_id)
+    ]
@@ -0,0 +1,114 @@
+"""
+JWTトークンのローカル検証
+
+認証サービスが発行したHS256トークンを、共有のSECRET_KEY / ALGORITHMでこのサービス内で検証する
+（リクエストごとに認証サービスへ問い合わせない）。
+検証済みトークンは、トークンのハッシュをキーにした件数上限付きのLRUに、トークンの有効期限（exp）まで保持し、
+同じトークンでの2回目以降のリクエストでは署名検証を省略する。
+uidクレームを含まないトークン（uidを発行する前の認証サービスが発行したもの）は、
+呼び出し元が渡す関数でユーザー名（subクレーム）からユーザーIDを引く。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+
+from app.core.config import settings
+
+
+class _VerifiedTokenCache:
+    """検証済みトークン（ハッシュ → (ユーザーID, 有効期限)）のLRU"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_id, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user_id
+
+    def put(self, key: bytes, user_id: int, expires_at: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (user_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_token_cache = _VerifiedTokenCache(settings.TOKEN_CACHE_MAX_SIZE)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="認証情報が無効です",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def get_cached_user_id(token: Optional[str]) -> Optional[int]:
+    """検証済みトークンのキャッシュからユーザーIDを取得する（未検証・期限切れならNone）"""
+    if not token:
+        return None
+    return _token_cache.get(hashlib.sha256(token.encode()).digest())
+
+
+def verify_access_token(
+    token: Optional[str],
+    get_user_id_by_username: Optional[Callable[[str], Optional[int]]] = None,
+) -> int:
+    """
+    アクセストークンを検証し、ユーザーID（settings.JWT_USER_ID_CLAIMのクレーム）を返す
+    ユーザーIDのクレームがない場合は、get_user_id_by_username でユーザー名（sub）から引く
+    トークンがない・署名が不正・期限切れ・ユーザーを特定できない場合は401を返す
+    """
+    if not token:
+        raise _credentials_exception()
+
+    key = hashlib.sha256(token.encode()).digest()
+    user_id = _token_cache.get(key)
+    if user_id is not None:
+        return user_id
+
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM], options={"require_exp": True}
+        )
+    except JWTError:
+        raise _credentials_exception()
+
+    claim = payload.get(settings.JWT_USER_ID_CLAIM)
+    if claim is not None:
+        try:
+            user_id = int(claim)
+        except (TypeError, ValueError):
+            raise _credentials_exception()
+    else:
+        username = payload.get("sub")
+        if not username or get_user_id_by_username is None:
+            raise _credentials_exception()
+        user_id = get_user_id_by_username(username)
+        if user_id is None:
+            raise _credentials_exception()
+
+    _token_cache.put(key, user_id, float(payload["exp"]))
+    return user_id
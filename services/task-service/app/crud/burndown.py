@@ -0,0 +1,108 @@
+"""
+タスクのバーンダウン（計画と実績の推移）の計算
+
+計画値・作業記録を日付で揃えた配列に並べ、NumPyの累積和でまとめて計算する。
+1年以上の長期タスクでも、日ごとのPythonループを回さずに系列を作成できる。
+"""
+from datetime import date
+from typing import Any, Dict, List
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.models import Task, Subtask, DailyTaskPlan, DailyTimePlan, RecordWork
+
+
+def _day_index(dates: List[date], start: np.datetime64) -> np.ndarray:
+    """日付のリストを、開始日からの日数（配列の添字）に変換する"""
+    return (np.array(dates, dtype="datetime64[D]") - start).astype(np.int64)
+
+
+def get_task_burndown(db: Session, task: Task) -> Dict[str, Any]:
+    """
+    タスクの日ごとの計画と実績の推移を計算する
+    - planned_progress: 日次作業計画値の累積（%）
+    - actual_progress: サブタスクの作業量の累積（最大100）を作業貢献値で重み付けした合計（%）
+    - planned_time / actual_time: 日ごとの計画作業時間・実績作業時間（分）と、それぞれの累積
+    """
+    subtasks = db.query(Subtask.subtask_id, Subtask.contribution_value).filter(
+        Subtask.task_id == task.task_id
+    ).order_by(Subtask.subtask_id).all()
+    task_plans = db.query(DailyTaskPlan.date, DailyTaskPlan.task_plan_value).filter(
+        DailyTaskPlan.task_id == task.task_id
+    ).all()
+    time_plans = db.query(DailyTimePlan.date, DailyTimePlan.time_plan_value).filter(
+        DailyTimePlan.task_id == task.task_id
+    ).all()
+    records = db.query(RecordWork.subtask_id, RecordWork.date, RecordWork.work, RecordWork.work_time).join(
+        Subtask, Subtask.subtask_id == RecordWork.subtask_id
+    ).filter(Subtask.task_id == task.task_id).all()
+
+    # 表示期間: タスクの開始日〜完了予定日（計画・実績がはみ出す場合はその日まで広げる）
+    all_dates = [d for d in (task.start_date, task.due_date) if d is not None]
+    all_dates += [plan.date for plan in task_plans] + [plan.date for plan in time_plans]
+    all_dates += [record.date for record in records]
+    if not all_dates:
+        return {
+            "task_id": task.task_id,
+            "dates": [],
+            "planned_progress": [],
+            "actual_progress": [],
+            "planned_time": [],
+            "actual_time": [],
+            "planned_time_cumulative": [],
+            "actual_time_cumulative": [],
+        }
+
+    start = np.datetime64(min(all_dates), "D")
+    end = np.datetime64(max(all_dates), "D")
+    days = np.arange(start, end + 1, dtype="datetime64[D]")
+    day_count = len(days)
+
+    # 計画値（日付ごとに配列へ積み上げてから累積和）
+    planned_progress_daily = np.zeros(day_count)
+    if task_plans:
+        np.add.at(
+            planned_progress_daily,
+            _day_index([plan.date for plan in task_plans], start),
+            np.array([plan.task_plan_value or 0 for plan in task_plans], dtype=float)
+        )
+    planned_time_daily = np.zeros(day_count)
+    if time_plans:
+        np.add.at(
+            planned_time_daily,
+            _day_index([plan.date for plan in time_plans], start),
+            np.array([plan.time_plan_value or 0 for plan in time_plans], dtype=float)
+        )
+
+    # 実績値（サブタスク×日付の行列で累積し、サブタスクごとに100で頭打ちにしてから重み付け）
+    actual_time_daily = np.zeros(day_count)
+    actual_progress = np.zeros(day_count)
+    if records and subtasks:
+        subtask_row = {subtask.subtask_id: i for i, subtask in enumerate(subtasks)}
+        contribution = np.array([subtask.contribution_value or 0 for subtask in subtasks], dtype=float)
+
+        record_days = _day_index([record.date for record in records], start)
+        record_rows = np.array([subtask_row[record.subtask_id] for record in records], dtype=np.int64)
+
+        work = np.zeros((len(subtasks), day_count))
+        np.add.at(work, (record_rows, record_days), np.array([record.work or 0 for record in records], dtype=float))
+        subtask_progress = np.minimum(np.cumsum(work, axis=1), 100)
+        actual_progress = contribution @ subtask_progress / 100
+
+        actual_time_daily = np.bincount(
+            record_days,
+            weights=np.array([record.work_time or 0 for record in records], dtype=float),
+            minlength=day_count
+        )
+
+    return {
+        "task_id": task.task_id,
+        "dates": np.datetime_as_string(days).tolist(),
+        "planned_progress": np.round(np.cumsum(planned_progress_daily), 2).tolist(),
+        "actual_progress": np.round(actual_progress, 2).tolist(),
+        "planned_time": np.round(planned_time_daily, 2).tolist(),
+        "actual_time": np.round(actual_time_daily, 2).tolist(),
+        "planned_time_cumulative": np.round(np.cumsum(planned_time_daily), 2).tolist(),
+        "actual_time_cumulative": np.round(np.cumsum(actual_time_daily), 2).tolist(),
+    }
@@ -0,0 +1,68 @@
+"""
+ユーザーのタスク・作業履歴のエクスポート
+
+タスク・サブタスク・日次計画値・作業記録を、テーブルごとにサーバーサイドカーソル（stream_results）で
+batch_size行ずつ読み出す。全件をメモリに載せないため、作業記録が何年分あってもメモリ使用量は一定になる。
+PostgreSQLでは REPEATABLE READ のトランザクションで読み出し、全テーブルを同じ時点のデータで出力する。
+出力する行の形式（EXPORT_FIELDS）は、一括インポート（app.crud.importer）の入力形式と同じ。
+"""
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.models import DailyTaskPlan, DailyTimePlan, RecordWork, Subtask, Task
+
+# レコード種別ごとに出力する列（NDJSONのキー、CSVの列）
+EXPORT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "task": (
+        "task_id", "task_name", "task_content", "recent_schedule", "start_date", "due_date",
+        "category", "target_time", "comment",
+    ),
+    "subtask": ("subtask_id", "task_id", "subtask_name", "contribution_value"),
+    "daily_task_plan": ("daily_task_plan_id", "task_id", "date", "task_plan_value"),
+    "daily_time_plan": ("daily_time_plan_id", "task_id", "date", "time_plan_value"),
+    "record_work": ("record_work_id", "subtask_id", "task_id", "date", "work", "work_time"),
+}
+
+# CSVの列（先頭はレコード種別、続けて全種別の列を重複なく並べる）
+EXPORT_CSV_FIELDS: Tuple[str, ...] = ("type",) + tuple(dict.fromkeys(
+    field for fields in EXPORT_FIELDS.values() for field in fields
+))
+
+
+def _export_queries(user_id: int):
+    """レコード種別ごとの読み出しクエリ（出力順: タスク → サブタスク → 日次計画値 → 作業記録）"""
+    user_task_ids = select(Task.task_id).where(Task.user_id == user_id)
+    yield "task", select(
+        *(getattr(Task, field) for field in EXPORT_FIELDS["task"])
+    ).where(Task.user_id == user_id).order_by(Task.task_id)
+    yield "subtask", select(
+        *(getattr(Subtask, field) for field in EXPORT_FIELDS["subtask"])
+    ).where(Subtask.task_id.in_(user_task_ids)).order_by(Subtask.subtask_id)
+    for record_type, model in (("daily_task_plan", DailyTaskPlan), ("daily_time_plan", DailyTimePlan)):
+        id_column = model.__mapper__.primary_key[0]
+        yield record_type, select(
+            *(getattr(model, field) for field in EXPORT_FIELDS[record_type])
+        ).where(model.task_id.in_(user_task_ids)).order_by(model.task_id, model.date, id_column)
+    yield "record_work", select(
+        RecordWork.record_work_id, RecordWork.subtask_id, Subtask.task_id,
+        RecordWork.date, RecordWork.work, RecordWork.work_time,
+    ).join(Subtask, Subtask.subtask_id == RecordWork.subtask_id).where(
+        Subtask.task_id.in_(user_task_ids)
+    ).order_by(RecordWork.subtask_id, RecordWork.date)
+
+
+def iter_export_rows(db: Session, user_id: int, batch_size: int = 1000) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    ユーザーのデータを (レコード種別, 最大batch_size行の辞書のリスト) の形で順に返す
+    読み出し中はトランザクション（とサーバーサイドカーソル）を開いたままにするため、dbはエクスポート専用のセッションを渡す
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # 複数テーブルを同じスナップショットから読み出す
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    for record_type, query in _export_queries(user_id):
+        result = db.execute(query, execution_options={"stream_results": True}).yield_per(batch_size)
+        for partition in result.mappings().partitions(batch_size):
+            yield record_type, [dict(row) for row in partition]
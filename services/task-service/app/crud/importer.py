@@ -0,0 +1,406 @@
+"""
+タスク・作業履歴の一括インポート（PostgreSQLのCOPYを使用）
+
+入力はエクスポート（GET /export）と同じ形式のNDJSON / CSV。ファイル内のtask_id・subtask_idは
+行同士の対応付けにだけ使い、登録時には新しいIDを採番する（行の順序は問わない）。
+1. ファイルを1行ずつ読んで行ごとに検証し、IMPORT_BATCH_SIZE行ごとに一時テーブル（import_*）へCOPYで書き込む
+2. 行単位のエラーがなければ、重複・参照先の有無・作業貢献値と日次計画値の合計（create_taskと同じ条件）を
+   一時テーブルに対するSQLでまとめて検証する
+3. エラーがなければ、一時テーブルから各テーブルへ INSERT ... SELECT でまとめて登録し、
+   作業実績集計（subtask_stats, task_stats）も同じトランザクションで作成する
+エラーがあった場合は何も登録せず、行番号ごとのエラーを返す。
+"""
+import csv
+import io
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.crud import revision as crud_revision
+from app.schemas import task as schemas
+
+# レコード種別ごとの行の検証に使うスキーマ（値の範囲・日付の前後関係は通常のAPIと同じ）
+_RECORD_SCHEMAS = {
+    "task": schemas.TaskBase,
+    "subtask": schemas.SubtaskCreate,
+    "daily_task_plan": schemas.DailyTaskPlanCreate,
+    "daily_time_plan": schemas.DailyTimePlanCreate,
+    "record_work": schemas.RecordWorkCreate,
+}
+
+# 行同士の対応付けに使うファイル内のID（必須）
+_SOURCE_ID_FIELDS = {
+    "task": ("task_id",),
+    "subtask": ("subtask_id", "task_id"),
+    "daily_task_plan": ("task_id",),
+    "daily_time_plan": ("task_id",),
+    "record_work": ("subtask_id",),
+}
+
+# 一時テーブル: レコード種別 → (テーブル名, [(列名, 型)])
+# lineは入力ファイルの行番号、src_*はファイル内のID、task_id / subtask_idは登録時に採番したID
+_STAGING_TABLES: Dict[str, Tuple[str, List[Tuple[str, str]]]] = {
+    "task": ("import_tasks", [
+        ("line", "INTEGER"), ("src_task_id", "BIGINT"), ("task_name", "TEXT"), ("task_content", "TEXT"),
+        ("recent_schedule", "TEXT"), ("start_date", "DATE"), ("due_date", "DATE"), ("category", "TEXT"),
+        ("target_time", "INTEGER"), ("comment", "TEXT"),
+    ]),
+    "subtask": ("import_subtasks", [
+        ("line", "INTEGER"), ("src_subtask_id", "BIGINT"), ("src_task_id", "BIGINT"),
+        ("subtask_name", "TEXT"), ("contribution_value", "INTEGER"),
+    ]),
+    "daily_task_plan": ("import_daily_task_plans", [
+        ("line", "INTEGER"), ("src_task_id", "BIGINT"), ("date", "DATE"), ("task_plan_value", "DOUBLE PRECISION"),
+    ]),
+    "daily_time_plan": ("import_daily_time_plans", [
+        ("line", "INTEGER"), ("src_task_id", "BIGINT"), ("date", "DATE"), ("time_plan_value", "DOUBLE PRECISION"),
+    ]),
+    "record_work": ("import_record_works", [
+        ("line", "INTEGER"), ("src_subtask_id", "BIGINT"), ("date", "DATE"), ("work", "INTEGER"),
+        ("work_time", "INTEGER"),
+    ]),
+}
+
+# 登録時に採番したIDを保持する列（COPYでは書き込まない）
+_STAGING_ALLOCATED_COLUMNS = {
+    "import_tasks": "task_id INTEGER",
+    "import_subtasks": "subtask_id INTEGER, task_id INTEGER",
+}
+
+
+class _ImportReport:
+    """行番号ごとのエラーとレコード種別ごとの件数"""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.errors: List[Dict[str, Any]] = []
+        self.error_count = 0
+        self.counts = {record_type: 0 for record_type in _STAGING_TABLES}
+
+    def add_error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self, imported: bool, dry_run: bool) -> Dict[str, Any]:
+        return {
+            "imported": imported,
+            "dry_run": dry_run,
+            "counts": self.counts,
+            "error_count": self.error_count,
+            # 検出した順（行単位 → 検証項目ごと）ではなく行番号順に返す
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+        }
+
+
+def _iter_ndjson(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"JSONの形式が正しくありません: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "1行に1つのJSONオブジェクトを指定してください"
+            continue
+        yield line_no, record, None
+
+
+def _iter_csv(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    reader = csv.DictReader(lines)
+    for row in reader:
+        # 空欄は値なしとして扱う
+        yield reader.line_num, {key: (value if value != "" else None) for key, value in row.items() if key}, None
+
+
+def iter_records(lines: Iterable[str], format: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """入力ファイルの行を (行番号, レコード, 読み取りエラー) の形で順に返す"""
+    return _iter_ndjson(lines) if format == "ndjson" else _iter_csv(lines)
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(loc) for loc in item['loc'])}: {item['msg']}" for item in error.errors())
+
+
+def validate_record(record: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    1行分のレコードを検証し、(レコード種別, 一時テーブルに書き込む値) を返す
+    不正な場合はエラーメッセージを持つValueErrorを送出する
+    """
+    record_type = record.get("type")
+    if record_type not in _RECORD_SCHEMAS:
+        raise ValueError(f"typeが正しくありません: {record_type}（{', '.join(_RECORD_SCHEMAS)}のいずれか）")
+
+    values: Dict[str, Any] = {}
+    for field in _SOURCE_ID_FIELDS[record_type]:
+        try:
+            values[f"src_{field}"] = int(record[field])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{field}: 整数のIDを指定してください")
+
+    schema = _RECORD_SCHEMAS[record_type]
+    try:
+        model = schema.parse_obj({field: record.get(field) for field in schema.__fields__ if record.get(field) is not None})
+    except ValidationError as e:
+        raise ValueError(_format_validation_error(e))
+    values.update(model.dict())
+    return record_type, values
+
+
+def _copy_value(value: Any) -> str:
+    """COPY（CSV形式、NULLは\\N）の1列分の値（文字列は常に引用符で囲み、\\Nという文字列と区別する）"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def _copy_rows(db: Session, table: str, columns: List[str], rows: List[Dict[str, Any]]) -> None:
+    """一時テーブルにCOPY FROM STDINでまとめて書き込む"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_value(row.get(column)) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _create_staging_tables(db: Session) -> None:
+    for table, columns in _STAGING_TABLES.values():
+        column_defs = [f"{name} {sql_type}" for name, sql_type in columns]
+        if table in _STAGING_ALLOCATED_COLUMNS:
+            column_defs.append(_STAGING_ALLOCATED_COLUMNS[table])
+        db.execute(text(f"CREATE TEMPORARY TABLE {table} ({', '.join(column_defs)}) ON COMMIT DROP"))
+
+
+# 一時テーブルに対する検証（行番号とエラーメッセージを返すSQL）
+_STAGING_CHECKS = (
+    # ファイル内のIDの重複（2件目以降の行をエラーにする）
+    """
+    SELECT line, 'task_id ' || src_task_id || ' が重複しています'
+    FROM (SELECT line, src_task_id, row_number() OVER (PARTITION BY src_task_id ORDER BY line) AS n
+          FROM import_tasks) t
+    WHERE n > 1
+    """,
+    """
+    SELECT line, 'subtask_id ' || src_subtask_id || ' が重複しています'
+    FROM (SELECT line, src_subtask_id, row_number() OVER (PARTITION BY src_subtask_id ORDER BY line) AS n
+          FROM import_subtasks) s
+    WHERE n > 1
+    """,
+    # 参照先のタスク・サブタスクがファイル内にない
+    """
+    SELECT s.line, 'task_id ' || s.src_task_id || ' のタスクがありません'
+    FROM import_subtasks s LEFT JOIN import_tasks t ON t.src_task_id = s.src_task_id
+    WHERE t.line IS NULL
+    """,
+    """
+    SELECT p.line, 'task_id ' || p.src_task_id || ' のタスクがありません'
+    FROM import_daily_task_plans p LEFT JOIN import_tasks t ON t.src_task_id = p.src_task_id
+    WHERE t.line IS NULL
+    """,
+    """
+    SELECT p.line, 'task_id ' || p.src_task_id || ' のタスクがありません'
+    FROM import_daily_time_plans p LEFT JOIN import_tasks t ON t.src_task_id = p.src_task_id
+    WHERE t.line IS NULL
+    """,
+    """
+    SELECT r.line, 'subtask_id ' || r.src_subtask_id || ' のサブタスクがありません'
+    FROM import_record_works r LEFT JOIN import_subtasks s ON s.src_subtask_id = r.src_subtask_id
+    WHERE s.line IS NULL
+    """,
+    # 同じタスク・日付の計画値、同じサブタスク・日付の作業記録の重複（一意制約と同じ）
+    """
+    SELECT line, '同じタスク・日付の日次作業計画値が重複しています'
+    FROM (SELECT line, row_number() OVER (PARTITION BY src_task_id, date ORDER BY line) AS n
+          FROM import_daily_task_plans) p
+    WHERE n > 1
+    """,
+    """
+    SELECT line, '同じタスク・日付の日次作業時間計画値が重複しています'
+    FROM (SELECT line, row_number() OVER (PARTITION BY src_task_id, date ORDER BY line) AS n
+          FROM import_daily_time_plans) p
+    WHERE n > 1
+    """,
+    """
+    SELECT line, '同じサブタスク・日付の作業記録が重複しています'
+    FROM (SELECT line, row_number() OVER (PARTITION BY src_subtask_id, date ORDER BY line) AS n
+          FROM import_record_works) r
+    WHERE n > 1
+    """,
+    # タスクごとの合計（create_taskの_validate_task_dataと同じ条件、エラーはタスクの行に付ける）
+    """
+    SELECT t.line, 'サブタスクの作業貢献値の合計が100ではありません (現在: ' || COALESCE(SUM(s.contribution_value), 0) || ')'
+    FROM import_tasks t LEFT JOIN import_subtasks s ON s.src_task_id = t.src_task_id
+    GROUP BY t.line
+    HAVING COALESCE(SUM(s.contribution_value), 0) <> 100
+    """,
+    """
+    SELECT t.line, '日次作業計画値の合計が100ではありません (現在: ' || COALESCE(SUM(p.task_plan_value), 0) || ')'
+    FROM import_tasks t LEFT JOIN import_daily_task_plans p ON p.src_task_id = t.src_task_id
+    GROUP BY t.line
+    HAVING COALESCE(SUM(p.task_plan_value), 0) NOT BETWEEN 99.9 AND 100.1
+    """,
+    """
+    SELECT t.line, '日次作業時間計画値の合計が目標作業時間と一致しません (目標: '
+        || COALESCE(t.target_time, 0) || ', 現在: ' || COALESCE(SUM(p.time_plan_value), 0) || ')'
+    FROM import_tasks t LEFT JOIN import_daily_time_plans p ON p.src_task_id = t.src_task_id
+    GROUP BY t.line, t.target_time
+    HAVING COALESCE(SUM(p.time_plan_value), 0)
+        NOT BETWEEN COALESCE(t.target_time, 0) * 0.99 AND COALESCE(t.target_time, 0) * 1.01
+    """,
+)
+
+# 一時テーブルから各テーブルへの登録（IDはシーケンスから先に採番し、子テーブルはその採番結果と結合して登録する）
+_MERGE_STATEMENTS = (
+    """
+    UPDATE import_tasks t SET task_id = n.task_id
+    FROM (SELECT line, nextval(pg_get_serial_sequence('tasks', 'task_id')) AS task_id
+          FROM (SELECT line FROM import_tasks ORDER BY line) ordered) n
+    WHERE n.line = t.line
+    """,
+    """
+    UPDATE import_subtasks s SET subtask_id = n.subtask_id, task_id = t.task_id
+    FROM (SELECT line, nextval(pg_get_serial_sequence('subtasks', 'subtask_id')) AS subtask_id
+          FROM (SELECT line FROM import_subtasks ORDER BY line) ordered) n,
+         import_tasks t
+    WHERE n.line = s.line AND t.src_task_id = s.src_task_id
+    """,
+    """
+    INSERT INTO tasks (task_id, user_id, task_name, task_content, recent_schedule, start_date, due_date,
+                       category, target_time, comment)
+    SELECT task_id, :user_id, task_name, task_content, recent_schedule, start_date, due_date,
+           category, target_time, comment
+    FROM import_tasks ORDER BY task_id
+    """,
+    """
+    INSERT INTO subtasks (subtask_id, task_id, subtask_name, contribution_value)
+    SELECT subtask_id, task_id, subtask_name, contribution_value FROM import_subtasks ORDER BY subtask_id
+    """,
+    """
+    INSERT INTO daily_task_plans (task_id, date, task_plan_value)
+    SELECT t.task_id, p.date, p.task_plan_value
+    FROM import_daily_task_plans p JOIN import_tasks t ON t.src_task_id = p.src_task_id
+    ORDER BY t.task_id, p.date
+    """,
+    """
+    INSERT INTO daily_time_plans (task_id, date, time_plan_value)
+    SELECT t.task_id, p.date, p.time_plan_value
+    FROM import_daily_time_plans p JOIN import_tasks t ON t.src_task_id = p.src_task_id
+    ORDER BY t.task_id, p.date
+    """,
+    """
+    INSERT INTO record_works (subtask_id, date, work, work_time)
+    SELECT s.subtask_id, r.date, r.work, COALESCE(r.work_time, 0)
+    FROM import_record_works r JOIN import_subtasks s ON s.src_subtask_id = r.src_subtask_id
+    ORDER BY s.subtask_id, r.date
+    """,
+    # 作業実績集計（作業記録のあるサブタスク・タスクのみ、record_workの差分更新と同じ形）
+    """
+    INSERT INTO subtask_stats (subtask_id, task_id, total_work, total_work_time, work_days)
+    SELECT s.subtask_id, s.task_id, SUM(rw.work), SUM(rw.work_time), COUNT(*)
+    FROM record_works rw JOIN import_subtasks s ON s.subtask_id = rw.subtask_id
+    GROUP BY s.subtask_id, s.task_id
+    """,
+    """
+    INSERT INTO task_stats (task_id, total_work, total_work_time, total_work_records)
+    SELECT st.task_id, SUM(st.total_work), SUM(st.total_work_time), SUM(st.work_days)
+    FROM subtask_stats st JOIN import_tasks t ON t.task_id = st.task_id
+    GROUP BY st.task_id
+    """,
+)
+
+
+def import_tasks(
+    db: Session,
+    lines: Iterable[str],
+    format: str,
+    user_id: int,
+    batch_size: int = 5000,
+    max_errors: int = 1000,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    NDJSON / CSVの行をユーザーのタスクとして一括登録する（1トランザクション）
+    戻り値は {"imported", "dry_run", "counts", "error_count", "errors": [{"line", "error"}]}
+    エラーがある場合とdry_runの場合は何も登録しない
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        raise HTTPException(status_code=501, detail="一括インポートはPostgreSQLでのみ利用できます")
+
+    report = _ImportReport(max_errors)
+    try:
+        _create_staging_tables(db)
+
+        # 1. 行ごとに検証し、batch_size行ごとに一時テーブルへCOPY
+        pending: Dict[str, List[Dict[str, Any]]] = {record_type: [] for record_type in _STAGING_TABLES}
+        pending_count = 0
+
+        def flush() -> None:
+            for record_type, rows in pending.items():
+                if rows:
+                    table, columns = _STAGING_TABLES[record_type]
+                    _copy_rows(db, table, [name for name, _ in columns], rows)
+                    rows.clear()
+
+        for line_no, record, read_error in iter_records(lines, format):
+            if read_error is not None:
+                report.add_error(line_no, read_error)
+                continue
+            try:
+                record_type, values = validate_record(record)
+            except ValueError as e:
+                report.add_error(line_no, str(e))
+                continue
+            if report.error_count:
+                # エラーがあれば登録しないため、以降は検証だけ行う
+                continue
+            values["line"] = line_no
+            pending[record_type].append(values)
+            report.counts[record_type] += 1
+            pending_count += 1
+            if pending_count >= batch_size:
+                flush()
+                pending_count = 0
+        flush()
+
+        # 2. ファイル全体に対する検証（一時テーブルは自動でANALYZEされないため、先に統計を取る）
+        if not report.error_count:
+            for table, _ in _STAGING_TABLES.values():
+                db.execute(text(f"ANALYZE {table}"))
+            for check in _STAGING_CHECKS:
+                for line_no, message in db.execute(text(check + f" LIMIT {max_errors}")):
+                    report.add_error(line_no, message)
+
+        if report.error_count or dry_run:
+            db.rollback()
+            return report.to_dict(imported=False, dry_run=dry_run)
+
+        # 3. 各テーブルへまとめて登録
+        for statement in _MERGE_STATEMENTS:
+            db.execute(text(statement), {"user_id": user_id})
+        # 登録したタスクの詳細（作業実績集計を含む）と、ユーザーのタスク一覧をコミット後に無効化する
+        task_ids = list(db.execute(text("SELECT task_id FROM import_tasks")).scalars())
+        crud_revision.invalidate_task_caches(db, task_ids, [user_id])
+        db.commit()
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"インポート中にエラーが発生しました: {str(e)}")
+
+    return report.to_dict(imported=True, dry_run=False)
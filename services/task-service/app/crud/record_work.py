@@ -1,10 +1,15 @@
-from typing import List, Optional
+from collections import Counter
+from typing import List, Optional, Dict, Iterable, Any, Tuple
 from datetime import date, datetime
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, tuple_
 
-from app.models.models import RecordWork
-from app.schemas.task import RecordWorkCreate, RecordWorkUpdate
+from app.models.models import RecordWork, Subtask
+from app.schemas.task import RecordWorkCreate, RecordWorkUpdate, RecordWorkBulkItem
+from app.crud import revision as crud_revision
+from app.crud import stats as crud_stats
+from app.db.dialect import get_upsert_insert
 
 
 def get_record_work(db: Session, record_work_id: int) -> Optional[RecordWork]:
@@ -17,6 +22,17 @@ def get_record_works_by_subtask(db: Session, subtask_id: int) -> List[RecordWork
     return db.query(RecordWork).filter(RecordWork.subtask_id == subtask_id).order_by(RecordWork.date.desc()).all()
 
 
+def _get_record_work_for_update(db: Session, record_work_id: int) -> Optional[RecordWork]:
+    """
+    作業記録を行ロック（FOR UPDATE）して取得する（更新・削除用）
+    集計テーブルへの差分はロックした時点の値から計算するため、同じ記録への同時の更新・削除があっても二重に反映しない
+    （同じセッションで読み込み済みでも、ロックした時点の値で上書きする）
+    """
+    return db.query(RecordWork).filter(
+        RecordWork.record_work_id == record_work_id
+    ).populate_existing().with_for_update().first()
+
+
 def get_record_work_by_subtask_and_date(db: Session, subtask_id: int, work_date: date) -> Optional[RecordWork]:
     """サブタスクIDと日付で作業記録を取得"""
     return db.query(RecordWork).filter(
@@ -24,13 +40,23 @@ def get_record_work_by_subtask_and_date(db: Session, subtask_id: int, work_date:
     ).first()
 
 
-def create_record_work(db: Session, record_work: RecordWorkCreate, subtask_id: int) -> RecordWork:
-    """作業記録を作成（作業量と時間を統合）"""
-    # 同じ日付の記録が既に存在する場合はエラー
-    existing = get_record_work_by_subtask_and_date(db, subtask_id, record_work.date)
-    if existing:
-        raise ValueError(f"日付 {record_work.date} の作業記録は既に存在します")
-    
+def _get_task_id_of_subtask(db: Session, subtask_id: int) -> Optional[int]:
+    """サブタスクが属するタスクのIDを取得"""
+    return db.query(Subtask.task_id).filter(Subtask.subtask_id == subtask_id).scalar()
+
+
+def create_record_work(
+    db: Session,
+    record_work: RecordWorkCreate,
+    subtask_id: int,
+    task_id: Optional[int] = None
+) -> Optional[RecordWork]:
+    """
+    作業記録を作成（作業量と時間を統合）
+    同じ日付の記録の重複は、事前のSELECTではなく (subtask_id, date) のユニーク制約で検出する
+    task_idが分かっている場合は渡すと、サブタスクの再取得を省略できる
+    サブタスクが存在しない（確認後に削除された場合を含む）場合はNoneを返す
+    """
     db_record_work = RecordWork(
         subtask_id=subtask_id,
         date=record_work.date,
@@ -38,14 +64,184 @@ def create_record_work(db: Session, record_work: RecordWorkCreate, subtask_id: i
         work_time=record_work.work_time or 0
     )
     db.add(db_record_work)
+    try:
+        db.flush()
+    except IntegrityError:
+        # 違反した制約（サブタスクの外部キー・同じ日付のユニーク制約）を、ロールバック後に確認する
+        db.rollback()
+        if _get_task_id_of_subtask(db, subtask_id) is None:
+            return None
+        if get_record_work_by_subtask_and_date(db, subtask_id, record_work.date) is not None:
+            raise ValueError(f"日付 {record_work.date} の作業記録は既に存在します")
+        raise
+
+    # 集計テーブルへ差分を反映し、タスクのrevisionを進める（同じトランザクション内）
+    if task_id is None:
+        task_id = _get_task_id_of_subtask(db, subtask_id)
+        if task_id is None:
+            # 外部キーを検査しないDB（SQLite）では、存在しないサブタスクの記録も追加できてしまう
+            db.rollback()
+            return None
+    crud_stats.apply_work_delta(
+        db,
+        subtask_id=subtask_id,
+        task_id=task_id,
+        work=db_record_work.work,
+        work_time=db_record_work.work_time,
+        records=1
+    )
+    crud_revision.bump_task_revision(db, task_id)
     db.commit()
     db.refresh(db_record_work)
     return db_record_work
 
 
+RecordWorkKey = Tuple[int, date]
+
+
+def _lock_record_works(db: Session, keys: List[RecordWorkKey]) -> Dict[RecordWorkKey, Any]:
+    """既存の作業記録を行ロック（FOR UPDATE）して取得する（差分計算に使う変更前の値）"""
+    if not keys:
+        return {}
+    return {
+        (row.subtask_id, row.date): row
+        for row in db.query(
+            RecordWork.record_work_id, RecordWork.subtask_id, RecordWork.date,
+            RecordWork.work, RecordWork.work_time
+        ).filter(
+            tuple_(RecordWork.subtask_id, RecordWork.date).in_(keys)
+        ).order_by(RecordWork.subtask_id, RecordWork.date).with_for_update().all()
+    }
+
+
+def _insert_or_lock_postgresql(
+    db: Session, rows: List[Dict[str, Any]]
+) -> Tuple[Dict[RecordWorkKey, int], Dict[RecordWorkKey, Any]]:
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING で追加できた行と、追加できなかった（既存の）行に分ける
+    既存の行はその後に FOR UPDATE で取得するため、差分はロックした時点の値から計算される
+    （同時に追加された行は、コミットを待ってから既存の行として扱う）
+    戻り値は (追加した行の (subtask_id, date) → record_work_id, 既存の行の (subtask_id, date) → 変更前の行)
+    """
+    insert = get_upsert_insert(db)
+    created: Dict[RecordWorkKey, int] = {}
+    existing: Dict[RecordWorkKey, Any] = {}
+    pending = rows
+    while pending:
+        stmt = insert(RecordWork).values(pending).on_conflict_do_nothing(
+            index_elements=[RecordWork.subtask_id, RecordWork.date]
+        ).returning(RecordWork.record_work_id, RecordWork.subtask_id, RecordWork.date)
+        for row in db.execute(stmt):
+            created[(row.subtask_id, row.date)] = row.record_work_id
+        existing.update(_lock_record_works(db, [
+            (row["subtask_id"], row["date"]) for row in pending if (row["subtask_id"], row["date"]) not in created
+        ]))
+        # 追加できず、ロックする前に削除された行はもう一度追加する
+        pending = [
+            row for row in pending
+            if (row["subtask_id"], row["date"]) not in created and (row["subtask_id"], row["date"]) not in existing
+        ]
+    return created, existing
+
+
+def upsert_record_works(
+    db: Session,
+    records: List[RecordWorkBulkItem],
+    subtask_task_ids: Dict[int, int]
+) -> List[Dict[str, Any]]:
+    """
+    作業記録をまとめて登録・更新する（1トランザクション）
+    PostgreSQLでは、新しい行を INSERT ... ON CONFLICT DO NOTHING で追加し、既存の行を FOR UPDATE でロックしてから更新する
+    集計テーブルへの差分と created は、RETURNINGで追加を確認した行・ロックして読んだ変更前の値から求めるため、
+    同じサブタスク・日付への同時の登録があっても二重に数えない
+    subtask_task_idsは、所有者確認済みのサブタスクID→タスクIDの対応
+    戻り値は入力と同じ順序の、行ごとの結果（record_work_id, created）
+    """
+    keys = [(record.subtask_id, record.date) for record in records]
+    duplicated = sorted(key for key, count in Counter(keys).items() if count > 1)
+    if duplicated:
+        raise ValueError(
+            "同じサブタスク・日付の作業記録が重複しています: "
+            + ", ".join(f"subtask_id={subtask_id}, date={work_date}" for subtask_id, work_date in duplicated)
+        )
+
+    # 同時に実行される一括登録とのデッドロックを避けるため、(subtask_id, date) の順に処理する
+    rows = sorted(
+        (
+            {
+                "subtask_id": record.subtask_id,
+                "date": record.date,
+                "work": record.work,
+                "work_time": record.work_time or 0,
+            }
+            for record in records
+        ),
+        key=lambda row: (row["subtask_id"], row["date"])
+    )
+
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            created, existing = _insert_or_lock_postgresql(db, rows)
+        else:
+            # RETURNINGを使えないDBでは、既存行をロックして読み、残りをまとめて追加する
+            existing = _lock_record_works(db, keys)
+            new_keys = [key for key in keys if key not in existing]
+            created = {}
+            if new_keys:
+                db.bulk_insert_mappings(RecordWork, [
+                    row for row in rows if (row["subtask_id"], row["date"]) not in existing
+                ])
+                created = {
+                    (row.subtask_id, row.date): row.record_work_id
+                    for row in db.query(RecordWork.record_work_id, RecordWork.subtask_id, RecordWork.date).filter(
+                        tuple_(RecordWork.subtask_id, RecordWork.date).in_(new_keys)
+                    ).all()
+                }
+
+        # ロック済みの既存行を更新する
+        db.bulk_update_mappings(RecordWork, [
+            {
+                "record_work_id": existing[(row["subtask_id"], row["date"])].record_work_id,
+                "work": row["work"],
+                "work_time": row["work_time"],
+            }
+            for row in rows if (row["subtask_id"], row["date"]) in existing
+        ])
+
+        # 集計テーブルへの差分をサブタスクごとにまとめて反映
+        deltas: Dict[int, Dict[str, int]] = {}
+        for row in rows:
+            delta = deltas.setdefault(row["subtask_id"], {"work": 0, "work_time": 0, "records": 0})
+            current = existing.get((row["subtask_id"], row["date"]))
+            if current is None:
+                delta["work"] += row["work"]
+                delta["work_time"] += row["work_time"]
+                delta["records"] += 1
+            else:
+                delta["work"] += row["work"] - (current.work or 0)
+                delta["work_time"] += row["work_time"] - (current.work_time or 0)
+        for subtask_id, delta in deltas.items():
+            crud_stats.apply_work_delta(db, subtask_id=subtask_id, task_id=subtask_task_ids[subtask_id], **delta)
+        crud_revision.bump_task_revisions(db, (subtask_task_ids[subtask_id] for subtask_id in deltas))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return [
+        {
+            "record_work_id": created[key] if key in created else existing[key].record_work_id,
+            "subtask_id": key[0],
+            "date": key[1],
+            "created": key in created,
+        }
+        for key in keys
+    ]
+
+
 def update_record_work(db: Session, record_work_id: int, record_work_update: RecordWorkUpdate) -> Optional[RecordWork]:
     """作業記録を更新"""
-    db_record_work = get_record_work(db, record_work_id)
+    db_record_work = _get_record_work_for_update(db, record_work_id)
     if not db_record_work:
         return None
     
@@ -74,9 +270,22 @@ def update_record_work(db: Session, record_work_id: int, record_work_update: Rec
         if existing and existing.record_work_id != record_work_id:
             raise ValueError(f"日付 {update_data['date']} の作業記録は既に存在します")
     
+    old_work = db_record_work.work or 0
+    old_work_time = db_record_work.work_time or 0
+
     for field, value in update_data.items():
         setattr(db_record_work, field, value)
-    
+
+    # 集計テーブルへ差分を反映し、タスクのrevisionを進める（同じトランザクション内）
+    task_id = _get_task_id_of_subtask(db, db_record_work.subtask_id)
+    crud_stats.apply_work_delta(
+        db,
+        subtask_id=db_record_work.subtask_id,
+        task_id=task_id,
+        work=(db_record_work.work or 0) - old_work,
+        work_time=(db_record_work.work_time or 0) - old_work_time
+    )
+    crud_revision.bump_task_revision(db, task_id)
     db.commit()
     db.refresh(db_record_work)
     return db_record_work
@@ -84,10 +293,21 @@ def update_record_work(db: Session, record_work_id: int, record_work_update: Rec
 
 def delete_record_work(db: Session, record_work_id: int) -> bool:
     """作業記録を削除"""
-    db_record_work = get_record_work(db, record_work_id)
+    db_record_work = _get_record_work_for_update(db, record_work_id)
     if not db_record_work:
         return False
     
+    # 集計テーブルから差し引き、タスクのrevisionを進める（同じトランザクション内）
+    task_id = _get_task_id_of_subtask(db, db_record_work.subtask_id)
+    crud_stats.apply_work_delta(
+        db,
+        subtask_id=db_record_work.subtask_id,
+        task_id=task_id,
+        work=-(db_record_work.work or 0),
+        work_time=-(db_record_work.work_time or 0),
+        records=-1
+    )
+    crud_revision.bump_task_revision(db, task_id)
     db.delete(db_record_work)
     db.commit()
     return True
@@ -95,28 +315,15 @@ def delete_record_work(db: Session, record_work_id: int) -> bool:
 
 def get_subtask_progress(db: Session, subtask_id: int) -> int:
     """サブタスクの進捗率を計算（作業記録の合計）"""
-    total_work = db.query(RecordWork).filter(RecordWork.subtask_id == subtask_id).with_entities(
-        func.sum(RecordWork.work)
-    ).scalar()
-    
-    if total_work is None:
-        return 0
+    total_work = crud_stats.get_subtask_summaries(db, [subtask_id])[subtask_id]["total_work"]
     
     # 進捗率は最大100%とする
     return min(total_work, 100)
 
 
 def get_total_work_time_by_task(db: Session, task_id: int) -> int:
-    """タスクの総作業時間を計算（サブタスクの作業時間の合計、分単位）"""
-    from app.models.models import Subtask
-    
-    total_time = db.query(RecordWork).join(Subtask).filter(
-        Subtask.task_id == task_id
-    ).with_entities(
-        func.sum(RecordWork.work_time)
-    ).scalar()
-    
-    return total_time or 0
+    """タスクの総作業時間を取得（集計テーブルから、分単位）"""
+    return crud_stats.get_task_summary(db, task_id)["total_work_time"]
 
 
 def get_record_works_by_task(db: Session, task_id: int) -> List[RecordWork]:
@@ -142,32 +349,15 @@ def get_record_works_by_task_and_date_range(db: Session, task_id: int, start_dat
 
 
 def get_subtask_work_summary(db: Session, subtask_id: int) -> dict:
-    """サブタスクの作業実績集計を取得"""
-    result = db.query(
-        func.sum(RecordWork.work).label('total_work'),
-        func.sum(RecordWork.work_time).label('total_work_time'),
-        func.count(RecordWork.record_work_id).label('work_days')
-    ).filter(RecordWork.subtask_id == subtask_id).first()
-    
-    return {
-        'total_work': result.total_work or 0,
-        'total_work_time': result.total_work_time or 0,
-        'work_days': result.work_days or 0
-    }
+    """サブタスクの作業実績集計を取得（集計テーブルの主キー検索）"""
+    return crud_stats.get_subtask_summaries(db, [subtask_id])[subtask_id]
 
 
 def get_task_work_summary(db: Session, task_id: int) -> dict:
-    """タスクの作業実績集計を取得"""
-    from app.models.models import Subtask
-    
-    result = db.query(
-        func.sum(RecordWork.work).label('total_work'),
-        func.sum(RecordWork.work_time).label('total_work_time'),
-        func.count(RecordWork.record_work_id).label('total_work_records')
-    ).join(Subtask).filter(Subtask.task_id == task_id).first()
-    
-    return {
-        'total_work': result.total_work or 0,
-        'total_work_time': result.total_work_time or 0,
-        'total_work_records': result.total_work_records or 0
-    }
+    """タスクの作業実績集計を取得（集計テーブルの主キー検索）"""
+    return crud_stats.get_task_summary(db, task_id)
+
+
+def get_subtask_work_summaries(db: Session, subtask_ids: Iterable[int]) -> Dict[int, dict]:
+    """複数サブタスクの作業実績集計をまとめて取得（集計テーブルをIN検索する1クエリ）"""
+    return crud_stats.get_subtask_summaries(db, subtask_ids)
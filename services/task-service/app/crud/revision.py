@@ -0,0 +1,43 @@
+"""
+タスクのリビジョン（tasks.revision）の更新
+
+タスク本体・サブタスク・日次計画値・作業記録を変更するすべての処理で、
+同じトランザクション内で対象タスクのrevisionを1つ進める。
+GET /tasks/ と GET /tasks/{task_id} は、revisionからETagを作り、変更がなければ304を返す。
+あわせて、対象タスクの詳細と、その所有者のタスク一覧のレスポンスキャッシュをコミット後に無効化する。
+"""
+from typing import Iterable
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core import cache
+from app.models.models import Task
+
+
+def bump_task_revision(db: Session, task_id: int) -> None:
+    """タスクのrevisionを1つ進める（コミットは呼び出し側で行う）"""
+    bump_task_revisions(db, [task_id])
+
+
+def bump_task_revisions(db: Session, task_ids: Iterable[int]) -> None:
+    """複数タスクのrevisionを1つのUPDATEでまとめて進める（コミットは呼び出し側で行う）"""
+    task_ids = sorted(set(task_ids))
+    if not task_ids:
+        return
+    stmt = update(Task).where(Task.task_id.in_(task_ids)).values(revision=Task.revision + 1)
+    if db.get_bind().dialect.name == "postgresql":
+        user_ids = set(db.execute(stmt.returning(Task.user_id)).scalars())
+    else:
+        db.execute(stmt)
+        user_ids = set(db.execute(select(Task.user_id).where(Task.task_id.in_(task_ids))).scalars())
+
+    invalidate_task_caches(db, task_ids, user_ids)
+
+
+def invalidate_task_caches(db: Session, task_ids: Iterable[int], user_ids: Iterable[int]) -> None:
+    """タスクの詳細と、ユーザーのタスク一覧のレスポンスキャッシュをコミット後に無効化する"""
+    cache.invalidate_on_commit(
+        db,
+        [cache.task_tag(task_id) for task_id in task_ids] + [cache.user_tasks_tag(user_id) for user_id in user_ids]
+    )
@@ -0,0 +1,247 @@
+"""
+作業実績集計テーブル（subtask_stats, task_stats）の操作
+
+record_worksの作成・更新・削除時に、同じトランザクション内で差分（delta）だけを加算する。
+集計の読み出しは主キー検索のみで済むため、作業記録の件数に関係なく一定の速さで返せる。
+差分更新のずれは rebuild_stats() で検出・修正する（python -m app.cli rebuild-stats）。
+"""
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.db.dialect import get_upsert_insert
+from app.models.models import RecordWork, Subtask, SubtaskStats, TaskStats
+
+
+def _empty_subtask_summary() -> Dict[str, int]:
+    return {"total_work": 0, "total_work_time": 0, "work_days": 0}
+
+
+def _empty_task_summary() -> Dict[str, int]:
+    return {"total_work": 0, "total_work_time": 0, "total_work_records": 0}
+
+
+def _add_delta(db: Session, model, key: Dict[str, int], deltas: Dict[str, int]) -> None:
+    """集計行に差分を加算する（行がなければ差分の値で作成する）"""
+    insert = get_upsert_insert(db)
+    pk_columns = [getattr(model, name) for name in key if getattr(model, name).primary_key]
+
+    if insert is not None:
+        stmt = insert(model).values(**key, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=pk_columns,
+            set_={name: getattr(model, name) + getattr(stmt.excluded, name) for name in deltas}
+        )
+        db.execute(stmt)
+        return
+
+    # ON CONFLICTを使えないDBでは、UPDATEして該当行がなければINSERTする
+    query = db.query(model)
+    for column in pk_columns:
+        query = query.filter(column == key[column.key])
+    updated = query.update(
+        {getattr(model, name): getattr(model, name) + value for name, value in deltas.items()},
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(model(**key, **deltas))
+        db.flush()
+
+
+def apply_work_delta(
+    db: Session,
+    subtask_id: int,
+    task_id: int,
+    work: int = 0,
+    work_time: int = 0,
+    records: int = 0
+) -> None:
+    """作業記録の変更分をサブタスク・タスクの集計に反映する（コミットは呼び出し側で行う）"""
+    if not (work or work_time or records):
+        return
+
+    _add_delta(
+        db, SubtaskStats,
+        {"subtask_id": subtask_id, "task_id": task_id},
+        {"total_work": work, "total_work_time": work_time, "work_days": records}
+    )
+    _add_delta(
+        db, TaskStats,
+        {"task_id": task_id},
+        {"total_work": work, "total_work_time": work_time, "total_work_records": records}
+    )
+
+
+def remove_subtask_stats(db: Session, subtask_id: int) -> None:
+    """サブタスク削除時に、その集計をタスクの集計から差し引いて削除する"""
+    stats = db.query(SubtaskStats).filter(SubtaskStats.subtask_id == subtask_id).first()
+    if stats is None:
+        return
+    task_delta = {
+        "total_work": -stats.total_work,
+        "total_work_time": -stats.total_work_time,
+        "total_work_records": -stats.work_days,
+    }
+    _add_delta(db, TaskStats, {"task_id": stats.task_id}, task_delta)
+    db.query(SubtaskStats).filter(SubtaskStats.subtask_id == subtask_id).delete(synchronize_session=False)
+
+
+def remove_task_stats(db: Session, task_id: int) -> None:
+    """タスク削除時に、タスクとその全サブタスクの集計を削除する"""
+    db.query(SubtaskStats).filter(SubtaskStats.task_id == task_id).delete(synchronize_session=False)
+    db.query(TaskStats).filter(TaskStats.task_id == task_id).delete(synchronize_session=False)
+
+
+def get_subtask_summaries(db: Session, subtask_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    """複数サブタスクの作業実績集計を主キー検索でまとめて取得する"""
+    subtask_ids = list(subtask_ids)
+    summaries = {subtask_id: _empty_subtask_summary() for subtask_id in subtask_ids}
+    if not subtask_ids:
+        return summaries
+
+    rows = db.query(SubtaskStats).filter(SubtaskStats.subtask_id.in_(subtask_ids)).all()
+    for row in rows:
+        summaries[row.subtask_id] = {
+            "total_work": row.total_work,
+            "total_work_time": row.total_work_time,
+            "work_days": row.work_days,
+        }
+    return summaries
+
+
+def get_task_summary(db: Session, task_id: int) -> Dict[str, int]:
+    """タスクの作業実績集計を主キー検索で取得する"""
+    row = db.query(TaskStats).filter(TaskStats.task_id == task_id).first()
+    if row is None:
+        return _empty_task_summary()
+    return {
+        "total_work": row.total_work,
+        "total_work_time": row.total_work_time,
+        "total_work_records": row.total_work_records,
+    }
+
+
+def _lock_stats_tables(db: Session) -> None:
+    """
+    集計テーブルへの差分の反映を、このトランザクションの終わりまで止める（PostgreSQLのみ）
+    SHARE ROW EXCLUSIVEは差分の反映（INSERT / UPDATE）と競合するため、
+    - ロックより前にコミットされた変更は、ロック後の集計に含まれる
+    - 作業記録を変更済みで差分の反映待ちの（未コミットの）トランザクションは、作り直した後に差分を加算する
+    のどちらかになり、作り直しの間の差分が失われない
+    （SQLiteは書き込みのトランザクションが1つずつしか実行されないため不要）
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE subtask_stats, task_stats IN SHARE ROW EXCLUSIVE MODE"))
+
+
+def _rebuild_stats_tables(db: Session) -> None:
+    """集計テーブルをrecord_worksからDB内で作り直す（DELETE + INSERT ... SELECT）"""
+    db.query(SubtaskStats).delete(synchronize_session=False)
+    db.query(TaskStats).delete(synchronize_session=False)
+    db.execute(SubtaskStats.__table__.insert().from_select(
+        ["subtask_id", "task_id", "total_work", "total_work_time", "work_days"],
+        select(
+            RecordWork.subtask_id,
+            Subtask.task_id,
+            func.coalesce(func.sum(RecordWork.work), 0),
+            func.coalesce(func.sum(RecordWork.work_time), 0),
+            func.count(RecordWork.record_work_id)
+        ).join(Subtask, Subtask.subtask_id == RecordWork.subtask_id).group_by(RecordWork.subtask_id, Subtask.task_id)
+    ))
+    db.execute(TaskStats.__table__.insert().from_select(
+        ["task_id", "total_work", "total_work_time", "total_work_records"],
+        select(
+            SubtaskStats.task_id,
+            func.sum(SubtaskStats.total_work),
+            func.sum(SubtaskStats.total_work_time),
+            func.sum(SubtaskStats.work_days)
+        ).group_by(SubtaskStats.task_id)
+    ))
+
+
+def rebuild_stats(db: Session, fix: bool = True) -> Dict[str, Any]:
+    """
+    record_worksから集計をやり直し、集計テーブルとのずれを検出する
+    fix=Trueの場合は、集計テーブルをロックしてからずれを検出し、同じトランザクションで集計テーブルを作り直す
+    """
+    if fix:
+        _lock_stats_tables(db)
+
+    expected_subtasks = {
+        row.subtask_id: {
+            "task_id": row.task_id,
+            "total_work": row.total_work or 0,
+            "total_work_time": row.total_work_time or 0,
+            "work_days": row.work_days or 0,
+        }
+        for row in db.query(
+            RecordWork.subtask_id,
+            Subtask.task_id,
+            func.sum(RecordWork.work).label("total_work"),
+            func.sum(RecordWork.work_time).label("total_work_time"),
+            func.count(RecordWork.record_work_id).label("work_days")
+        ).join(Subtask, Subtask.subtask_id == RecordWork.subtask_id).group_by(
+            RecordWork.subtask_id, Subtask.task_id
+        ).all()
+    }
+
+    expected_tasks: Dict[int, Dict[str, int]] = {}
+    for summary in expected_subtasks.values():
+        task_summary = expected_tasks.setdefault(summary["task_id"], _empty_task_summary())
+        task_summary["total_work"] += summary["total_work"]
+        task_summary["total_work_time"] += summary["total_work_time"]
+        task_summary["total_work_records"] += summary["work_days"]
+
+    actual_subtasks = {
+        row.subtask_id: {
+            "task_id": row.task_id,
+            "total_work": row.total_work,
+            "total_work_time": row.total_work_time,
+            "work_days": row.work_days,
+        }
+        for row in db.query(SubtaskStats).all()
+    }
+    actual_tasks = {
+        row.task_id: {
+            "total_work": row.total_work,
+            "total_work_time": row.total_work_time,
+            "total_work_records": row.total_work_records,
+        }
+        for row in db.query(TaskStats).all()
+    }
+
+    subtask_drift = _find_drift(expected_subtasks, actual_subtasks, "subtask_id", _empty_subtask_summary)
+    task_drift = _find_drift(expected_tasks, actual_tasks, "task_id", _empty_task_summary)
+
+    fixed = False
+    if fix and (subtask_drift or task_drift):
+        try:
+            _rebuild_stats_tables(db)
+            db.commit()
+            fixed = True
+        except Exception:
+            db.rollback()
+            raise
+
+    elif fix:
+        # ずれがなければロックを解放する
+        db.rollback()
+
+    return {
+        "subtask_drift": len(subtask_drift),
+        "task_drift": len(task_drift),
+        "fixed": fixed,
+        "examples": (subtask_drift + task_drift)[:20],
+    }
+
+
+def _find_drift(expected: Dict[int, Dict], actual: Dict[int, Dict], key_name: str, empty) -> List[Dict[str, Any]]:
+    """期待値と集計テーブルの差分を列挙する（集計行がない場合は0として比較）"""
+    drift = []
+    for key in sorted(set(expected) | set(actual)):
+        expected_row = {name: (expected.get(key) or {}).get(name, 0) for name in empty()}
+        actual_row = {name: (actual.get(key) or {}).get(name, 0) for name in empty()}
+        if expected_row != actual_row:
+            drift.append({key_name: key, "expected": expected_row, "actual": actual_row})
+    return drift
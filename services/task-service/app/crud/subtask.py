@@ -4,6 +4,8 @@ from fastapi import HTTPException
 
 from app.models.models import Task, Subtask, RecordWork
 from app.schemas import task as schemas
+from app.crud import revision as crud_revision
+from app.crud import stats as crud_stats
 
 
 def get_subtask(db: Session, subtask_id: int) -> Optional[Subtask]:
@@ -13,7 +15,55 @@ def get_subtask(db: Session, subtask_id: int) -> Optional[Subtask]:
 
 def get_subtasks(db: Session, task_id: int) -> List[Subtask]:
     """指定されたタスクのサブタスク一覧を取得する"""
-    return db.query(Subtask).filter(Subtask.task_id == task_id).all()
+    return db.query(Subtask).filter(Subtask.task_id == task_id).order_by(Subtask.subtask_id).all()
+
+
+def get_owned_subtask_task_ids(db: Session, subtask_ids: List[int], user_id: int) -> Dict[int, int]:
+    """
+    複数サブタスクの存在と所有者をまとめて確認する（1クエリ）
+    戻り値はサブタスクID→タスクIDの対応
+    """
+    rows = db.query(Subtask.subtask_id, Subtask.task_id, Task.user_id).join(
+        Task, Task.task_id == Subtask.task_id
+    ).filter(Subtask.subtask_id.in_(set(subtask_ids))).all()
+
+    found = {row.subtask_id: row for row in rows}
+    missing = sorted(set(subtask_ids) - set(found))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"サブタスクが見つかりません: {missing}")
+    if any(row.user_id != user_id for row in rows):
+        raise HTTPException(status_code=403, detail="このサブタスクへのアクセス権限がありません")
+
+    return {row.subtask_id: row.task_id for row in rows}
+
+
+def build_subtask_models(db: Session, db_subtasks: List[Subtask]) -> List[schemas.Subtask]:
+    """
+    サブタスクをレスポンス用のPydanticモデルに変換する
+    作業実績集計は全サブタスク分を1クエリで取得し、進捗率（作業量の合計、最大100）を設定する
+    """
+    work_summaries = crud_stats.get_subtask_summaries(db, [subtask.subtask_id for subtask in db_subtasks])
+
+    subtasks = []
+    for subtask in db_subtasks:
+        work_summary = work_summaries[subtask.subtask_id]
+        subtasks.append(schemas.Subtask(
+            subtask_id=subtask.subtask_id,
+            task_id=subtask.task_id,
+            subtask_name=subtask.subtask_name,
+            contribution_value=subtask.contribution_value,
+            progress=min(work_summary["total_work"], 100),
+            total_work=work_summary["total_work"],
+            total_work_time=work_summary["total_work_time"],
+            work_days=work_summary["work_days"]
+        ))
+    return subtasks
+
+
+def calculate_task_progress(subtasks: List[schemas.Subtask]) -> int:
+    """タスクの進捗率を計算する（サブタスクの進捗率を作業貢献値で重み付けした合計、0-100）"""
+    weighted = sum((subtask.contribution_value or 0) * subtask.progress for subtask in subtasks)
+    return max(0, min(round(weighted / 100), 100))
 
 
 def create_subtask(db: Session, subtask: schemas.SubtaskCreate, task_id: int, user_id: int) -> Subtask:
@@ -33,6 +83,7 @@ def create_subtask(db: Session, subtask: schemas.SubtaskCreate, task_id: int, us
     )
     
     db.add(db_subtask)
+    crud_revision.bump_task_revision(db, task_id)
     db.commit()
     db.refresh(db_subtask)
     
@@ -54,6 +105,7 @@ def update_subtask(db: Session, subtask_id: int, subtask: schemas.SubtaskUpdate,
     update_data = subtask.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_subtask, key, value)
+    crud_revision.bump_task_revision(db, db_subtask.task_id)
     
     db.commit()
     db.refresh(db_subtask)
@@ -74,7 +126,10 @@ def delete_subtask(db: Session, subtask_id: int, user_id: int) -> Dict[str, Any]
     
     task_id = db_subtask.task_id
     
+    # 集計テーブルからサブタスク分を差し引く
+    crud_stats.remove_subtask_stats(db, subtask_id)
     db.delete(db_subtask)
+    crud_revision.bump_task_revision(db, task_id)
     db.commit()
     
     return {"subtask_id": subtask_id, "deleted": True} 
\ No newline at end of file
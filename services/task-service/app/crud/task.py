@@ -1,12 +1,21 @@
-from typing import List, Optional, Dict, Any
-from datetime import date, datetime, timedelta
+from collections import defaultdict, deque
+from typing import List, Optional, Deque, Dict, Any, Tuple
+from datetime import date, datetime
+from sqlalchemy import and_, func, insert, or_, select, tuple_
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+import base64
 import logging
 import json
+import numpy as np
 
+from app.core import plan_engine
 from app.models.models import Task, Subtask, DailyTaskPlan, DailyTimePlan
 from app.schemas import task as schemas
+from app.crud import record_work as crud_record_work
+from app.crud import revision as crud_revision
+from app.crud import stats as crud_stats
+from app.crud import subtask as crud_subtask
 
 # ロガーの設定
 logger = logging.getLogger(__name__)
@@ -17,95 +26,322 @@ def get_task(db: Session, task_id: int) -> Optional[Task]:
     return db.query(Task).filter(Task.task_id == task_id).first()
 
 
-def get_tasks(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Task]:
-    """ユーザーのタスク一覧を取得する"""
-    # SQLクエリをログに出力（開発用）
-    query = db.query(Task).filter(Task.user_id == user_id).offset(skip).limit(limit)
-    sql_statement = str(query.statement.compile(compile_kwargs={"literal_binds": True}))
-    logger.info(f"SQL query: {sql_statement}")
-    
-    # クエリ実行
-    tasks = query.all()
-    
-    # 結果をログに出力
-    logger.info(f"User {user_id} tasks retrieved: {len(tasks)} tasks")
-    
-    # 開発用：タスクがない場合は空のリストを返す
-    if not tasks:
-        logger.warning(f"No tasks found for user {user_id}")
+# タスク一覧の並び順（キーセットページネーションのソートキー）
+TASK_ORDER_FIELDS = ("due_date", "task_id")
+
+# タスク一覧で取得する列（サイズの大きい recent_schedule・comment は詳細取得時のみ読む）
+TASK_SUMMARY_COLUMNS = (
+    Task.task_id, Task.user_id, Task.task_name, Task.task_content, Task.start_date,
+    Task.due_date, Task.category, Task.target_time, Task.revision,
+)
+
+
+def _encode_task_cursor(order_by: str, task) -> str:
+    """ページの最後のタスクから、次ページ取得用の不透明なカーソル文字列を作成する"""
+    payload = {"o": order_by, "id": task.task_id}
+    if order_by == "due_date":
+        payload["d"] = task.due_date.isoformat() if task.due_date else None
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_task_cursor(cursor: str, order_by: str) -> Dict[str, Any]:
+    """カーソル文字列を復元する（不正な値や並び順の不一致は400エラー）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        last_id = int(payload["id"])
+        last_due_date = None
+        if payload.get("d") is not None:
+            last_due_date = date.fromisoformat(payload["d"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="カーソルの形式が正しくありません")
+    if payload.get("o") != order_by:
+        raise HTTPException(status_code=400, detail="カーソルと並び順が一致しません")
+    return {"id": last_id, "due_date": last_due_date}
+
+
+def get_tasks(
+    db: Session,
+    user_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order_by: str = "due_date"
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    ユーザーのタスク一覧を取得する（キーセットページネーション）
+    (user_id, due_date, task_id) の複合インデックスに沿って並べ、カーソル以降のタスクを取得する
+    ORMオブジェクトは作らず、TASK_SUMMARY_COLUMNSの列だけを行（Row）として取得する
+    戻り値は (タスクの行の一覧, 次ページのカーソル（最終ページならNone）)
+    """
+    if order_by not in TASK_ORDER_FIELDS:
+        raise HTTPException(status_code=400, detail=f"並び順が正しくありません: {order_by}")
+
+    query = db.query(*TASK_SUMMARY_COLUMNS).filter(Task.user_id == user_id)
+
+    if order_by == "due_date":
+        if cursor:
+            last = _decode_task_cursor(cursor, order_by)
+            if last["due_date"] is None:
+                # 期限日なしのタスクは末尾に並ぶため、task_idのみで続きを取得
+                query = query.filter(and_(Task.due_date.is_(None), Task.task_id > last["id"]))
+            else:
+                query = query.filter(or_(
+                    tuple_(Task.due_date, Task.task_id) > tuple_(last["due_date"], last["id"]),
+                    Task.due_date.is_(None)
+                ))
+        query = query.order_by(Task.due_date.asc().nullslast(), Task.task_id.asc())
+    else:
+        if cursor:
+            last = _decode_task_cursor(cursor, order_by)
+            query = query.filter(Task.task_id > last["id"])
+        query = query.order_by(Task.task_id.asc())
+
+    # 次ページの有無を判定するため1件多く取得する
+    tasks = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = _encode_task_cursor(order_by, tasks[-1])
+
+    # 結果件数は1リクエストごとに出るため、DEBUGでのみ出力する（メッセージの組み立ても出力時まで遅らせる）
+    logger.debug("User %s tasks retrieved: %d tasks", user_id, len(tasks))
+    return tasks, next_cursor
+
+
+def count_tasks(db: Session, user_id: int) -> int:
+    """ユーザーのタスク総数を取得する（user_idのインデックスのみで数えられる）"""
+    return db.query(func.count(Task.task_id)).filter(Task.user_id == user_id).scalar() or 0
+
+
+def load_task_summaries(db: Session, task_rows: List[Any]) -> List[Dict[str, Any]]:
+    """
+    タスク一覧の行を、一覧レスポンス（schemas.TaskSummary の形）の辞書にまとめて変換する
+    サブタスクも必要な列だけを取得し、Pydanticモデルを経由せずに辞書を組み立てる
+    （レスポンスはそのままJSONにするため、検証・変換のコストがかからない）
+    """
+    if not task_rows:
         return []
-    
-    # 開発用：タスクの内容をログに出力
-    for i, task in enumerate(tasks):
-        task_dict = {
-            "task_id": task.task_id,
-            "user_id": task.user_id,
-            "task_name": task.task_name,
-            "start_date": task.start_date.isoformat() if task.start_date else None,
-            "due_date": task.due_date.isoformat() if task.due_date else None,
-        }
-        logger.info(f"Task {i+1}: {json.dumps(task_dict)}")
-    
+
+    task_ids = [row.task_id for row in task_rows]
+
+    # 1. 全タスク分のサブタスクを1クエリで取得（必要な列のみ）
+    subtask_rows = db.query(
+        Subtask.subtask_id, Subtask.task_id, Subtask.subtask_name, Subtask.contribution_value
+    ).filter(Subtask.task_id.in_(task_ids)).order_by(Subtask.subtask_id).all()
+
+    # 2. 全サブタスク分の作業実績集計を1クエリで取得し、進捗率を計算
+    work_summaries = crud_stats.get_subtask_summaries(db, [row.subtask_id for row in subtask_rows])
+    subtasks_by_task: Dict[int, List[Dict[str, Any]]] = {task_id: [] for task_id in task_ids}
+    for row in subtask_rows:
+        work_summary = work_summaries[row.subtask_id]
+        subtasks_by_task[row.task_id].append({
+            "subtask_name": row.subtask_name,
+            "contribution_value": row.contribution_value,
+            "subtask_id": row.subtask_id,
+            "task_id": row.task_id,
+            "progress": min(work_summary["total_work"], 100),
+            "total_work": work_summary["total_work"],
+            "total_work_time": work_summary["total_work_time"],
+            "work_days": work_summary["work_days"],
+        })
+
+    tasks = []
+    for row in task_rows:
+        subtasks = subtasks_by_task[row.task_id]
+        # calculate_task_progress()と同じ計算（作業貢献値で重み付けした合計、0-100）
+        weighted = sum((subtask["contribution_value"] or 0) * subtask["progress"] for subtask in subtasks)
+        tasks.append({
+            "task_id": row.task_id,
+            "user_id": row.user_id,
+            "task_name": row.task_name,
+            "task_content": row.task_content,
+            "start_date": row.start_date,
+            "due_date": row.due_date,
+            "category": row.category,
+            "target_time": row.target_time,
+            "subtasks": subtasks,
+            "progress": max(0, min(round(weighted / 100), 100)),
+            "total_work_time": sum(subtask["total_work_time"] for subtask in subtasks),
+        })
+
     return tasks
 
 
-def create_task(db: Session, task: schemas.TaskCreate, user_id: int) -> Task:
-    """新しいタスクを作成する"""
+def load_task_details(db: Session, db_tasks: List[Task], include_plans: bool = False) -> List[schemas.Task]:
+    """
+    タスク一覧をレスポンス用のPydanticモデルにまとめて変換する
+    サブタスク・作業実績集計（・日次計画値）はタスク数に関係なく固定回数のクエリで取得し、
+    サブタスク・タスクの進捗率もここでまとめて計算する
+    """
+    if not db_tasks:
+        return []
+
+    task_ids = [db_task.task_id for db_task in db_tasks]
+
+    # 1. 全タスク分のサブタスクを1クエリで取得
+    subtasks_db = db.query(Subtask).filter(Subtask.task_id.in_(task_ids)).order_by(Subtask.subtask_id).all()
+
+    # 2. 全サブタスク分の作業実績集計を1クエリで取得し、サブタスクの進捗率とあわせて変換
+    subtask_models = crud_subtask.build_subtask_models(db, subtasks_db)
+    subtask_models_by_task: Dict[int, List[schemas.Subtask]] = {task_id: [] for task_id in task_ids}
+    for subtask_model in subtask_models:
+        subtask_models_by_task[subtask_model.task_id].append(subtask_model)
+
+    # 3. 日次計画値（詳細表示時のみ）をテーブルごとに1クエリで取得
+    task_plans_by_task: Dict[int, List[schemas.DailyTaskPlan]] = {task_id: [] for task_id in task_ids}
+    time_plans_by_task: Dict[int, List[schemas.DailyTimePlan]] = {task_id: [] for task_id in task_ids}
+    if include_plans:
+        task_plans_db = db.query(DailyTaskPlan).filter(
+            DailyTaskPlan.task_id.in_(task_ids)
+        ).order_by(DailyTaskPlan.date).all()
+        for plan in task_plans_db:
+            task_plans_by_task[plan.task_id].append(schemas.DailyTaskPlan(
+                daily_task_plan_id=plan.daily_task_plan_id,
+                task_id=plan.task_id,
+                date=plan.date,
+                task_plan_value=plan.task_plan_value
+            ))
+
+        time_plans_db = db.query(DailyTimePlan).filter(
+            DailyTimePlan.task_id.in_(task_ids)
+        ).order_by(DailyTimePlan.date).all()
+        for plan in time_plans_db:
+            time_plans_by_task[plan.task_id].append(schemas.DailyTimePlan(
+                daily_time_plan_id=plan.daily_time_plan_id,
+                task_id=plan.task_id,
+                date=plan.date,
+                time_plan_value=plan.time_plan_value
+            ))
+
+    tasks = []
+    for db_task in db_tasks:
+        subtasks = subtask_models_by_task[db_task.task_id]
+
+        # タスクの作業時間合計はサブタスクの集計値から求める（追加クエリなし）
+        total_work_time = sum(subtask.total_work_time for subtask in subtasks)
+
+        tasks.append(schemas.Task(
+            task_id=db_task.task_id,
+            user_id=db_task.user_id,
+            task_name=db_task.task_name,
+            task_content=db_task.task_content,
+            recent_schedule=db_task.recent_schedule,
+            start_date=db_task.start_date,
+            due_date=db_task.due_date,
+            category=db_task.category,
+            target_time=db_task.target_time,
+            comment=db_task.comment,
+            progress=crud_subtask.calculate_task_progress(subtasks),
+            subtasks=subtasks,
+            daily_task_plans=task_plans_by_task[db_task.task_id],
+            daily_time_plans=time_plans_by_task[db_task.task_id],
+            total_work_time=total_work_time
+        ))
+
+    return tasks
+
+
+def _insert_rows_returning_ids(db: Session, model, rows: List[Dict[str, Any]], key_columns: Tuple[str, ...]) -> List[int]:
+    """
+    新規タスクに紐づく行をまとめてINSERTし、採番されたIDをrowsの順に返す
+    PostgreSQLでは複数行のINSERT ... RETURNINGを1回実行する
+    RETURNINGの行の順序は保証されないため、IDと一緒に行を識別する列（key_columns）を返させ、その値でrowsと対応付ける
+    （キーの値が同じ行同士は、どちらのIDを割り当てても同じ内容になる）
+    RETURNINGを使えないDBでは、executemanyでINSERTしてから新規タスクの行のIDとキーを取得する
+    """
+    if not rows:
+        return []
+    id_column = model.__mapper__.primary_key[0]
+    key_attributes = [getattr(model, name) for name in key_columns]
+    if db.get_bind().dialect.name == "postgresql":
+        returned = db.execute(insert(model).values(rows).returning(id_column, *key_attributes)).all()
+    else:
+        db.execute(insert(model), rows)
+        returned = db.execute(
+            select(id_column, *key_attributes).where(model.task_id == rows[0]["task_id"]).order_by(id_column)
+        ).all()
+
+    ids_by_key: Dict[Tuple[Any, ...], Deque[int]] = defaultdict(deque)
+    for row_id, *key in returned:
+        ids_by_key[tuple(key)].append(row_id)
+    return [ids_by_key[tuple(row[name] for name in key_columns)].popleft() for row in rows]
+
+
+def create_task(db: Session, task: schemas.TaskCreate, user_id: int) -> schemas.Task:
+    """
+    新しいタスクを作成する
+    サブタスク・日次計画値はテーブルごとに複数行INSERTでまとめて登録し、
+    コミット後の再取得（refresh）はせずに、登録した値からレスポンスを組み立てる
+    """
     # バリデーション
     _validate_task_data(task)
 
     # トランザクション開始
     try:
         # 1. タスク本体の作成
-        db_task = Task(
-            user_id=user_id,
-            task_name=task.task_name,
-            task_content=task.task_content,
-            recent_schedule=task.recent_schedule,
-            start_date=task.start_date,
-            due_date=task.due_date,
-            category=task.category,
-            target_time=task.target_time,
-            comment=task.comment
-        )
-        db.add(db_task)
-        db.flush()  # IDを取得するためにフラッシュ
+        task_values = {
+            "user_id": user_id,
+            "task_name": task.task_name,
+            "task_content": task.task_content,
+            "recent_schedule": task.recent_schedule,
+            "start_date": task.start_date,
+            "due_date": task.due_date,
+            "category": task.category,
+            "target_time": task.target_time,
+            "comment": task.comment,
+        }
+        task_id = db.execute(insert(Task).values(**task_values)).inserted_primary_key[0]
 
         # 2. サブタスクの作成
-        for subtask_data in task.subtasks:
-            db_subtask = Subtask(
-                task_id=db_task.task_id,
-                subtask_name=subtask_data.subtask_name,
-                contribution_value=subtask_data.contribution_value
-            )
-            db.add(db_subtask)
+        subtask_rows = [
+            {
+                "task_id": task_id,
+                "subtask_name": subtask_data.subtask_name,
+                "contribution_value": subtask_data.contribution_value,
+            }
+            for subtask_data in task.subtasks
+        ]
+        subtask_ids = _insert_rows_returning_ids(db, Subtask, subtask_rows, ("subtask_name", "contribution_value"))
 
         # 3. 日次作業計画の作成
-        for plan_data in task.daily_task_plans:
-            db_plan = DailyTaskPlan(
-                task_id=db_task.task_id,
-                date=plan_data.date,
-                task_plan_value=plan_data.task_plan_value
-            )
-            db.add(db_plan)
+        task_plan_rows = [
+            {"task_id": task_id, "date": plan_data.date, "task_plan_value": plan_data.task_plan_value}
+            for plan_data in task.daily_task_plans
+        ]
+        task_plan_ids = _insert_rows_returning_ids(db, DailyTaskPlan, task_plan_rows, ("date",))
 
         # 4. 日次時間計画の作成
-        for time_plan_data in task.daily_time_plans:
-            db_time_plan = DailyTimePlan(
-                task_id=db_task.task_id,
-                date=time_plan_data.date,
-                time_plan_value=time_plan_data.time_plan_value
-            )
-            db.add(db_time_plan)
+        time_plan_rows = [
+            {"task_id": task_id, "date": time_plan_data.date, "time_plan_value": time_plan_data.time_plan_value}
+            for time_plan_data in task.daily_time_plans
+        ]
+        time_plan_ids = _insert_rows_returning_ids(db, DailyTimePlan, time_plan_rows, ("date",))
 
+        crud_revision.invalidate_task_caches(db, [task_id], [user_id])
         db.commit()
-        db.refresh(db_task)
-        return db_task
-    
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"タスク作成中にエラーが発生しました: {str(e)}")
 
+    # 登録した値と採番されたIDからレスポンスを作成（DBへの再問い合わせなし）
+    return schemas.Task(
+        task_id=task_id,
+        **task_values,
+        subtasks=[
+            schemas.Subtask(subtask_id=subtask_id, **row)
+            for subtask_id, row in zip(subtask_ids, subtask_rows)
+        ],
+        daily_task_plans=[
+            schemas.DailyTaskPlan(daily_task_plan_id=plan_id, **row)
+            for plan_id, row in zip(task_plan_ids, task_plan_rows)
+        ],
+        daily_time_plans=[
+            schemas.DailyTimePlan(daily_time_plan_id=plan_id, **row)
+            for plan_id, row in zip(time_plan_ids, time_plan_rows)
+        ]
+    )
+
 
 def update_task(db: Session, task_id: int, task: schemas.TaskUpdate, user_id: int) -> Task:
     """タスクを更新する"""
@@ -117,37 +353,28 @@ def update_task(db: Session, task_id: int, task: schemas.TaskUpdate, user_id: in
 
     try:
         # 更新するフィールドを設定（日次計画値は除く）
-        update_data = task.dict(exclude_unset=True, exclude={'daily_task_plans', 'daily_time_plans'})
+        update_data = task.dict(exclude_unset=True, exclude=_PLAN_UPDATE_FIELDS)
         for key, value in update_data.items():
             setattr(db_task, key, value)
+        crud_revision.bump_task_revision(db, task_id)
+
+        # 日次計画値の更新（既存の計画値と日付で突き合わせ、差分だけを反映する）
+        patch = task.plan_update_mode == "patch"
+        removed_dates = task.removed_plan_dates or []
 
         # 日次作業計画値の更新
-        if task.daily_task_plans is not None:
-            # 既存の日次作業計画を削除
-            db.query(DailyTaskPlan).filter(DailyTaskPlan.task_id == task_id).delete()
-            
-            # 新しい日次作業計画を作成
-            for plan_data in task.daily_task_plans:
-                db_plan = DailyTaskPlan(
-                    task_id=task_id,
-                    date=plan_data.date,
-                    task_plan_value=plan_data.task_plan_value
-                )
-                db.add(db_plan)
+        if task.daily_task_plans is not None or (patch and removed_dates):
+            _sync_daily_plans(
+                db, DailyTaskPlan, "task_plan_value", task_id,
+                task.daily_task_plans or [], patch=patch, removed_dates=removed_dates
+            )
 
         # 日次作業時間計画値の更新
-        if task.daily_time_plans is not None:
-            # 既存の日次時間計画を削除
-            db.query(DailyTimePlan).filter(DailyTimePlan.task_id == task_id).delete()
-            
-            # 新しい日次時間計画を作成
-            for time_plan_data in task.daily_time_plans:
-                db_time_plan = DailyTimePlan(
-                    task_id=task_id,
-                    date=time_plan_data.date,
-                    time_plan_value=time_plan_data.time_plan_value
-                )
-                db.add(db_time_plan)
+        if task.daily_time_plans is not None or (patch and removed_dates):
+            _sync_daily_plans(
+                db, DailyTimePlan, "time_plan_value", task_id,
+                task.daily_time_plans or [], patch=patch, removed_dates=removed_dates
+            )
 
         db.commit()
         db.refresh(db_task)
@@ -157,6 +384,60 @@ def update_task(db: Session, task_id: int, task: schemas.TaskUpdate, user_id: in
         raise HTTPException(status_code=400, detail=f"タスク更新中にエラーが発生しました: {str(e)}")
 
 
+# update_taskでタスク本体の列として扱わないフィールド
+_PLAN_UPDATE_FIELDS = {'daily_task_plans', 'daily_time_plans', 'plan_update_mode', 'removed_plan_dates'}
+
+
+def _sync_daily_plans(
+    db: Session,
+    model,
+    value_field: str,
+    task_id: int,
+    plans: List[Any],
+    patch: bool = False,
+    removed_dates: Optional[List[date]] = None
+) -> Dict[str, int]:
+    """
+    日次計画値（DailyTaskPlan / DailyTimePlan）を日付単位の差分で更新する
+    - 新しい日付はまとめてINSERT、値が変わった日付だけまとめてUPDATE
+    - replaceモード: 送られてこなかった日付をまとめてDELETE
+    - patchモード: 送られた日付だけを反映し、removed_datesの日付をDELETE
+    戻り値は反映件数（inserted, updated, deleted）
+    """
+    id_column = model.__mapper__.primary_key[0]
+    value_column = getattr(model, value_field)
+
+    existing = {
+        row.date: (row[0], row[2])
+        for row in db.query(id_column, model.date, value_column).filter(model.task_id == task_id).all()
+    }
+    incoming = {plan.date: getattr(plan, value_field) for plan in plans}
+
+    inserts = [
+        {"task_id": task_id, "date": plan_date, value_field: value}
+        for plan_date, value in incoming.items()
+        if plan_date not in existing
+    ]
+    updates = [
+        {id_column.key: existing[plan_date][0], value_field: value}
+        for plan_date, value in incoming.items()
+        if plan_date in existing and existing[plan_date][1] != value
+    ]
+    if patch:
+        delete_ids = [existing[plan_date][0] for plan_date in (removed_dates or []) if plan_date in existing]
+    else:
+        delete_ids = [plan_id for plan_date, (plan_id, _) in existing.items() if plan_date not in incoming]
+
+    if delete_ids:
+        db.query(model).filter(id_column.in_(delete_ids)).delete(synchronize_session=False)
+    if updates:
+        db.bulk_update_mappings(model, updates)
+    if inserts:
+        db.bulk_insert_mappings(model, inserts)
+
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": len(delete_ids)}
+
+
 def delete_task(db: Session, task_id: int, user_id: int) -> Dict[str, Any]:
     """タスクを削除する"""
     db_task = get_task(db, task_id)
@@ -165,7 +446,9 @@ def delete_task(db: Session, task_id: int, user_id: int) -> Dict[str, Any]:
     if db_task.user_id != user_id:
         raise HTTPException(status_code=403, detail="このタスクを削除する権限がありません")
 
+    crud_stats.remove_task_stats(db, task_id)
     db.delete(db_task)
+    crud_revision.invalidate_task_caches(db, [task_id], [user_id])
     db.commit()
     return {"task_id": task_id, "deleted": True}
 
@@ -198,35 +481,38 @@ def _validate_task_data(task: schemas.TaskCreate) -> None:
 
 
 def calculate_initial_values(data: schemas.TaskInitialValues) -> Dict[str, Any]:
-    """タスク作成時の初期値を計算する"""
-    # 日付範囲を生成
-    date_range = []
-    current_date = data.start_date
-    while current_date <= data.due_date:
-        date_range.append(current_date)
-        current_date += timedelta(days=1)
-    
-    task_days = len(date_range)
-    
-    # 1. 日毎の作業計画値の初期値を計算（均等配分）
-    daily_task_plan_value = 100 / task_days if task_days > 0 else 0
+    """
+    タスク作成時の初期値を計算する
+    日次計画値は稼働日（曜日・休日）に曜日の重みと配分カーブに沿って配分し、
+    端数を調整して作業計画値の合計は100、作業時間計画値の合計はtarget_timeにそろえる（app.core.plan_engine）
+    """
+    try:
+        plans = plan_engine.generate_plans(
+            data.start_date, data.due_date, data.target_time,
+            working_weekdays=data.working_weekdays, holidays=data.holidays,
+            weekday_weights=data.weekday_weights, curve=data.curve
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 1. 日毎の作業計画値・作業時間計画値
     daily_task_plans = [
-        {"date": d.isoformat(), "task_plan_value": daily_task_plan_value}
-        for d in date_range
+        {"date": plan_date, "task_plan_value": value}
+        for plan_date, value in zip(plans["dates"], plans["task_plan_values"])
     ]
-    
-    # 2. 日毎の作業時間計画値の初期値を計算（均等配分）
-    daily_time_plan_value = data.target_time / task_days if task_days > 0 else 0
     daily_time_plans = [
-        {"date": d.isoformat(), "time_plan_value": daily_time_plan_value}
-        for d in date_range
+        {"date": plan_date, "time_plan_value": value}
+        for plan_date, value in zip(plans["dates"], plans["time_plan_values"])
     ]
-    
-    # 3. サブタスクの作業貢献値の初期値を計算
-    subtask_contribution_value = 100 / data.subtask_count if data.subtask_count > 0 else 0
-    
+
+    # 2. サブタスクの作業貢献値の初期値（均等配分、整数で合計100になるように端数を先頭から足す）
+    subtask_contribution_values = plan_engine.distribute(
+        100, np.ones(data.subtask_count), 0
+    ).astype(int).tolist()
+
     return {
         "daily_task_plans": daily_task_plans,
         "daily_time_plans": daily_time_plans,
-        "subtask_contribution_value": subtask_contribution_value
-    } 
\ No newline at end of file
+        "subtask_contribution_value": 100 / data.subtask_count,
+        "subtask_contribution_values": subtask_contribution_values
+    }
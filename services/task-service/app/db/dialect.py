@@ -0,0 +1,18 @@
+from typing import Any, Optional
+
+from sqlalchemy.orm import Session
+
+
+def get_upsert_insert(db: Session) -> Optional[Any]:
+    """
+    接続先DBに応じた、ON CONFLICT句を使えるinsert()を返す
+    PostgreSQL（本番）とSQLite（ローカル検証）以外はNoneを返す
+    """
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
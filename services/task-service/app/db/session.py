@@ -1,24 +1,60 @@
-from sqlalchemy import create_engine
+from abc import ABC, abstractmethod
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from typing import Optional
-from fastapi import Depends
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Any, Callable, Optional, TypeVar
+from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 import logging
 
+from app.core import query_inspector
 from app.core.config import settings
+from app.core.security import get_cached_user_id, verify_access_token
+from app.db.pool import get_engine_pool_kwargs
 
 logger = logging.getLogger(__name__)
 
-# 認証サービスとの連携用の設定
+# Authorizationヘッダからトークンを取り出す（トークンがない場合の401はget_current_userで返す）
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 # SQLAlchemyエンジン（セッション）の作成
-engine = create_engine(settings.DATABASE_URL)
+# プールの大きさ・タイムアウト・再作成・生存確認はsettingsで調整する（app.db.pool）
+engine = create_engine(settings.DATABASE_URL, **get_engine_pool_kwargs())
 
 # セッションファクトリーの作成
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 非同期エンジン・セッションファクトリー（settings.DB_ASYNC有効時のみ作成）
+async_engine = None
+AsyncSessionLocal = None
+
+
+def get_async_database_url() -> str:
+    """DATABASE_URLのドライバを非同期ドライバ（asyncpg / aiosqlite）に置き換えたURLを返す"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = settings.DATABASE_URL
+    for sync_prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    async_engine = create_async_engine(get_async_database_url(), **get_engine_pool_kwargs(async_engine=True))
+    # コミット後に属性を再読み込みしない（イベントループ上での遅延ロードを避けるため）
+    AsyncSessionLocal = sessionmaker(
+        bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
 # モデルのベースクラス
 # このBaseクラスを継承することで、DBのテーブルを作成できる
 Base = declarative_base()
@@ -32,24 +68,84 @@ def get_db():
     finally:
         db.close()
 
-# 仮実装: 実際の認証サービスとの連携はここで行う
+
+T = TypeVar("T")
+
+
+class AsyncDB(ABC):
+    """
+    async defのルーターからCRUD関数を呼び出すためのセッション（インターフェース）
+    CRUD関数は同期Sessionを第1引数に取る従来の形のまま、db.run(crud.関数, ...)で実行する
+    - DB_ASYNC有効時: AsyncSession.run_sync（asyncpg上で実行し、スレッドを占有しない）
+    - DB_ASYNC無効時: 同期Sessionをスレッドプールで実行（従来の同期スタック）
+    """
+
+    @abstractmethod
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """fn(同期Session, *args, **kwargs) を実行し、その戻り値を返す"""
+
+
+class _AsyncSessionDB(AsyncDB):
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+
+class _ThreadpoolDB(AsyncDB):
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+
+# async defのルーター用のDBセッションの依存関係
+# 呼び出し側の引数で、Depends(get_async_db)と呼ぶ（settings.DB_ASYNCで非同期・同期を切り替える）
+async def get_async_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield _AsyncSessionDB(session)
+        return
+
+    db = SessionLocal()
+    try:
+        yield _ThreadpoolDB(db)
+    finally:
+        await run_in_threadpool(db.close)
+
+# uidクレームを含まないトークンのユーザー名から、共有DBのusersテーブルでユーザーIDを引く
+def get_user_id_by_username(username: str) -> Optional[int]:
+    """ユーザー名からユーザーIDを取得する（該当なしはNone）"""
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT user_id FROM users WHERE username = :username"), {"username": username}
+        ).scalar()
+
+# 現在のユーザーIDの依存関係
+# 認証サービスへは問い合わせず、共有のSECRET_KEYでトークンをローカル検証する（app.core.security）
 async def get_current_user(token: Optional[str] = Depends(oauth2_scheme)) -> int:
     """
-    現在のユーザーIDを取得する（仮実装）
-    実際のシステムでは認証サービスとの連携が必要
-    """
-    # デバッグ: トークンを出力
-    logger.info(f"受信したトークン: {token}")
-    
-    # 仮実装: JWTトークンの検証やユーザー情報の取得は認証サービスで行われる
-    # ここでは、トークンがあれば固定のユーザーIDを返す
-    if not token:
-        logger.warning("トークンが提供されていません")
-        return 1  # 開発中は認証なしでもアクセス可能にする
-    
-    # 開発用: どんなトークンでもアクセスを許可する
-    logger.info("認証成功: ユーザーID=1を返します")
-    return 1  # 固定のユーザーID
+    Authorizationヘッダのアクセストークンを検証し、現在のユーザーIDを取得する
+    トークンがない・無効な場合は401を返す
+    初めて見るトークンの検証（uidクレームがない場合のユーザー名での検索を含む）はスレッドプールで行う
+    """
+    user_id = get_cached_user_id(token)
+    if user_id is None:
+        user_id = await run_in_threadpool(verify_access_token, token, get_user_id_by_username)
+    # SQLクエリインスペクタの記録を、リクエストを送ったユーザーに紐付ける（/tasks/debug-sqlの絞り込み用）
+    query_inspector.set_user_id(user_id)
+    return user_id
+
+# 運用・診断用エンドポイントの依存関係（ADMIN_USER_IDSのユーザー以外は403）
+async def get_admin_user(current_user_id: int = Depends(get_current_user)) -> int:
+    """
+    現在のユーザーが管理者（settings.ADMIN_USER_IDS）であることを確認し、ユーザーIDを返す
+    """
+    if current_user_id not in settings.ADMIN_USER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="管理者のみ利用できます")
+    return current_user_id
 
 # 開発用: トークンなしでも使えるテスト用の認証関数
 async def get_test_user() -> int:
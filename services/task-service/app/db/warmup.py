@@ -0,0 +1,145 @@
+"""
+起動時のウォームアップと、準備完了（/readyz）の判定
+
+起動直後のリクエストが、接続の確立やSQLのコンパイル・マッパーの初期化を待たないように、
+起動時（startup）にリクエストを処理するエンジン（DB_ASYNC有効時は非同期エンジン）で次を行う。
+- DB_WARMUP_CONNECTIONS 本の接続を開いてプールに戻しておく（DB_POOL_SIZEまで）
+- よく実行するクエリを、存在しないID（0）で1回ずつ実行し、コンパイル結果をエンジンのキャッシュに載せる
+
+DBに接続できなくても起動は止めない（/readyz が503を返し、接続できるようになった時点でウォームアップし直す）。
+/healthz はプロセスが応答できるかだけを返し、DBには接続しない。
+"""
+import logging
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import burndown as crud_burndown
+from app.crud import record_work as crud_record_work
+from app.crud import stats as crud_stats
+from app.crud import subtask as crud_subtask
+from app.crud import task as crud_task
+from app.models.models import Task
+
+logger = logging.getLogger(__name__)
+
+# ウォームアップの結果（/readyz で参照する）
+_state: Dict[str, Any] = {"warmed_up": False, "duration_ms": None}
+
+
+def _warmup_connection_count() -> int:
+    count = settings.DB_WARMUP_CONNECTIONS or settings.DB_POOL_SIZE
+    return max(0, min(count, settings.DB_POOL_SIZE))
+
+
+def warm_hot_statements(db: Session) -> None:
+    """
+    よく実行するクエリ（タスク一覧・詳細・バーンダウン・作業記録）を、結果が0件になるID（0）で実行する
+    コンパイル結果はパラメータの値によらずエンジンのキャッシュで共有されるため、実際のリクエストでそのまま使われる
+    """
+    task = Task(task_id=0, user_id=0, task_name="", start_date=date.today(), due_date=date.today())
+    for order_by in crud_task.TASK_ORDER_FIELDS:
+        crud_task.get_tasks(db, user_id=0, limit=1, order_by=order_by)
+    crud_task.count_tasks(db, user_id=0)
+    crud_task.get_task(db, task_id=0)
+    crud_task.load_task_summaries(db, [task])
+    crud_task.load_task_details(db, [task], include_plans=True)
+    crud_burndown.get_task_burndown(db, task)
+    crud_subtask.get_subtasks(db, task_id=0)
+    crud_stats.get_subtask_summaries(db, [0])
+    crud_stats.get_task_summary(db, task_id=0)
+    crud_record_work.get_record_works_by_subtask(db, subtask_id=0)
+    db.rollback()
+
+
+def _warm_up_sync(engine) -> None:
+    connections = []
+    try:
+        for _ in range(_warmup_connection_count()):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+    db = Session(bind=engine)
+    try:
+        warm_hot_statements(db)
+    finally:
+        db.close()
+
+
+async def _warm_up_async(async_engine) -> None:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    connections = []
+    try:
+        for _ in range(_warmup_connection_count()):
+            connection = await async_engine.connect()
+            connections.append(connection)
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            await connection.close()
+
+    async with AsyncSession(async_engine) as session:
+        await session.run_sync(warm_hot_statements)
+
+
+async def warm_up(engine, async_engine=None) -> bool:
+    """ウォームアップを行う（失敗してもエラーにせず、Falseを返す）"""
+    started_at = time.perf_counter()
+    try:
+        if async_engine is not None:
+            await _warm_up_async(async_engine)
+        else:
+            await run_in_threadpool(_warm_up_sync, engine)
+    except Exception as e:
+        # DBの停止中は/readyzのたびに失敗するため、スタックトレースはDEBUG時のみ出力する
+        logger.warning("DB warmup failed: %s", type(e).__name__, exc_info=logger.isEnabledFor(logging.DEBUG))
+        return False
+
+    _state["warmed_up"] = True
+    _state["duration_ms"] = round((time.perf_counter() - started_at) * 1000, 3)
+    logger.info(
+        "DB warmup finished: %d connections, %.1f ms", _warmup_connection_count(), _state["duration_ms"]
+    )
+    return True
+
+
+def _ping_sync(engine) -> None:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+async def check_ready(engine, async_engine=None) -> Dict[str, Any]:
+    """
+    リクエストを受け付けられるかを確認する（/readyz）
+    DBに接続できること、ウォームアップが済んでいること（未完了ならここでやり直す）を条件にする
+    """
+    error: Optional[str] = None
+    try:
+        if async_engine is not None:
+            async with async_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        else:
+            await run_in_threadpool(_ping_sync, engine)
+    except Exception as e:
+        error = type(e).__name__
+
+    if error is None and settings.DB_WARMUP_ENABLED and not _state["warmed_up"]:
+        await warm_up(engine, async_engine)
+
+    ready = error is None and (_state["warmed_up"] or not settings.DB_WARMUP_ENABLED)
+    return {
+        "status": "ready" if ready else "not_ready",
+        "database": "ok" if error is None else error,
+        "warmed_up": _state["warmed_up"],
+        "warmup_ms": _state["duration_ms"],
+    }
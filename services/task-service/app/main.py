@@ -1,23 +1,26 @@
-from fastapi import FastAPI, Depends, HTTPException
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import logging
+import time
 
-from app.api.v1 import tasks, subtasks, record_works
+from app.api.v1 import tasks, subtasks, record_works, export, imports
 from app.core.config import settings
-from app.db.session import engine
-from app.models import models
+from app.core import cache, metrics, query_inspector
+from app.core import logging as app_logging
+from app.db.pool import get_pool_stats
+from app.db import warmup
+from app.db.session import engine, async_engine, get_admin_user
 
-# ロギング設定
-logging.basicConfig(level=logging.INFO)
+# ロギング設定（キュー経由の非同期出力・JSON・サンプリング、app.core.logging）
+# SQLはsqlalchemy.engineのログではなく、LOG_SQL_ECHO_HEADER付きのリクエストに限って出力する
+app_logging.setup_logging()
 logger = logging.getLogger("task-service")
-# SQLAlchemyのログを有効化（SQLクエリの実行ログなどが確認できるようになる）
-logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+access_logger = logging.getLogger("app.access")
 
-# Base：テーブルクラス作成の基となるベースクラス（app.db.sessionで作成）
-# engine：DBの接続情報（app.db.sessionで作成）
-# Baseを継承しているテーブル群が一括して作成される
-models.Base.metadata.create_all(bind=engine)
+# テーブルの作成・変更は起動時には行わない（DBに接続せずにimportできるようにする）
+# PostgreSQLは database/ のAlembic（alembic upgrade head）、ローカル検証用のDBは python -m app.cli init-db で作成する
 
 # FastAPIアプリケーションのインスタンスを作成（クライアントからのリクエストを受け取ったり、レスポンスを返すためのオブジェクト）
 app = FastAPI(
@@ -39,17 +42,152 @@ app.add_middleware(
         ],
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "HEAD"],
-    allow_headers=["Authorization", "Content-Type", "Accept", "Origin", "User-Agent"],
-    expose_headers=["Content-Length", "Content-Type"],
+    allow_headers=[
+        "Authorization", "Content-Type", "Accept", "Origin", "User-Agent", "If-None-Match", "X-Request-ID",
+        settings.SQL_INSPECTOR_HEADER, settings.LOG_SQL_ECHO_HEADER
+    ],
+    expose_headers=["Content-Length", "Content-Type", "ETag", "X-Request-ID", "X-Next-Cursor", "X-Total-Count"],
     max_age=600,
 )
 
+# SQLクエリインスペクタ（開発用）
+# 無効時はイベントリスナーもミドルウェアも登録しないため、通常のリクエストには一切処理が追加されない
+if settings.SQL_INSPECTOR_ENABLED:
+    query_inspector.install(engine)
+    if async_engine is not None:
+        query_inspector.install(async_engine.sync_engine)
+
+    @app.middleware("http")
+    async def inspect_sql_queries(request: Request, call_next):
+        if not request.headers.get(settings.SQL_INSPECTOR_HEADER):
+            return await call_next(request)
+
+        token = query_inspector.begin(request.method, request.url.path, app_logging.get_request_id())
+        try:
+            response = await call_next(request)
+        finally:
+            query_inspector.end(token)
+        return response
+
+# リクエストIDの採番とアクセスログ（SQLインスペクタより外側で実行し、同じリクエストIDを使う）
+app_logging.install_sql_echo(engine)
+if async_engine is not None:
+    app_logging.install_sql_echo(async_engine.sync_engine)
+
+
+@app.middleware("http")
+async def log_requests(request: Request, call_next):
+    tokens = app_logging.begin_request(
+        request.headers.get("X-Request-ID"), sql_echo=bool(request.headers.get(settings.LOG_SQL_ECHO_HEADER))
+    )
+    started_at = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["X-Request-ID"] = app_logging.get_request_id()
+        return response
+    finally:
+        access_logger.info(
+            "%s %s %d", request.method, request.url.path, status_code,
+            extra={"status": status_code, "duration_ms": round((time.perf_counter() - started_at) * 1000, 3)}
+        )
+        app_logging.end_request(tokens)
+
+# メトリクス（最も外側のミドルウェアとして、ログ・インスペクタの処理とストリーミングの送信も含めて計測する）
+if settings.METRICS_ENABLED:
+    metrics.install(engine)
+    metrics.register_collector(metrics.pool_collector(engine, "sync"))
+    if async_engine is not None:
+        metrics.install(async_engine.sync_engine)
+        metrics.register_collector(metrics.pool_collector(async_engine.sync_engine, "async"))
+    metrics.register_collector(metrics.cache_collector)
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # APIルーターの取り込み
 app.include_router(tasks.router, prefix="/api/v1") # ~:8002/api/v1/tasks　のようになる
 app.include_router(subtasks.router, prefix="/api/v1") # ~:8002/api/v1/subtasks　のようになる
 app.include_router(record_works.router, prefix="/api/v1") # ~:8002/api/v1/record-works　のようになる
+app.include_router(export.router, prefix="/api/v1") # ~:8002/api/v1/export　のようになる
+app.include_router(imports.router, prefix="/api/v1") # ~:8002/api/v1/import　のようになる
 
 @app.get("/")
 async def root():
     logger.info("Root endpoint accessed")
-    return {"message": "タスク管理サービスAPIへようこそ"} 
\ No newline at end of file
+    return {"message": "タスク管理サービスAPIへようこそ"}
+
+
+@app.on_event("startup")
+async def warm_up_database():
+    # 接続を開いておき、よく実行するクエリのSQLをコンパイルしておく（失敗しても起動は続け、/readyzでやり直す）
+    if settings.DB_WARMUP_ENABLED:
+        await warmup.warm_up(engine, async_engine)
+
+
+@app.on_event("shutdown")
+async def dispose_engines():
+    # プールに残っている接続を閉じる
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+    app_logging.shutdown_logging()
+
+
+@app.get("/healthz")
+async def healthz():
+    """プロセスが応答できるか（liveness）。DBには接続しない"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """リクエストを受け付けられるか（readiness）。DBに接続できない・ウォームアップが済んでいない場合は503"""
+    result = await warmup.check_ready(engine, async_engine)
+    if result["status"] != "ready":
+        return JSONResponse(status_code=503, content=result)
+    return result
+
+
+@app.get("/pool-stats")
+async def pool_stats(admin_user_id: int = Depends(get_admin_user)):
+    """DBコネクションプールの利用状況（使用中・待機中・オーバーフロー数と待ち時間、管理者のみ）"""
+    stats = {"sync": get_pool_stats(engine)}
+    if async_engine is not None:
+        stats["async"] = get_pool_stats(async_engine.sync_engine)
+    return stats 
+
+
+@app.get("/cache-stats")
+async def cache_stats(admin_user_id: int = Depends(get_admin_user)):
+    """レスポンスキャッシュの利用状況（エントリ数・バイト数・ヒット数・ミス数など、管理者のみ）"""
+    return cache.get_cache().stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus形式のメトリクス（ルートごとのレイテンシ・クエリ数・DB時間・レスポンスサイズ、プール・キャッシュの状況）"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/log-level")
+async def get_log_level(admin_user_id: int = Depends(get_admin_user)):
+    """ロガーのレベル・サンプリング率と、間引いた・破棄したレコード数（管理者のみ）"""
+    return app_logging.get_log_levels()
+
+
+@app.put("/log-level")
+async def put_log_level(
+    logger_name: str = Query(..., alias="logger"),
+    level: Optional[str] = Query(None, regex="(?i)^(CRITICAL|ERROR|WARNING|INFO|DEBUG|NOTSET)$"),
+    sampling_rate: Optional[float] = Query(None, ge=0, le=1),
+    admin_user_id: int = Depends(get_admin_user)
+):
+    """
+    実行中にロガーのレベル・サンプリング率を変更する（管理者のみ）
+    app.sqlのSQL出力にはパラメータ（ユーザーのデータ）が含まれるため、ADMIN_USER_IDSのユーザーに限る
+    例: PUT /log-level?logger=app.sql&level=INFO で、X-Debug-Log-SQLヘッダ付きのリクエストのSQLを出力する
+    """
+    app_logging.set_log_level(logger_name, level=level, sampling_rate=sampling_rate)
+    return app_logging.get_log_levels()
@@ -1,74 +1,132 @@
-from sqlalchemy import Column, Integer, String, Text, Date, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from app.db.session import Base
 
 # Baseを継承したクラスを作成することで、Base.metadataに登録される
+# 制約・インデックスは database/migrations（Alembic）のスキーマに合わせる（名前も同じにする）
 class Task(Base):
     __tablename__ = "tasks"
 
-    task_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, index=True)  # 外部キー (認証サービスへの参照)
-    task_name = Column(String, index=True)
+    task_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)  # 外部キー (認証サービスのusersへの参照、DB側でのみ定義)
+    task_name = Column(String(255), nullable=False)
     task_content = Column(Text)
     recent_schedule = Column(Text)
     start_date = Column(Date)
     due_date = Column(Date)
-    category = Column(String)
+    category = Column(String(100))
     target_time = Column(Integer)  # 分単位で保存
     comment = Column(Text)
+    # タスク・サブタスク・日次計画値・作業記録の変更ごとに1つ進める（ETagに使う）
+    revision = Column(Integer, nullable=False, default=1, server_default="1")
 
     # リレーションシップ
     subtasks = relationship("Subtask", back_populates="task", cascade="all, delete-orphan")
     daily_task_plans = relationship("DailyTaskPlan", back_populates="task", cascade="all, delete-orphan")
     daily_time_plans = relationship("DailyTimePlan", back_populates="task", cascade="all, delete-orphan")
 
+    # タスク一覧のキーセットページネーション用（user_idで絞り込み、due_date, task_id順 / task_id順に並べる）
+    __table_args__ = (
+        Index("idx_tasks_user_id_due_date_task_id", "user_id", "due_date", "task_id"),
+        Index("idx_tasks_user_id_task_id", "user_id", "task_id"),
+    )
+
 
 class Subtask(Base):
     __tablename__ = "subtasks"
 
-    subtask_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    task_id = Column(Integer, ForeignKey("tasks.task_id"))
-    subtask_name = Column(String)
+    subtask_id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(Integer, ForeignKey("tasks.task_id", ondelete="CASCADE"), nullable=False)
+    subtask_name = Column(String(255), nullable=False)
     contribution_value = Column(Integer)  # 0-100の値
 
     # リレーションシップ
     task = relationship("Task", back_populates="subtasks")
     record_works = relationship("RecordWork", back_populates="subtask", cascade="all, delete-orphan")
 
+    # タスクのサブタスク一覧（task_idで絞り込み、subtask_id順）を貢献値までインデックスだけで読む
+    __table_args__ = (
+        Index("idx_subtasks_task_id_subtask_id", "task_id", "subtask_id", postgresql_include=["contribution_value"]),
+    )
+
 
 class DailyTaskPlan(Base):
     __tablename__ = "daily_task_plans"
 
-    daily_task_plan_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    task_id = Column(Integer, ForeignKey("tasks.task_id"))
-    date = Column(Date)
-    task_plan_value = Column(Float)  # 0-100の値 (小数点対応)
+    daily_task_plan_id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(Integer, ForeignKey("tasks.task_id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False)
+    task_plan_value = Column(Float, nullable=False)  # 0-100の値 (小数点対応)
 
     # リレーションシップ
     task = relationship("Task", back_populates="daily_task_plans")
 
+    # 1タスクにつき1日1件（task_idで絞り込み、date順に計画値をインデックスだけで読む）
+    __table_args__ = (
+        Index("daily_task_plans_task_id_date_key", "task_id", "date", unique=True,
+              postgresql_include=["task_plan_value"]),
+    )
+
 
 class DailyTimePlan(Base):
     __tablename__ = "daily_time_plans"
 
-    daily_time_plan_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    task_id = Column(Integer, ForeignKey("tasks.task_id"))
-    date = Column(Date)
-    time_plan_value = Column(Float)  # 分単位で保存 (小数点対応)
+    daily_time_plan_id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(Integer, ForeignKey("tasks.task_id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False)
+    time_plan_value = Column(Float, nullable=False)  # 分単位で保存 (小数点対応)
 
     # リレーションシップ
     task = relationship("Task", back_populates="daily_time_plans")
 
+    # 1タスクにつき1日1件（task_idで絞り込み、date順に計画値をインデックスだけで読む）
+    __table_args__ = (
+        Index("daily_time_plans_task_id_date_key", "task_id", "date", unique=True,
+              postgresql_include=["time_plan_value"]),
+    )
+
 
 class RecordWork(Base):
     __tablename__ = "record_works"
 
-    record_work_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    subtask_id = Column(Integer, ForeignKey("subtasks.subtask_id"))
-    date = Column(Date)
-    work = Column(Integer)  # 0-100の値
-    work_time = Column(Integer, default=0)  # 作業時間を分単位で保存
+    record_work_id = Column(Integer, primary_key=True, autoincrement=True)
+    subtask_id = Column(Integer, ForeignKey("subtasks.subtask_id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False)
+    work = Column(Integer, nullable=False)  # 0-100の値
+    work_time = Column(Integer, default=0, server_default="0")  # 作業時間を分単位で保存
 
     # リレーションシップ
-    subtask = relationship("Subtask", back_populates="record_works") 
\ No newline at end of file
+    subtask = relationship("Subtask", back_populates="record_works")
+
+    # 1サブタスクにつき1日1件（INSERT ... ON CONFLICT (subtask_id, date) の対象）
+    # 作業記録一覧（date順）・集計・バーンダウンを、work, work_timeまでインデックスだけで読む
+    __table_args__ = (
+        Index("record_works_subtask_id_date_key", "subtask_id", "date", unique=True,
+              postgresql_include=["work", "work_time"]),
+        Index("idx_record_works_date", "date"),
+    )
+
+
+# 作業実績の集計テーブル（record_worksの作成・更新・削除と同じトランザクションで差分更新する）
+class SubtaskStats(Base):
+    __tablename__ = "subtask_stats"
+
+    subtask_id = Column(Integer, ForeignKey("subtasks.subtask_id", ondelete="CASCADE"), primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.task_id", ondelete="CASCADE"), nullable=False)
+    total_work = Column(Integer, nullable=False, default=0, server_default="0")  # 作業量の合計
+    total_work_time = Column(Integer, nullable=False, default=0, server_default="0")  # 作業時間の合計（分）
+    work_days = Column(Integer, nullable=False, default=0, server_default="0")  # 作業記録の件数（作業した日数）
+
+    __table_args__ = (
+        Index("idx_subtask_stats_task_id", "task_id"),
+    )
+
+
+class TaskStats(Base):
+    __tablename__ = "task_stats"
+
+    task_id = Column(Integer, ForeignKey("tasks.task_id", ondelete="CASCADE"), primary_key=True)
+    total_work = Column(Integer, nullable=False, default=0, server_default="0")  # 作業量の合計
+    total_work_time = Column(Integer, nullable=False, default=0, server_default="0")  # 作業時間の合計（分）
+    total_work_records = Column(Integer, nullable=False, default=0, server_default="0")  # 作業記録の件数
@@ -93,6 +93,22 @@ class RecordWork(RecordWorkBase):
     subtask_id: int
 
 
+# 作業記録の一括登録・更新スキーマ
+class RecordWorkBulkItem(RecordWorkBase):
+    subtask_id: int
+
+
+class RecordWorkBulkCreate(BaseModel):
+    records: List[RecordWorkBulkItem] = Field(..., min_items=1, max_items=1000)
+
+
+class RecordWorkBulkResult(BaseModel):
+    record_work_id: int
+    subtask_id: int
+    date: date
+    created: bool  # True: 新規作成、False: 既存の記録を更新
+
+
 # 日次時間計画スキーマ
 class DailyTimePlanBase(BaseSchemaModel):
     date: date
@@ -147,6 +163,11 @@ class TaskUpdate(TaskBase):
     comment: Optional[str] = None
     daily_task_plans: Optional[List[DailyTaskPlanCreate]] = None
     daily_time_plans: Optional[List[DailyTimePlanCreate]] = None
+    # 日次計画値の更新方法
+    # replace: 送信した計画値で置き換える（送信しなかった日付は削除）
+    # patch: 送信した日付の計画値だけを追加・更新し、removed_plan_datesの日付を削除する
+    plan_update_mode: str = Field("replace", description="日次計画値の更新方法（replace / patch）", regex="^(replace|patch)$")
+    removed_plan_dates: Optional[List[date]] = Field(None, description="patch時に削除する計画値の日付")
 
 
 class Task(TaskBase):
@@ -159,15 +180,60 @@ class Task(TaskBase):
     total_work_time: int = 0  # タスク全体の作業時間合計（分）
 
 
+# タスク一覧用スキーマ（直近の予定・コメント・日次計画値は詳細取得時のみ返す）
+class TaskSummary(BaseSchemaModel):
+    task_id: int
+    user_id: int
+    task_name: str
+    task_content: Optional[str] = None
+    start_date: date
+    due_date: date
+    category: Optional[str] = None
+    target_time: Optional[int] = None
+    subtasks: List[Subtask] = []
+    progress: int = 0  # 進捗率（フロントエンド表示用）
+    total_work_time: int = 0  # タスク全体の作業時間合計（分）
+
+
+# バーンダウン（計画と実績の推移）スキーマ
+# 各リストはdatesと同じ長さで、同じ位置の日付の値を表す
+class TaskBurndown(BaseModel):
+    task_id: int
+    dates: List[date] = []
+    planned_progress: List[float] = []  # 日次作業計画値の累積（%）
+    actual_progress: List[float] = []  # 作業貢献値で重み付けした実績進捗率の累積（%）
+    planned_time: List[float] = []  # 日ごとの計画作業時間（分）
+    actual_time: List[float] = []  # 日ごとの実績作業時間（分）
+    planned_time_cumulative: List[float] = []  # 計画作業時間の累積（分）
+    actual_time_cumulative: List[float] = []  # 実績作業時間の累積（分）
+
+
 # タスク初期値計算用スキーマ
 class TaskInitialValues(BaseModel):
     start_date: date
     due_date: date
-    target_time: int
+    target_time: int = Field(..., ge=0)
     subtask_count: int = Field(..., ge=1)
+    # 稼働日の設定（省略時は従来どおり全日に配分する）
+    working_weekdays: List[int] = Field([0, 1, 2, 3, 4, 5, 6], description="稼働する曜日（月曜=0〜日曜=6）")
+    holidays: List[date] = Field([], description="配分しない日（祝日・休暇など）")
+    weekday_weights: Optional[List[float]] = Field(None, description="曜日ごとの配分の重み（月曜〜日曜の7個）")
+    curve: str = Field("flat", description="配分カーブ（flat: 均等, front: 前倒し, back: 後ろ倒し）", regex="^(flat|front|back)$")
 
     @validator('due_date')
     def due_date_must_be_after_start_date(cls, v, values):
         if 'start_date' in values and v < values['start_date']:
             raise ValueError('完了予定日は開始予定日より後でなければなりません')
+        return v
+
+    @validator('working_weekdays', each_item=True)
+    def weekday_must_be_in_range(cls, v):
+        if not 0 <= v <= 6:
+            raise ValueError('曜日は0（月曜）〜6（日曜）で指定してください')
+        return v
+
+    @validator('weekday_weights')
+    def weekday_weights_must_cover_week(cls, v):
+        if v is not None and (len(v) != 7 or any(weight < 0 for weight in v)):
+            raise ValueError('曜日ごとの重みは0以上の値を月曜〜日曜の7個指定してください')
         return v 
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""タスク作成（create_task）のテスト: レスポンスのサブタスク・日次計画値のIDが、DBに登録された行と対応すること"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.crud import task as crud_task
+from app.models.models import DailyTaskPlan, DailyTimePlan, Subtask
+from app.schemas import task as schemas
+
+
+def _shuffled_task() -> schemas.TaskCreate:
+    """サブタスク名・日付がIDの順に並ばない（日付は降順、同じ名前・作業貢献値のサブタスクを含む）タスク"""
+    dates = [date(2025, 1, 1) + timedelta(days=i) for i in range(5)]
+    return schemas.TaskCreate(
+        task_name="shuffled",
+        start_date=dates[0],
+        due_date=dates[-1],
+        target_time=300,
+        subtasks=[
+            schemas.SubtaskCreate(subtask_name="c", contribution_value=40),
+            schemas.SubtaskCreate(subtask_name="a", contribution_value=20),
+            schemas.SubtaskCreate(subtask_name="b", contribution_value=20),
+            schemas.SubtaskCreate(subtask_name="a", contribution_value=20),
+        ],
+        daily_task_plans=[
+            schemas.DailyTaskPlanCreate(date=d, task_plan_value=value)
+            for d, value in zip(reversed(dates), (10, 15, 20, 25, 30))
+        ],
+        daily_time_plans=[
+            schemas.DailyTimePlanCreate(date=d, time_plan_value=value)
+            for d, value in zip(reversed(dates), (50, 55, 60, 65, 70))
+        ],
+    )
+
+
+def _assert_ids_match_rows(db, task: schemas.Task) -> None:
+    subtasks = {row.subtask_id: row for row in db.query(Subtask).filter(Subtask.task_id == task.task_id)}
+    assert sorted(subtasks) == sorted(subtask.subtask_id for subtask in task.subtasks)
+    for subtask in task.subtasks:
+        row = subtasks[subtask.subtask_id]
+        assert (row.subtask_name, row.contribution_value) == (subtask.subtask_name, subtask.contribution_value)
+
+    task_plans = {row.daily_task_plan_id: row for row in db.query(DailyTaskPlan).filter(DailyTaskPlan.task_id == task.task_id)}
+    assert sorted(task_plans) == sorted(plan.daily_task_plan_id for plan in task.daily_task_plans)
+    for plan in task.daily_task_plans:
+        row = task_plans[plan.daily_task_plan_id]
+        assert (row.date, row.task_plan_value) == (plan.date, plan.task_plan_value)
+
+    time_plans = {row.daily_time_plan_id: row for row in db.query(DailyTimePlan).filter(DailyTimePlan.task_id == task.task_id)}
+    assert sorted(time_plans) == sorted(plan.daily_time_plan_id for plan in task.daily_time_plans)
+    for plan in task.daily_time_plans:
+        row = time_plans[plan.daily_time_plan_id]
+        assert (row.date, row.time_plan_value) == (plan.date, plan.time_plan_value)
+
+
+def test_create_task_response_ids_match_rows(db):
+    task = crud_task.create_task(db, _shuffled_task(), user_id=1)
+
+    _assert_ids_match_rows(db, task)
+
+
+def test_create_task_response_ids_match_rows_postgresql(pg_db, pg_user_id):
+    """PostgreSQLでは複数行INSERT ... RETURNINGのIDを、返させたキー列で行に対応付ける"""
+    task = crud_task.create_task(pg_db, _shuffled_task(), pg_user_id)
+
+    _assert_ids_match_rows(pg_db, task)
+
+
+@pytest.mark.parametrize("returned_order", [list, lambda rows: list(reversed(rows))])
+def test_insert_rows_returning_ids_does_not_depend_on_returned_order(db, monkeypatch, returned_order):
+    """RETURNING・再取得した行の順序が入力と異なっても、rowsの順にIDを返す"""
+    task = crud_task.create_task(db, _shuffled_task(), user_id=1)
+    rows = [{"task_id": task.task_id, "subtask_name": name, "contribution_value": 0} for name in ("x", "y", "z")]
+
+    execute = db.execute
+
+    class _Reordered:
+        def __init__(self, result):
+            self._rows = returned_order(result.all())
+
+        def all(self):
+            return self._rows
+
+    def reordering_execute(statement, *args, **kwargs):
+        result = execute(statement, *args, **kwargs)
+        return _Reordered(result) if getattr(statement, "is_select", False) else result
+
+    monkeypatch.setattr(db, "execute", reordering_execute)
+    ids = crud_task._insert_rows_returning_ids(db, Subtask, rows, ("subtask_name", "contribution_value"))
+    monkeypatch.undo()
+
+    names = {row.subtask_id: row.subtask_name for row in db.query(Subtask).filter(Subtask.subtask_id.in_(ids))}
+    assert [names[subtask_id] for subtask_id in ids] == ["x", "y", "z"]
@@ -0,0 +1,138 @@
+"""エクスポート（GET /export、app.crud.export）のテスト"""
+import csv
+import io
+import json
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.crud import export as crud_export
+from app.crud import importer as crud_importer
+from app.crud import record_work as crud_record_work
+from app.crud import task as crud_task
+from app.schemas import task as schemas
+from conftest import make_task
+
+RECORD_TYPES = ("task", "subtask", "daily_task_plan", "daily_time_plan", "record_work")
+
+
+def _create_tasks(db, user_id: int, task_count: int = 2) -> None:
+    """サブタスク3件・7日分の計画値、各サブタスクに2日分の作業記録があるタスク"""
+    for _ in range(task_count):
+        task = crud_task.create_task(db, make_task(subtask_count=3, days=7), user_id)
+        for subtask in task.subtasks:
+            for day, work_time in ((1, 30), (2, 0)):
+                crud_record_work.create_record_work(
+                    db, schemas.RecordWorkCreate(date=date(2025, 1, day), work=10, work_time=work_time),
+                    subtask_id=subtask.subtask_id, task_id=task.task_id
+                )
+
+
+def _expected_counts(task_count: int) -> dict:
+    return {
+        "task": task_count, "subtask": 3 * task_count, "daily_task_plan": 7 * task_count,
+        "daily_time_plan": 7 * task_count, "record_work": 6 * task_count,
+    }
+
+
+def test_export_ndjson(client, db, auth_headers):
+    _create_tasks(db, user_id=1)
+    _create_tasks(db, user_id=2, task_count=1)
+
+    response = client.get("/api/v1/export", headers=auth_headers(1))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="tasks-1.ndjson"'
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert Counter(record["type"] for record in records) == _expected_counts(2)
+    # タスク → サブタスク → 日次計画値 → 作業記録の順に、種別ごとの列だけを出力する
+    assert [record_type for record_type in dict.fromkeys(record["type"] for record in records)] == list(RECORD_TYPES)
+    for record in records:
+        assert tuple(record)[1:] == crud_export.EXPORT_FIELDS[record["type"]]
+    # 他のユーザーのデータは含めない
+    task_ids = {record["task_id"] for record in records if record["type"] == "task"}
+    assert {record["task_id"] for record in records} == task_ids
+    assert records[-1]["date"] == "2025-01-02"
+
+
+def test_export_csv(client, db, auth_headers):
+    _create_tasks(db, user_id=1)
+
+    response = client.get("/api/v1/export", params={"format": "csv"}, headers=auth_headers(1))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert tuple(rows[0]) == crud_export.EXPORT_CSV_FIELDS
+    assert Counter(row["type"] for row in rows) == _expected_counts(2)
+    subtask = next(row for row in rows if row["type"] == "subtask")
+    assert subtask["task_name"] == "" and subtask["contribution_value"] != ""
+
+
+def test_export_csv_without_records_returns_header(client, auth_headers):
+    response = client.get("/api/v1/export", params={"format": "csv"}, headers=auth_headers(1))
+
+    assert response.status_code == 200
+    assert response.text == ",".join(crud_export.EXPORT_CSV_FIELDS) + "\n"
+
+
+def test_export_rows_are_read_in_batches(db):
+    _create_tasks(db, user_id=1)
+
+    batches = list(crud_export.iter_export_rows(db, user_id=1, batch_size=4))
+
+    assert all(1 <= len(rows) <= 4 for _, rows in batches)
+    assert [
+        (record_type, row) for record_type, rows in batches for row in rows
+    ] == [
+        (record_type, row) for record_type, rows in crud_export.iter_export_rows(db, user_id=1) for row in rows
+    ]
+
+
+def _export_lines(pg_engine, user_id: int) -> list:
+    """エクスポート専用のセッションで、インポートの入力（NDJSONの行）を作る"""
+    db = Session(bind=pg_engine)
+    try:
+        return [
+            json.dumps({"type": record_type, **row}, default=str)
+            for record_type, rows in crud_export.iter_export_rows(db, user_id, batch_size=5)
+            for row in rows
+        ]
+    finally:
+        db.close()
+
+
+def _contents(lines: list) -> Counter:
+    """NDJSONの行の、IDを除いた内容ごとの件数"""
+    return Counter(
+        repr({key: value for key, value in json.loads(line).items() if not key.endswith("_id")}) for line in lines
+    )
+
+
+def test_export_reads_one_snapshot_on_postgresql(pg_engine, pg_db, pg_user_id):
+    _create_tasks(pg_db, pg_user_id)
+    db = Session(bind=pg_engine)
+    try:
+        rows = crud_export.iter_export_rows(db, pg_user_id, batch_size=1)
+        assert next(rows)[0] == "task"
+        isolation = db.execute(text("SELECT current_setting('transaction_isolation')")).scalar()
+    finally:
+        db.close()
+
+    assert isolation == "repeatable read"
+
+
+def test_export_can_be_imported(pg_engine, pg_db, pg_user_id):
+    """PostgreSQL（サーバーサイドカーソル）でエクスポートした行は、そのまま一括インポートできる"""
+    _create_tasks(pg_db, pg_user_id)
+    lines = _export_lines(pg_engine, pg_user_id)
+
+    result = crud_importer.import_tasks(pg_db, lines, "ndjson", pg_user_id)
+
+    assert result["imported"] is True, result["errors"]
+    assert result["counts"] == _expected_counts(2)
+    # インポートしたタスクは元のタスクと同じ内容（IDのみ異なる）
+    assert _contents(_export_lines(pg_engine, pg_user_id)) == _contents(lines) + _contents(lines)
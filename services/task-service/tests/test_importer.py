@@ -0,0 +1,138 @@
+"""一括インポート（app.crud.importer）のテスト（COPYを使うため、登録はPostgreSQLでのみ確認する）"""
+import json
+from typing import Iterable, List
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.core import cache
+from app.crud import importer as crud_importer
+from app.crud import stats as crud_stats
+
+
+class _RecordingCache(cache.NullCache):
+    """無効化されたタグを記録するキャッシュ"""
+
+    def __init__(self):
+        self.invalidated: List[str] = []
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        self.invalidated.extend(tags)
+
+
+@pytest.fixture
+def recording_cache():
+    original = cache.get_cache()
+    recorder = _RecordingCache()
+    cache.set_cache(recorder)
+    yield recorder
+    cache.set_cache(original)
+
+
+def _ndjson(*records) -> List[str]:
+    return [json.dumps(record) for record in records]
+
+
+def _task_records(src_task_id: int, src_subtask_ids=(1, 2)) -> list:
+    """作業貢献値60/40のサブタスク2件、2日分の計画値のタスク（work_timeを省略した作業記録を含む）"""
+    first, second = src_subtask_ids
+    return [
+        {"type": "task", "task_id": src_task_id, "task_name": f"imported {src_task_id}",
+         "start_date": "2025-01-01", "due_date": "2025-01-02", "target_time": 120},
+        {"type": "subtask", "subtask_id": first, "task_id": src_task_id, "subtask_name": "a", "contribution_value": 60},
+        {"type": "subtask", "subtask_id": second, "task_id": src_task_id, "subtask_name": "b", "contribution_value": 40},
+        {"type": "daily_task_plan", "task_id": src_task_id, "date": "2025-01-01", "task_plan_value": 50},
+        {"type": "daily_task_plan", "task_id": src_task_id, "date": "2025-01-02", "task_plan_value": 50},
+        {"type": "daily_time_plan", "task_id": src_task_id, "date": "2025-01-01", "time_plan_value": 60},
+        {"type": "daily_time_plan", "task_id": src_task_id, "date": "2025-01-02", "time_plan_value": 60},
+        {"type": "record_work", "subtask_id": first, "date": "2025-01-01", "work": 30, "work_time": 45},
+        {"type": "record_work", "subtask_id": first, "date": "2025-01-02", "work": 10, "work_time": 15},
+        {"type": "record_work", "subtask_id": second, "date": "2025-01-01", "work": 20},
+    ]
+
+
+def _count(db, table: str) -> int:
+    return db.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+
+def test_import_registers_rows_and_stats(pg_db, pg_user_id, recording_cache):
+    lines = _ndjson(*_task_records(10, (1, 2)), *_task_records(20, (3, 4)))
+
+    result = crud_importer.import_tasks(pg_db, lines, "ndjson", pg_user_id, batch_size=3)
+
+    assert result["imported"] is True
+    assert result["error_count"] == 0
+    assert result["counts"] == {"task": 2, "subtask": 4, "daily_task_plan": 4, "daily_time_plan": 4, "record_work": 6}
+    assert {table: _count(pg_db, table) for table in (
+        "tasks", "subtasks", "daily_task_plans", "daily_time_plans", "record_works", "subtask_stats", "task_stats"
+    )} == {
+        "tasks": 2, "subtasks": 4, "daily_task_plans": 4, "daily_time_plans": 4, "record_works": 6,
+        "subtask_stats": 4, "task_stats": 2,
+    }
+
+    # 省略したwork_timeはAPIと同じく0で登録する
+    assert pg_db.execute(text("SELECT COUNT(*) FROM record_works WHERE work_time IS NULL")).scalar() == 0
+    assert pg_db.execute(text("SELECT work_time FROM record_works WHERE work = 20 ORDER BY record_work_id")).scalars().all() == [0, 0]
+
+    # 集計テーブルはrecord_worksから集計し直した値と一致する
+    assert crud_stats.rebuild_stats(pg_db, fix=False)["subtask_drift"] == 0
+    assert crud_stats.rebuild_stats(pg_db, fix=False)["task_drift"] == 0
+    task_stats = pg_db.execute(text(
+        "SELECT total_work, total_work_time, total_work_records FROM task_stats ORDER BY task_id"
+    )).all()
+    assert [tuple(row) for row in task_stats] == [(60, 60, 3), (60, 60, 3)]
+
+    # 登録したタスクは全てユーザーのもので、詳細と一覧のキャッシュを無効化している
+    task_ids = pg_db.execute(text("SELECT task_id FROM tasks WHERE user_id = :user_id"), {"user_id": pg_user_id}).scalars().all()
+    assert len(task_ids) == 2
+    assert set(recording_cache.invalidated) == {cache.task_tag(task_id) for task_id in task_ids} | {
+        cache.user_tasks_tag(pg_user_id)
+    }
+
+
+def test_import_csv(pg_db, pg_user_id):
+    lines = [
+        "type,task_id,subtask_id,task_name,start_date,due_date,target_time,subtask_name,contribution_value,"
+        "date,task_plan_value,time_plan_value,work,work_time\n",
+        "task,1,,csv,2025-01-01,2025-01-01,60,,,,,,,\n",
+        "subtask,1,7,,,,,only,100,,,,,\n",
+        "daily_task_plan,1,,,,,,,,2025-01-01,100,,,\n",
+        "daily_time_plan,1,,,,,,,,2025-01-01,,60,,\n",
+        "record_work,,7,,,,,,,2025-01-01,,,50,\n",
+    ]
+
+    result = crud_importer.import_tasks(pg_db, lines, "csv", pg_user_id)
+
+    assert result["imported"] is True, result["errors"]
+    assert pg_db.execute(text("SELECT work, work_time FROM record_works")).one() == (50, 0)
+    assert pg_db.execute(text("SELECT total_work, total_work_time, work_days FROM subtask_stats")).one() == (50, 0, 1)
+
+
+def test_import_with_errors_registers_nothing(pg_db, pg_user_id, recording_cache):
+    records = _task_records(10)
+    records[1]["contribution_value"] = 70  # 作業貢献値の合計が110になる
+    records.append({"type": "record_work", "subtask_id": 99, "date": "2025-01-01", "work": 5})
+    lines = _ndjson(*records)
+
+    result = crud_importer.import_tasks(pg_db, lines, "ndjson", pg_user_id)
+
+    assert result["imported"] is False
+    assert [error["line"] for error in result["errors"]] == [1, len(records)]
+    assert _count(pg_db, "tasks") == 0
+    assert _count(pg_db, "record_works") == 0
+    assert recording_cache.invalidated == []
+
+
+def test_dry_run_registers_nothing(pg_db, pg_user_id):
+    result = crud_importer.import_tasks(pg_db, _ndjson(*_task_records(10)), "ndjson", pg_user_id, dry_run=True)
+
+    assert result["imported"] is False
+    assert result["error_count"] == 0
+    assert _count(pg_db, "tasks") == 0
+
+
+def test_import_requires_postgresql(db):
+    with pytest.raises(HTTPException) as exc_info:
+        crud_importer.import_tasks(db, _ndjson(*_task_records(10)), "ndjson", user_id=1)
+    assert exc_info.value.status_code == 501
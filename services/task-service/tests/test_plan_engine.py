@@ -0,0 +1,140 @@
+"""日次計画値の生成（app.core.plan_engine）と、タスク作成時の初期値の計算（POST /tasks/calculate-initial-values）のテスト"""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.core import plan_engine
+
+# 2025-01-06 は月曜日
+MONDAY = date(2025, 1, 6)
+WEEKDAYS = (0, 1, 2, 3, 4)
+
+
+def _dates(start: date, days: int) -> list:
+    return [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+def test_working_days_follow_weekdays_and_holidays():
+    days = plan_engine.get_working_days(MONDAY, MONDAY + timedelta(days=13), WEEKDAYS, (MONDAY + timedelta(days=2),))
+
+    assert [str(day) for day in days] == [
+        "2025-01-06", "2025-01-07", "2025-01-09", "2025-01-10",
+        "2025-01-13", "2025-01-14", "2025-01-15", "2025-01-16", "2025-01-17",
+    ]
+    assert all(date.fromisoformat(str(day)).weekday() < 5 for day in days)
+
+
+def test_working_days_are_read_only():
+    days = plan_engine.get_working_days(MONDAY, MONDAY + timedelta(days=6))
+
+    assert len(days) == 7
+    with pytest.raises(ValueError):
+        days[0] = np.datetime64("2000-01-01")
+
+
+def test_distribute_uses_largest_remainder():
+    # 100/3 = 33.333...: 端数が同じなら前の日に足す
+    assert plan_engine.distribute(100, np.ones(3), 2).tolist() == [33.34, 33.33, 33.33]
+    assert plan_engine.distribute(10, np.array([1.0, 2.0, 3.0]), 0).tolist() == [2.0, 3.0, 5.0]
+
+
+def test_distribute_rejects_zero_weights():
+    with pytest.raises(ValueError):
+        plan_engine.distribute(100, np.zeros(3), 2)
+    with pytest.raises(ValueError):
+        plan_engine.distribute(100, np.ones(0), 2)
+
+
+@pytest.mark.parametrize("days, target_time", [(1, 0), (3, 100), (7, 1), (30, 1234), (3650, 99999)])
+@pytest.mark.parametrize("curve", plan_engine.CURVES)
+def test_plans_sum_exactly_to_100_and_target_time(days, target_time, curve):
+    plans = plan_engine.generate_plans(MONDAY, MONDAY + timedelta(days=days - 1), target_time, curve=curve)
+
+    assert plans["dates"] == _dates(MONDAY, days)
+    # 丸めた単位（0.01・1分）の整数で比べる
+    assert sum(round(value * 100) for value in plans["task_plan_values"]) == 100 * 100
+    assert sum(plans["time_plan_values"]) == target_time
+    assert all(value >= 0 for value in plans["task_plan_values"] + plans["time_plan_values"])
+
+
+def test_default_plans_spread_over_every_day():
+    plans = plan_engine.generate_plans(MONDAY, MONDAY + timedelta(days=3), 120)
+
+    assert plans == {
+        "dates": _dates(MONDAY, 4),
+        "task_plan_values": [25.0, 25.0, 25.0, 25.0],
+        "time_plan_values": [30.0, 30.0, 30.0, 30.0],
+    }
+
+
+@pytest.mark.parametrize("curve, descending", [("front", True), ("back", False)])
+def test_curves_front_and_back_load_the_plans(curve, descending):
+    values = plan_engine.generate_plans(MONDAY, MONDAY + timedelta(days=9), 600, curve=curve)["task_plan_values"]
+
+    assert values == sorted(values, reverse=descending)
+    assert values[0] != values[-1]
+
+
+def test_weekday_weights_skip_zero_weight_days():
+    # 月曜は2倍、土日は配分しない
+    plans = plan_engine.generate_plans(
+        MONDAY, MONDAY + timedelta(days=6), 360, weekday_weights=(2, 1, 1, 1, 1, 0, 0)
+    )
+
+    assert plans == {
+        "dates": _dates(MONDAY, 5),
+        "task_plan_values": [33.33, 16.67, 16.67, 16.67, 16.66],
+        "time_plan_values": [120.0, 60.0, 60.0, 60.0, 60.0],
+    }
+
+
+def test_plans_without_working_days_raise():
+    saturday = MONDAY + timedelta(days=5)
+    with pytest.raises(ValueError):
+        plan_engine.generate_plans(saturday, saturday + timedelta(days=1), 60, working_weekdays=WEEKDAYS)
+    with pytest.raises(ValueError):
+        plan_engine.generate_plans(MONDAY, MONDAY, 60, holidays=[MONDAY])
+
+
+def test_cached_plans_are_not_shared_with_callers():
+    first = plan_engine.generate_plans(MONDAY, MONDAY + timedelta(days=1), 60)
+    first["task_plan_values"].append(1)
+
+    assert plan_engine.generate_plans(MONDAY, MONDAY + timedelta(days=1), 60)["task_plan_values"] == [50.0, 50.0]
+
+
+def test_calculate_initial_values_endpoint(client, auth_headers):
+    response = client.post("/api/v1/tasks/calculate-initial-values", headers=auth_headers(1), json={
+        "start_date": MONDAY.isoformat(),
+        "due_date": (MONDAY + timedelta(days=13)).isoformat(),
+        "target_time": 600,
+        "subtask_count": 3,
+        "working_weekdays": list(WEEKDAYS),
+        "holidays": [(MONDAY + timedelta(days=7)).isoformat()],
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [plan["date"] for plan in body["daily_task_plans"]] == [
+        day for day in _dates(MONDAY, 14) if date.fromisoformat(day).weekday() < 5 and day != "2025-01-13"
+    ]
+    assert [plan["date"] for plan in body["daily_time_plans"]] == [plan["date"] for plan in body["daily_task_plans"]]
+    assert sum(plan["time_plan_value"] for plan in body["daily_time_plans"]) == 600
+    assert body["subtask_contribution_values"] == [34, 33, 33]
+    assert body["subtask_contribution_value"] == pytest.approx(100 / 3)
+
+
+@pytest.mark.parametrize("overrides, status_code", [
+    ({"working_weekdays": [5, 6], "due_date": "2025-01-10"}, 400),  # 月〜金の期間に土日のみ稼働
+    ({"working_weekdays": [7]}, 422),
+    ({"weekday_weights": [1, 1, 1]}, 422),
+    ({"curve": "middle"}, 422),
+    ({"due_date": "2025-01-05"}, 422),
+])
+def test_calculate_initial_values_rejects_invalid_input(client, auth_headers, overrides, status_code):
+    payload = {"start_date": MONDAY.isoformat(), "due_date": "2025-01-12", "target_time": 60, "subtask_count": 2}
+
+    response = client.post("/api/v1/tasks/calculate-initial-values", headers=auth_headers(1), json={**payload, **overrides})
+
+    assert response.status_code == status_code, response.text
@@ -0,0 +1,233 @@
+"""
+よく実行するクエリがインデックスを使うことのテスト（PostgreSQLのみ）
+
+CRUD関数をPostgreSQLで実行して、発行されたSELECT文とそのパラメータを記録し、同じ文の EXPLAIN (FORMAT JSON) で
+対象テーブルがSeq Scanになっていないこと、想定したインデックス（database/migrations の 0002 以降）が使われることを確認する。
+件数が少ないテーブルではSeq Scanの方が安くなるため、enable_seqscan = off で
+「使えるインデックスがあるか」を確認する（本番の実行計画そのものではない）。
+"""
+import json
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.crud import burndown as crud_burndown
+from app.crud import record_work as crud_record_work
+from app.crud import stats as crud_stats
+from app.crud import task as crud_task
+from app.models.models import Task
+from app.schemas import task as schemas
+from conftest import make_task
+
+Statement = Tuple[str, Any]
+
+
+# ユーザー200人・各20件のタスク（サブタスク3件、10日分の計画値と作業記録、期限日はタスクごとに異なる）
+# 件数が少ないと、並び順だけ合う主キーなどのインデックスが選ばれるため、統計情報が本番に近い分布になるように入れる
+BACKGROUND_SQL = """
+WITH new_users AS (
+    INSERT INTO users (username, password) SELECT 'plan-user-' || u, 'x' FROM generate_series(1, 200) AS u
+    RETURNING user_id
+), new_tasks AS (
+    INSERT INTO tasks (user_id, task_name, start_date, due_date)
+    SELECT user_id, 'background ' || n, DATE '2025-01-01', DATE '2025-01-10' + (user_id + n) %% 90
+    FROM new_users, generate_series(1, 20) AS n
+    RETURNING task_id
+), new_task_plans AS (
+    INSERT INTO daily_task_plans (task_id, date, task_plan_value)
+    SELECT task_id, DATE '2025-01-01' + d, 10 FROM new_tasks, generate_series(0, 9) AS d
+), new_time_plans AS (
+    INSERT INTO daily_time_plans (task_id, date, time_plan_value)
+    SELECT task_id, DATE '2025-01-01' + d, 60 FROM new_tasks, generate_series(0, 9) AS d
+), new_subtasks AS (
+    INSERT INTO subtasks (task_id, subtask_name, contribution_value)
+    SELECT task_id, 'background ' || n, CASE WHEN n = 1 THEN 34 ELSE 33 END FROM new_tasks, generate_series(1, 3) AS n
+    RETURNING subtask_id
+)
+INSERT INTO record_works (subtask_id, date, work, work_time)
+SELECT subtask_id, DATE '2025-01-01' + d, 3, 30 FROM new_subtasks, generate_series(0, 9) AS d
+"""
+
+
+@pytest.fixture(scope="module")
+def plan_data(pg_engine) -> Iterator[Tuple[int, List[schemas.Task]]]:
+    """
+    実行計画を確認するデータ（モジュールで1回作成し、最後に全テーブルを空にする）
+    戻り値は (ユーザーID, そのユーザーの、計画期間の毎日に作業記録があるタスク3件)
+    """
+    with pg_engine.begin() as connection:
+        connection.exec_driver_sql(BACKGROUND_SQL)
+        user_id = connection.execute(text("SELECT MIN(user_id) FROM users")).scalar()
+    db = Session(bind=pg_engine)
+    try:
+        created = []
+        for _ in range(3):
+            task = crud_task.create_task(db, make_task(), user_id)
+            crud_record_work.upsert_record_works(db, [
+                schemas.RecordWorkBulkItem(subtask_id=subtask.subtask_id, date=plan.date, work=10, work_time=30)
+                for subtask in task.subtasks for plan in task.daily_task_plans
+            ], {subtask.subtask_id: task.task_id for subtask in task.subtasks})
+            created.append(task)
+    finally:
+        db.close()
+    with pg_engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+    yield user_id, created
+
+    with pg_engine.begin() as connection:
+        connection.execute(text("TRUNCATE users, tasks, subtask_stats, task_stats RESTART IDENTITY CASCADE"))
+
+
+@pytest.fixture
+def plan_db(pg_engine) -> Iterator[Session]:
+    db = Session(bind=pg_engine)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def user_id(plan_data) -> int:
+    return plan_data[0]
+
+
+@pytest.fixture
+def tasks(plan_data) -> List[schemas.Task]:
+    return plan_data[1]
+
+
+@pytest.fixture
+def capture_selects(pg_engine) -> Callable[[Callable[[], Any]], List[Statement]]:
+    """関数の実行中にpg_engineで発行されたSELECT文とパラメータ"""
+    def _capture(call: Callable[[], Any]) -> List[Statement]:
+        statements: List[Statement] = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and not executemany:
+                statements.append((statement, parameters))
+
+        event.listen(pg_engine, "before_cursor_execute", record)
+        try:
+            call()
+        finally:
+            event.remove(pg_engine, "before_cursor_execute", record)
+        assert statements, "SELECT文が発行されていません"
+        return statements
+
+    return _capture
+
+
+def _walk(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+def _plan_nodes(pg_engine, statements: List[Statement]) -> List[Dict[str, Any]]:
+    """記録した文の実行計画の全ノード（enable_seqscan = off）"""
+    connection = pg_engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        nodes = []
+        for statement, parameters in statements:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes.extend(_walk(plan[0]["Plan"]))
+        return nodes
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def _assert_uses_indexes(pg_engine, statements: List[Statement], expected: Dict[str, str]) -> None:
+    nodes = _plan_nodes(pg_engine, statements)
+    seq_scanned = {node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"}
+    used = {node["Index Name"] for node in nodes if "Index Name" in node}
+
+    assert sorted(table for table in expected if table in seq_scanned) == [], "Seq Scanになるテーブル"
+    assert sorted(index for index in expected.values() if index not in used) == [], f"使われないインデックス（使われたもの: {sorted(used)}）"
+
+
+@pytest.mark.parametrize("order_by, index", [
+    ("due_date", "idx_tasks_user_id_due_date_task_id"),
+    ("task_id", "idx_tasks_user_id_task_id"),
+])
+def test_task_list_keyset_pagination(pg_engine, plan_db, user_id, tasks, capture_selects, order_by, index):
+    _, cursor = crud_task.get_tasks(plan_db, user_id, limit=1, order_by=order_by)
+    assert cursor is not None
+
+    statements = capture_selects(lambda: crud_task.get_tasks(plan_db, user_id, limit=1, cursor=cursor, order_by=order_by))
+
+    _assert_uses_indexes(pg_engine, statements, {"tasks": index})
+
+
+def test_task_list_subtasks_and_stats(pg_engine, plan_db, user_id, tasks, capture_selects):
+    task_rows, _ = crud_task.get_tasks(plan_db, user_id)
+
+    statements = capture_selects(lambda: crud_task.load_task_summaries(plan_db, task_rows))
+
+    _assert_uses_indexes(pg_engine, statements, {
+        "subtasks": "idx_subtasks_task_id_subtask_id",
+        "subtask_stats": "subtask_stats_pkey",
+    })
+
+
+def test_task_detail_plans(pg_engine, plan_db, tasks, capture_selects):
+    db_task = plan_db.query(Task).filter(Task.task_id == tasks[0].task_id).one()
+
+    statements = capture_selects(lambda: crud_task.load_task_details(plan_db, [db_task], include_plans=True))
+
+    _assert_uses_indexes(pg_engine, statements, {
+        "subtasks": "idx_subtasks_task_id_subtask_id",
+        "daily_task_plans": "daily_task_plans_task_id_date_key",
+        "daily_time_plans": "daily_time_plans_task_id_date_key",
+    })
+
+
+def test_task_summary(pg_engine, plan_db, tasks, capture_selects):
+    statements = capture_selects(lambda: crud_stats.get_task_summary(plan_db, tasks[0].task_id))
+
+    _assert_uses_indexes(pg_engine, statements, {"task_stats": "task_stats_pkey"})
+
+
+def test_record_works_by_subtask(pg_engine, plan_db, tasks, capture_selects):
+    subtask_id = tasks[0].subtasks[0].subtask_id
+
+    statements = capture_selects(lambda: crud_record_work.get_record_works_by_subtask(plan_db, subtask_id))
+
+    _assert_uses_indexes(pg_engine, statements, {"record_works": "record_works_subtask_id_date_key"})
+
+
+def test_burndown(pg_engine, plan_db, tasks, capture_selects):
+    db_task = plan_db.query(Task).filter(Task.task_id == tasks[0].task_id).one()
+
+    statements = capture_selects(lambda: crud_burndown.get_task_burndown(plan_db, db_task))
+
+    _assert_uses_indexes(pg_engine, statements, {
+        "subtasks": "idx_subtasks_task_id_subtask_id",
+        "record_works": "record_works_subtask_id_date_key",
+        "daily_task_plans": "daily_task_plans_task_id_date_key",
+        "daily_time_plans": "daily_time_plans_task_id_date_key",
+    })
+
+
+def test_bulk_upsert_locks_existing_record_works(pg_engine, plan_db, tasks, capture_selects):
+    task = tasks[0]
+    records = [
+        schemas.RecordWorkBulkItem(subtask_id=subtask.subtask_id, date=task.start_date, work=20, work_time=40)
+        for subtask in task.subtasks
+    ]
+
+    statements = capture_selects(lambda: crud_record_work.upsert_record_works(
+        plan_db, records, {subtask.subtask_id: task.task_id for subtask in task.subtasks}
+    ))
+
+    assert any("FOR UPDATE" in statement for statement, _ in statements)
+    _assert_uses_indexes(pg_engine, statements, {"record_works": "record_works_subtask_id_date_key"})
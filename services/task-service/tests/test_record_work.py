@@ -0,0 +1,48 @@
+"""作業記録の作成（create_record_work）のテスト: 制約違反の原因（サブタスクがない・同じ日付の記録がある）を区別すること"""
+from datetime import date
+
+import pytest
+
+from app.crud import record_work as crud_record_work
+from app.crud import task as crud_task
+from app.models.models import RecordWork
+from app.schemas import task as schemas
+from conftest import make_task
+
+MISSING_SUBTASK_ID = 999_999
+
+
+def _record(work: float = 10) -> schemas.RecordWorkCreate:
+    return schemas.RecordWorkCreate(date=date(2025, 1, 1), work=work, work_time=30)
+
+
+def _assert_duplicate_is_rejected(db, task) -> None:
+    subtask_id = task.subtasks[0].subtask_id
+    crud_record_work.create_record_work(db, _record(), subtask_id=subtask_id, task_id=task.task_id)
+
+    with pytest.raises(ValueError, match="既に存在します"):
+        crud_record_work.create_record_work(db, _record(work=20), subtask_id=subtask_id, task_id=task.task_id)
+    assert [row.work for row in db.query(RecordWork).filter(RecordWork.subtask_id == subtask_id)] == [10]
+
+
+def test_create_record_work_rejects_duplicate_date(db):
+    _assert_duplicate_is_rejected(db, crud_task.create_task(db, make_task(), user_id=1))
+
+
+def test_create_record_work_rejects_duplicate_date_postgresql(pg_db, pg_user_id):
+    _assert_duplicate_is_rejected(pg_db, crud_task.create_task(pg_db, make_task(), pg_user_id))
+
+
+def test_create_record_work_for_missing_subtask_returns_none(db):
+    assert crud_record_work.create_record_work(db, _record(), subtask_id=MISSING_SUBTASK_ID) is None
+    assert db.query(RecordWork).count() == 0
+
+
+def test_create_record_work_for_missing_subtask_returns_none_postgresql(pg_db, pg_user_id):
+    """存在確認の後にサブタスクが削除された場合（task_idは渡される）も、外部キー違反を重複と報告しない"""
+    task = crud_task.create_task(pg_db, make_task(), pg_user_id)
+
+    assert crud_record_work.create_record_work(
+        pg_db, _record(), subtask_id=MISSING_SUBTASK_ID, task_id=task.task_id
+    ) is None
+    assert pg_db.query(RecordWork).count() == 0
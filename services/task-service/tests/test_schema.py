@@ -0,0 +1,82 @@
+"""database/init.sql のスキーマが、マイグレーション（database/migrations）のheadと一致することのテスト（PostgreSQLのみ）"""
+import os
+from typing import Dict, Set, Tuple
+
+import pytest
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+
+from conftest import DATABASE_DIR
+
+INIT_SQL = os.path.join(DATABASE_DIR, "init.sql")
+INIT_SQL_SCHEMA = "init_sql"
+
+# (テーブル, 列, 型, NULL可否, デフォルト値)
+COLUMNS_SQL = """
+SELECT table_name, column_name, data_type, character_maximum_length, is_nullable, column_default
+FROM information_schema.columns WHERE table_schema = :schema
+"""
+# (テーブル, インデックス名, 定義)
+INDEXES_SQL = "SELECT tablename, indexname, indexdef FROM pg_indexes WHERE schemaname = :schema"
+# (テーブル, 制約名, 定義)
+CONSTRAINTS_SQL = """
+SELECT cls.relname, con.conname, pg_get_constraintdef(con.oid)
+FROM pg_constraint con
+JOIN pg_class cls ON cls.oid = con.conrelid
+JOIN pg_namespace nsp ON nsp.oid = cls.relnamespace
+WHERE nsp.nspname = :schema
+"""
+
+
+def _init_sql_statements() -> str:
+    """init.sqlのうち、作成したデータベースで実行する部分（CREATE DATABASEと\\cはpsqlで実行するため除く）"""
+    with open(INIT_SQL, encoding="utf-8") as f:
+        script = f.read()
+    _, separator, body = script.partition("\\c task_management_db;")
+    assert separator, "init.sqlに \\c task_management_db; がありません"
+    return body
+
+
+def _schema(connection, schema: str) -> Dict[str, Set[Tuple]]:
+    """スキーマ名を除いた列・インデックス・制約の定義"""
+    def normalize(row) -> Tuple:
+        return tuple(value.replace(f"{schema}.", "") if isinstance(value, str) else value for value in row)
+
+    return {
+        name: {normalize(row) for row in connection.execute(text(sql), {"schema": schema})}
+        for name, sql in (("columns", COLUMNS_SQL), ("indexes", INDEXES_SQL), ("constraints", CONSTRAINTS_SQL))
+    }
+
+
+@pytest.fixture
+def init_sql_connection(pg_engine):
+    """init.sqlを専用のスキーマで実行した接続（PostgreSQLのDDLはトランザクション内で動くため、テスト後にロールバックする）"""
+    with pg_engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            connection.execute(text(f"CREATE SCHEMA {INIT_SQL_SCHEMA}"))
+            connection.execute(text(f"SET LOCAL search_path TO {INIT_SQL_SCHEMA}"))
+            connection.exec_driver_sql(_init_sql_statements())
+            connection.execute(text("SET LOCAL search_path TO public"))
+            yield connection
+        finally:
+            transaction.rollback()
+
+
+def test_init_sql_matches_migration_head(init_sql_connection):
+    migrated = _schema(init_sql_connection, "public")
+    initialized = _schema(init_sql_connection, INIT_SQL_SCHEMA)
+
+    for name in ("columns", "indexes", "constraints"):
+        assert sorted(initialized[name] - migrated[name]) == [], f"init.sqlにのみある{name}"
+        assert sorted(migrated[name] - initialized[name]) == [], f"マイグレーションにのみある{name}"
+
+
+def test_init_sql_records_migration_head(init_sql_connection):
+    config = Config()
+    config.set_main_option("script_location", os.path.join(DATABASE_DIR, "migrations"))
+    head = ScriptDirectory.from_config(config).get_current_head()
+
+    recorded = init_sql_connection.execute(text(f"SELECT version_num FROM {INIT_SQL_SCHEMA}.alembic_version")).scalars().all()
+    assert recorded == [head]
@@ -0,0 +1,88 @@
+"""タスク一覧（必要な列だけを辞書にしてorjsonで返す）と、詳細のレスポンスのテスト"""
+from datetime import date
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.v1.tasks import _render_json
+from app.crud import record_work as crud_record_work
+from app.crud import task as crud_task
+from app.models.models import Task
+from app.schemas import task as schemas
+from conftest import make_task
+
+
+def _create_tasks(db, user_id: int) -> list:
+    """作業記録の量が異なるタスク（進捗率0%・途中・作業量の合計が100を超えるサブタスクを含む）"""
+    created = []
+    # タスクごとの作業記録の (サブタスクの位置, 日付, 作業量)
+    for records in ((), ((0, 1, 30),), ((0, 1, 60), (0, 2, 70), (1, 1, 40))):
+        task = crud_task.create_task(db, make_task(subtask_count=3), user_id)
+        for position, day, work in records:
+            crud_record_work.create_record_work(
+                db, schemas.RecordWorkCreate(date=date(2025, 1, day), work=work, work_time=work * 2),
+                subtask_id=task.subtasks[position].subtask_id, task_id=task.task_id
+            )
+        created.append(task)
+    return created
+
+
+def test_task_summaries_match_task_details(db):
+    """一覧の辞書は、詳細と同じ方法で計算した進捗率・作業時間・サブタスクを持つ"""
+    _create_tasks(db, user_id=1)
+    task_rows, _ = crud_task.get_tasks(db, user_id=1)
+
+    summaries = crud_task.load_task_summaries(db, task_rows)
+    details = crud_task.load_task_details(db, db.query(Task).filter(Task.user_id == 1).order_by(Task.task_id).all())
+
+    summary_fields = set(schemas.TaskSummary.__fields__)
+    expected = [
+        {name: value for name, value in detail.dict().items() if name in summary_fields}
+        for detail in details
+    ]
+    assert sorted(summaries, key=lambda task: task["task_id"]) == expected
+    assert [task["progress"] for task in expected] != [0, 0, 0]
+
+
+def test_task_list_response_shape(client, db, auth_headers):
+    _create_tasks(db, user_id=1)
+
+    response = client.get("/api/v1/tasks/", headers=auth_headers(1))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    tasks = response.json()
+    assert len(tasks) == 3
+    for task in tasks:
+        # 一覧に直近の予定・コメント・日次計画値は含めない（詳細の取得で返す）
+        assert set(task) == set(schemas.TaskSummary.__fields__)
+        schemas.TaskSummary(**task)
+        assert set(task["subtasks"][0]) == set(schemas.Subtask.__fields__)
+
+
+def test_task_detail_response_matches_model(client, db, auth_headers):
+    task = _create_tasks(db, user_id=1)[-1]
+
+    response = client.get(f"/api/v1/tasks/{task.task_id}", headers=auth_headers(1))
+
+    assert response.status_code == 200
+    detail = schemas.Task(**response.json())
+    assert response.json() == jsonable_encoder(detail)
+    assert [plan.date for plan in detail.daily_task_plans] == [plan.date for plan in task.daily_task_plans]
+    assert detail.progress > 0
+
+
+def test_render_json_matches_jsonable_encoder():
+    """orjsonでの変換は、FastAPIの標準（jsonable_encoder）と同じJSONになる"""
+    content = {
+        "date": date(2025, 1, 31),
+        "text": "日本語",
+        "none": None,
+        "float": 12.5,
+        "model": schemas.DailyTaskPlan(daily_task_plan_id=1, task_id=2, date=date(2025, 1, 1), task_plan_value=10),
+    }
+
+    assert _render_json(content) == _render_json(jsonable_encoder(content))
+    assert _render_json(content).decode("utf-8") == (
+        '{"date":"2025-01-31","text":"日本語","none":null,"float":12.5,'
+        '"model":{"date":"2025-01-01","task_plan_value":10.0,"daily_task_plan_id":1,"task_id":2}}'
+    )
@@ -0,0 +1,62 @@
+"""
+タスク一覧・詳細のSQL文の数が、タスク数・サブタスク数によらず一定であることのテスト（N+1クエリの検出）
+
+各タスクのサブタスクには作業記録を付けておく。レスポンスキャッシュに当たらないよう、それぞれ初回の取得で数える。
+"""
+from typing import List
+
+import pytest
+
+from app.crud import record_work as crud_record_work
+from app.crud import task as crud_task
+from app.db.session import engine
+from app.schemas import task as schemas
+from conftest import make_task
+
+COUNTS = (1, 50)
+
+
+def _create_tasks(db, user_id: int, task_count: int, subtask_count: int) -> List[int]:
+    """タスクを作成し、各サブタスクに作業記録を1件ずつ付ける（作成したタスクIDを返す）"""
+    task_ids = []
+    for _ in range(task_count):
+        task = crud_task.create_task(db, make_task(subtask_count=subtask_count), user_id)
+        for subtask in task.subtasks:
+            crud_record_work.create_record_work(
+                db, schemas.RecordWorkCreate(date=task.start_date, work=10, work_time=30),
+                subtask_id=subtask.subtask_id, task_id=task.task_id
+            )
+        task_ids.append(task.task_id)
+    return task_ids
+
+
+@pytest.fixture
+def statements_for(client, count_statements, auth_headers):
+    """GETで発行されたSQL文（レスポンスが200であることも確認する）"""
+    def _get(path: str, user_id: int) -> List[str]:
+        with count_statements(engine) as statements:
+            response = client.get(path, headers=auth_headers(user_id))
+        assert response.status_code == 200, response.text
+        return statements
+
+    return _get
+
+
+def test_task_list_statement_count_is_constant(db, statements_for):
+    counts = {}
+    for user_id, task_count in enumerate(COUNTS, start=1):
+        _create_tasks(db, user_id, task_count=task_count, subtask_count=3)
+        counts[task_count] = len(statements_for("/api/v1/tasks/", user_id))
+
+    assert counts[COUNTS[0]] > 0
+    assert counts[COUNTS[0]] == counts[COUNTS[-1]], counts
+
+
+def test_task_detail_statement_count_is_constant(db, statements_for):
+    counts = {}
+    for subtask_count in COUNTS:
+        task_id = _create_tasks(db, user_id=1, task_count=1, subtask_count=subtask_count)[0]
+        counts[subtask_count] = len(statements_for(f"/api/v1/tasks/{task_id}", 1))
+
+    assert counts[COUNTS[0]] > 0
+    assert counts[COUNTS[0]] == counts[COUNTS[-1]], counts